@@ -7,6 +7,14 @@ from src.ui_components.forms import dynamic_list_input
 from src.agent.state import (CampaignGoal, AdPlatform, Product, SupportedPlatform,
                              CreativeDirection, ScriptTone, Gender, Countries,
                              IncomeRange, EducationLevel, AudiencePersona, AgentState, )
+from src.agent.checkpoint import new_run_id
+from src.agent.registry import warm_up
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up_registry():
+    """Compile the graphs and LLM runnables once per Streamlit server process."""
+    warm_up()
 
 
 def initial_input_ui():
@@ -670,6 +678,7 @@ def initial_input_ui():
                     # Store in session state
                     st.session_state['agent_state'] = agent_state
                     st.session_state['workflow_status'] = 'ready'
+                    st.session_state['run_id'] = new_run_id()
 
                 st.success("✅ Kampanye berhasil dikonfigurasi! Mengalihkan ke pemrosesan AI...")
 
@@ -684,3 +693,5 @@ def initial_input_ui():
 
 if __name__ == "__main__":
     initial_input_ui()
+    # Warm up after the form is rendered so the first paint is not delayed
+    warm_up_registry()
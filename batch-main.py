@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+
+from src.config.config import config
+from src.config.logging_config import setup_logging
+from src.agent.batch import run_batch
+from src.agent.registry import warm_up
+from src.agent.metrics import export_metrics_json, export_prometheus_textfile
+from src.agent.tracing import set_trace_export_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a JSONL file of AgentState-shaped campaign briefs through the pre-review graph."
+    )
+    parser.add_argument("--input", default="requests.jsonl", help="JSONL file with one brief per line.")
+    parser.add_argument("--output", default="results.jsonl", help="Result JSONL, written per brief as each one finishes (replaced on every run unless --append).")
+    parser.add_argument("--append", action="store_true",
+                        help="Add to the existing output and quarantine files instead of replacing them, "
+                             "skipping briefs already recorded there (same run id and input, or the same invalid line).")
+    parser.add_argument("--quarantine", default=None,
+                        help="JSONL file for invalid records (default: <output>.quarantine.jsonl).")
+    parser.add_argument("--concurrency", type=int, default=config.batch_concurrency,
+                        help="Maximum number of briefs in flight at once.")
+    parser.add_argument("--metrics-json", default=config.metrics_json_path or None,
+                        help="Write the per-call LLM metrics to this JSON file.")
+    parser.add_argument("--metrics-prom", default=config.metrics_prometheus_path or None,
+                        help="Write the LLM metrics to this Prometheus textfile.")
+    parser.add_argument("--trace-file", default=config.trace_export_path or None,
+                        help="Append the spans of every run to this OTLP JSON Lines file.")
+    args = parser.parse_args()
+
+    setup_logging(config)
+    set_trace_export_path(args.trace_file)
+    warm_up()
+
+    summary = asyncio.run(run_batch(
+        input_path=args.input,
+        output_path=args.output,
+        quarantine_path=args.quarantine,
+        concurrency=args.concurrency,
+        append=args.append,
+    ))
+
+    print(f"Batch completed in {summary.elapsed_seconds}s")
+    print(f"Total: {summary.total_records} | Completed: {summary.completed} | "
+          f"Failed: {summary.failed} | Quarantined: {summary.quarantined} | Skipped: {summary.skipped}")
+    connections = summary.http_connections
+    if connections.get("requests"):
+        print(f"LLM requests: {connections['requests']} | New connections: {connections['new_connections']} | "
+              f"Reuse ratio: {connections['reuse_ratio']:.0%}")
+    for node, stats in summary.llm_cache.items():
+        print(f"LLM cache {node}: {stats['hits']} hits / {stats['misses']} misses "
+              f"({stats['tokens_saved']:,} tokens saved)")
+    for stage, stats in summary.stage_cache.items():
+        print(f"Stage cache {stage}: {stats['hits']} hits / {stats['misses']} misses "
+              f"({stats['tokens_saved']:,} tokens saved)")
+    for node, stats in summary.prompt_history.items():
+        if stats['entries_compacted'] or stats['entries_dropped']:
+            print(f"History compaction {node}: {stats['prompt_tokens_before']:,} -> "
+                  f"{stats['prompt_tokens_after']:,} prompt tokens")
+    for node, stats in summary.prompt_budget.items():
+        if stats['trimmed'] or stats['rejected']:
+            print(f"Prompt budget {node}: {stats['trimmed']} truncated / {stats['rejected']} rejected "
+                  f"(max {stats['max_prompt_tokens']:,} tokens)")
+    for node, stats in summary.prompt_cache.items():
+        if stats['input_tokens']:
+            print(f"Provider prompt cache {node}: {stats['cached_input_tokens']:,} of {stats['input_tokens']:,} "
+                  f"input tokens cached ({stats['cached_ratio']:.0%})")
+    for node, stats in summary.llm_calls.items():
+        print(f"LLM calls {node}: {stats['calls']} calls, {stats['retries']} retries, {stats['timeouts']} timeouts, "
+              f"{stats['hedged']} hedged ({stats['hedge_wins']} won) | p50 {stats['p50_seconds']}s, "
+              f"p99 {stats['p99_seconds']}s")
+    for endpoint, stats in summary.rate_limits.items():
+        print(f"Rate limit {endpoint}: {stats['delayed']} of {stats['requests']} requests delayed "
+              f"({stats['wait_seconds']}s total, max {stats['max_wait_seconds']}s) | tokens estimated "
+              f"{stats['estimated_tokens']:,} / actual {stats['actual_tokens']:,}")
+    for endpoint, stats in summary.endpoints.items():
+        print(f"Endpoint {endpoint}: {stats['calls']} calls, {stats['failures']} failures, "
+              f"{stats['failovers']} failovers | latency EWMA {stats['latency_ewma_seconds']}s, "
+              f"error EWMA {stats['error_ewma']:.0%}{' (cooling down)' if stats['in_cooldown'] else ''}")
+    # Nodes that spend the most time on LLM calls first
+    for node, stats in sorted(summary.llm_metrics.items(), key=lambda item: -item[1]['total_seconds']):
+        print(f"Node {node}: {stats['calls']} calls in {stats['total_seconds']}s | p50 {stats['p50_seconds']}s, "
+              f"p95 {stats['p95_seconds']}s | {stats['input_tokens']:,} prompt / {stats['output_tokens']:,} "
+              f"completion tokens | parse {stats['mean_parse_ms']} ms")
+
+    if args.metrics_json:
+        print(f"LLM call metrics written to {export_metrics_json(args.metrics_json)}")
+    if args.metrics_prom:
+        print(f"Prometheus metrics written to {export_prometheus_textfile(args.metrics_prom)}")
+    if args.trace_file:
+        print(f"Run traces appended to {args.trace_file} (render one with: python -m src.agent.trace_gantt {args.trace_file})")
+
+
+if __name__ == "__main__":
+    main()
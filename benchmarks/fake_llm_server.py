@@ -0,0 +1,367 @@
+"""
+Local OpenAI-compatible stand-in for the LLM endpoints, for offline benchmarks.
+
+Serves `POST /v1/chat/completions` with schema-valid JSON for every structured
+output the graph asks for: `AudienceInsight`, `CreativeStrategyResponse`,
+`VideoScriptDraft`, `StaticAdDraft` and `EvaluationReport`. The schema is picked
+from the system prompt of the request (and the ad platform in the prompt for
+the script drafts); a request with a `json_schema` response format gets an
+instance of that schema instead. Evaluation reports are approved with
+`--approve-rate`, so the refinement loops run as often as needed.
+
+Latency, token counts and errors are configurable, so orchestration throughput,
+retries, hedging, rate limiting and routing can be measured on a laptop without
+network or provider keys:
+
+- `--latency` distribution of the time to the response: `fixed:S`,
+  `uniform:MIN,MAX`, `normal:MEAN,SD`, `lognormal:MEDIAN,SIGMA` or
+  `exponential:MEAN` (seconds), plus `--output-tps` for generation time
+- `--completion-tokens` distribution of the reported completion tokens (default:
+  the size of the generated JSON); prompt tokens are the prompt size divided by
+  `--chars-per-token`, and `--prompt-cache` reports cached prefix tokens
+- `--error-rate` share of requests answered with an `--error-status` (429 with
+  `Retry-After: --retry-after`), `--timeout-rate` share that hangs for `--hang-seconds`
+
+    python benchmarks/fake_llm_server.py --port 8765 --latency lognormal:0.8,0.5 --error-rate 0.02
+    eval "$(python benchmarks/fake_llm_server.py --port 8765 --print-env)"   # point every LLM role at it
+
+`GET /stats` returns the requests served so far; the totals are also printed on exit.
+"""
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Type
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import BaseModel
+
+# Only modules that do not load the settings, so the server runs without a configured .env
+from src.agent import prompts
+from src.agent.state import (AdPlatform, AudienceInsight, CreativeStrategyResponse, EvaluationReport,
+                             VideoScriptDraft, StaticAdDraft)
+
+STATIC_PLATFORMS = {AdPlatform.instagram_feeds.value, AdPlatform.facebook_feeds.value}
+SCRIPT_DRAFT = "script_draft"
+
+# Prefix and suffix of the settings of each LLM role (`config.LLM_ROLES`)
+LLM_ROLE_SETTINGS = [("audience_insight", ""), ("creative_strategy", ""), ("script_generation", "1"),
+                     ("script_generation", "2"), ("script_evaluation_and_refinement", "")]
+
+# System prompt -> output schema of the node that sends it
+SCHEMAS_BY_SYSTEM_PROMPT = {
+    prompts.audience_insight_system_prompt: AudienceInsight,
+    prompts.creative_strategy_system_prompt: CreativeStrategyResponse,
+    prompts.script_generation_system_prompt: SCRIPT_DRAFT,
+    prompts.script_evaluation_system_prompt: EvaluationReport,
+    prompts.script_refinement_system_prompt: SCRIPT_DRAFT,
+    prompts.variation_generation_system_prompt: SCRIPT_DRAFT,
+}
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """Sampler of a `kind:param[,param]` distribution; samples are never negative."""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",")] if params else []
+    samplers = {
+        "fixed": (1, lambda rng, v: v[0]),
+        "uniform": (2, lambda rng, v: rng.uniform(v[0], v[1])),
+        "normal": (2, lambda rng, v: rng.gauss(v[0], v[1])),
+        "lognormal": (2, lambda rng, v: rng.lognormvariate(math.log(v[0]), v[1])),
+        "exponential": (1, lambda rng, v: rng.expovariate(1 / v[0])),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise argparse.ArgumentTypeError(
+            f"invalid distribution {spec!r}; use fixed:S, uniform:MIN,MAX, normal:MEAN,SD, "
+            f"lognormal:MEDIAN,SIGMA or exponential:MEAN")
+    sample = samplers[kind][1]
+    return lambda rng: max(0.0, sample(rng, values))
+
+
+def instance_from_schema(schema: Dict[str, Any], defs: Dict[str, Any], rng: random.Random, name: str = "value",
+                         words: int = 8, hints: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    A value valid against a JSON schema (the subset pydantic generates). `hints` give
+    the values of named properties; string defaults (e.g. `script_type`) are kept.
+    """
+    hints = hints or {}
+    if hints.get(name) is not None and hints[name] in schema.get("enum", [hints[name]]):
+        return hints[name]
+    if "$ref" in schema:
+        return instance_from_schema(defs[schema["$ref"].split("/")[-1]], defs, rng, name, words, hints)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if isinstance(schema.get("default"), str) and schema["default"]:
+        return schema["default"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"] or schema[key]
+            return instance_from_schema(options[0], defs, rng, name, words, hints)
+
+    kind = schema.get("type", "object")
+    if kind == "object":
+        if "properties" in schema:
+            return {prop: instance_from_schema(sub, defs, rng, prop, words, hints)
+                    for prop, sub in schema["properties"].items()}
+        values = schema.get("additionalProperties")
+        if not isinstance(values, dict):
+            return {}
+        keys = schema.get("propertyNames", {})
+        keys = instance_keys(keys, defs) or [f"{name}_{i}" for i in range(1, 4)]
+        return {key: instance_from_schema(values, defs, rng, key, words, hints) for key in keys}
+    if kind == "array":
+        count = max(schema.get("minItems", 0), min(schema.get("maxItems", 3), 3))
+        return [instance_from_schema(schema.get("items", {}), defs, rng, name, words, hints) for _ in range(count)]
+    if kind == "integer":
+        low = math.ceil(schema.get("minimum", schema.get("exclusiveMinimum", 0) + 1))
+        high = math.floor(schema.get("maximum", schema.get("exclusiveMaximum", low + 30) - 1))
+        return rng.randint(low, max(low, high))
+    if kind == "number":
+        low = schema.get("minimum", 0.0)
+        return round(rng.uniform(low, schema.get("maximum", low + 10.0)), 1)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return " ".join([name.replace("_", " ")] + [f"w{rng.randint(1, 999)}" for _ in range(max(words - 1, 0))])
+
+
+def instance_keys(schema: Dict[str, Any], defs: Dict[str, Any]) -> List[str]:
+    """Every allowed key of a `propertyNames` schema that is an enum."""
+    if "$ref" in schema:
+        schema = defs[schema["$ref"].split("/")[-1]]
+    return list(schema.get("enum", []))
+
+
+def model_instance(model: Type[BaseModel], rng: random.Random, words: int, hints: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema-valid instance of `model`, validated with the model itself."""
+    schema = model.model_json_schema()
+    value = instance_from_schema(schema, schema.get("$defs", {}), rng, model.__name__, words, hints)
+    return model.model_validate(value).model_dump(mode="json")
+
+
+class FakeLLM:
+    """Response, latency and error model of the server, shared by its request threads."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.latency = args.latency
+        self.completion_tokens = args.completion_tokens
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self.stats = Counter()
+        self.latency_total = 0.0
+
+    def rng(self) -> random.Random:
+        # One seeded generator per request keeps runs reproducible across threads
+        with self._lock:
+            return random.Random(self._rng.random())
+
+    def output_schema(self, body: Dict[str, Any]):
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            return response_format["json_schema"]["schema"]
+        messages = body.get("messages", [])
+        system = next((m.get("content") for m in messages if m.get("role") == "system"), None)
+        schema = SCHEMAS_BY_SYSTEM_PROMPT.get(system)
+        if schema == SCRIPT_DRAFT:
+            prompt = " ".join(str(m.get("content")) for m in messages if m.get("role") != "system")
+            return StaticAdDraft if any(p in prompt for p in STATIC_PLATFORMS) else VideoScriptDraft
+        return schema
+
+    def content(self, schema, body: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+        if isinstance(schema, dict):
+            return instance_from_schema(schema, schema.get("$defs", {}), rng, "value", self.args.words)
+
+        prompt = " ".join(str(m.get("content")) for m in body.get("messages", []))
+        static = schema is StaticAdDraft
+        platform = next((p.value for p in AdPlatform if p.value in prompt and (p.value in STATIC_PLATFORMS) == static),
+                        None)
+        value = model_instance(schema, rng, self.args.words, {"ad_platform_target": platform})
+        if schema is EvaluationReport:
+            approved = rng.random() < self.args.approve_rate
+            value["is_approved_for_next_stage"] = approved
+            value["overall_score"] = round(rng.uniform(4.0, 5.0) if approved else rng.uniform(2.0, 3.9), 1)
+        return value
+
+    def usage(self, body: Dict[str, Any], content: str, rng: random.Random) -> Dict[str, Any]:
+        prompt = "".join(str(m.get("content")) for m in body.get("messages", []))
+        prompt_tokens = math.ceil(len(prompt) / self.args.chars_per_token)
+        completion_tokens = (round(self.completion_tokens(rng)) if self.completion_tokens
+                             else math.ceil(len(content) / self.args.chars_per_token))
+        cached_tokens = self.cached_prefix(prompt) // self.args.chars_per_token if self.args.prompt_cache else 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": int(cached_tokens)},
+        }
+
+    def cached_prefix(self, prompt: str, block: int = 1024) -> int:
+        """Length of the longest prompt prefix (in whole blocks) seen before, like provider prompt caches."""
+        cached = 0
+        with self._lock:
+            for end in range(block, len(prompt) + 1, block):
+                key = hash(prompt[:end])
+                if key in self._prefixes:
+                    cached = end
+                self._prefixes.add(key)
+        return cached
+
+    def record(self, key: str, seconds: float = 0.0) -> None:
+        with self._lock:
+            self.stats[key] += 1
+            self.latency_total += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            ok = self.stats["ok"]
+            return {**self.stats, "mean_latency_seconds": round(self.latency_total / ok, 3) if ok else None}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeLLM = None
+
+    def log_message(self, format, *args):
+        if self.fake.args.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str, kind: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"message": message, "type": kind, "code": status}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/v1/health"):
+            self._send_json(200, {"status": "ok"})
+        elif self.path.rstrip("/") in ("/stats", "/v1/stats"):
+            self._send_json(200, self.fake.snapshot())
+        elif self.path.rstrip("/") in ("/models", "/v1/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-llm", "object": "model", "owned_by": "local"}]})
+        else:
+            self._error(404, f"Unknown path {self.path}", "not_found")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+            return self._error(404, f"Unknown path {self.path}", "not_found")
+        if body.get("stream"):
+            return self._error(400, "Streaming is not supported by the fake server", "invalid_request_error")
+
+        fake, args = self.fake, self.fake.args
+        rng = fake.rng()
+        started_at = time.perf_counter()
+
+        roll = rng.random()
+        if roll < args.timeout_rate:
+            fake.record("hung")
+            time.sleep(args.hang_seconds)
+            return self._error(504, "Upstream timed out", "timeout")
+        if roll < args.timeout_rate + args.error_rate:
+            status = rng.choice(args.error_status)
+            fake.record(f"error_{status}")
+            headers = {"Retry-After": str(args.retry_after)} if status == 429 else None
+            return self._error(status, "Simulated provider error", "rate_limit_error" if status == 429 else "server_error",
+                               headers)
+
+        schema = fake.output_schema(body)
+        if schema is None:
+            fake.record("unrecognized")
+            return self._error(400, "Unrecognized prompt; send a json_schema response_format", "invalid_request_error")
+        content = json.dumps(fake.content(schema, body, rng), ensure_ascii=False)
+        usage = fake.usage(body, content, rng)
+
+        delay = args.latency(rng)
+        if args.output_tps:
+            delay += usage["completion_tokens"] / args.output_tps
+        time.sleep(max(0.0, delay - (time.perf_counter() - started_at)))
+        fake.record("ok", time.perf_counter() - started_at)
+        fake.record(f"schema_{getattr(schema, '__name__', 'json_schema')}")
+
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{rng.getrandbits(48):012x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-llm"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for the connection bursts of high-concurrency batches
+    request_queue_size = 1024
+
+
+def print_env(base_url: str) -> None:
+    """Shell exports that point every LLM role at the server, without fallback endpoints."""
+    for prefix, suffix in LLM_ROLE_SETTINGS:
+        for field, value in (("base_url", base_url), ("api_key", "fake-key"), ("llm", "fake-llm")):
+            print(f"export {prefix.upper()}_{field.upper()}{suffix}={value}")
+    print("export LLM_FALLBACK_ENDPOINTS='{}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=parse_distribution, default=parse_distribution("fixed:0.05"),
+                        help="Time to the response, e.g. fixed:0.05, uniform:0.2,1.5 or lognormal:0.8,0.5.")
+    parser.add_argument("--output-tps", type=float, default=0.0,
+                        help="Completion tokens per second added to the latency (0: none).")
+    parser.add_argument("--completion-tokens", type=parse_distribution, default=None,
+                        help="Reported completion tokens, e.g. normal:600,150 (default: size of the response).")
+    parser.add_argument("--chars-per-token", type=float, default=4.0, help="Characters per reported token.")
+    parser.add_argument("--prompt-cache", action="store_true",
+                        help="Report repeated prompt prefixes as cached tokens.")
+    parser.add_argument("--words", type=int, default=8, help="Words per generated text field.")
+    parser.add_argument("--approve-rate", type=float, default=0.5,
+                        help="Share of evaluation reports approved for the next stage.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error.")
+    parser.add_argument("--error-status", type=lambda s: [int(v) for v in s.split(",")], default=[429, 500, 503],
+                        help="Comma-separated statuses of the simulated errors.")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds of the 429 responses.")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Share of requests that hang.")
+    parser.add_argument("--hang-seconds", type=float, default=300.0, help="How long a hanging request hangs.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible responses and errors.")
+    parser.add_argument("--print-env", action="store_true",
+                        help="Print the exports that point every LLM role at the server and exit.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    if args.print_env:
+        print_env(f"http://{args.host}:{args.port}/v1")
+        return
+
+    Handler.fake = FakeLLM(args)
+    server = FakeServer((args.host, args.port), Handler)
+    print(f"Fake LLM server listening on http://{args.host}:{args.port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(Handler.fake.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Guideline token savings of the platform/direction/node section selection.
+
+For every ad platform and guideline node, compares the tokens of the full
+copywriting guideline with the sections actually embedded in that node's prompt
+(`src.agent.guideline.SECTION_INDEX`), plus the per-run total for a run with
+`--iterations` refinement rounds.
+
+    python benchmarks/guideline_sections.py [--direction testimonial] [--iterations 1] [--json]
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent.state import AdPlatform, CreativeDirection
+from src.agent.tokens import count_tokens
+from src.agent.guideline import GUIDELINE_NODES, ad_format, get_guideline_text, guideline_sections
+
+NODE_ORDER = ["creative_strategy", "script_generation", "script_evaluation", "script_refinement"]
+
+
+def calls_per_run(iterations: int) -> dict:
+    """Guideline-bearing LLM calls of a pre-review run with `iterations` refinement rounds."""
+    return {
+        "creative_strategy": 1,
+        "script_generation": 1,
+        "script_evaluation": iterations + 1,
+        "script_refinement": iterations,
+    }
+
+
+def measure(direction: CreativeDirection, iterations: int) -> list:
+    full_tokens = count_tokens(get_guideline_text())
+    calls = calls_per_run(iterations)
+    rows = []
+    for platform in AdPlatform:
+        nodes = {}
+        for node in NODE_ORDER:
+            sections = guideline_sections(platform, direction, node)
+            tokens = count_tokens(get_guideline_text(sections))
+            nodes[node] = {"sections": len(sections), "tokens": tokens, "saved": full_tokens - tokens}
+        rows.append({
+            "platform": platform.value,
+            "format": ad_format(platform),
+            "full_tokens": full_tokens,
+            "nodes": nodes,
+            "saved_per_run": sum(nodes[node]["saved"] * calls[node] for node in NODE_ORDER),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report guideline tokens saved per node by the section selection.")
+    parser.add_argument("--direction", default=CreativeDirection.testimonial.value,
+                        choices=[d.value for d in CreativeDirection],
+                        help="Creative direction of the brief. No SECTION_INDEX entry is limited to "
+                             "particular directions yet, so this does not change the figures.")
+    parser.add_argument("--iterations", type=int, default=1, help="Refinement rounds assumed per run.")
+    parser.add_argument("--json", action="store_true", help="Print the measurements as JSON.")
+    args = parser.parse_args()
+
+    if set(NODE_ORDER) != GUIDELINE_NODES:
+        parser.error(f"NODE_ORDER {sorted(NODE_ORDER)} does not match the guideline nodes {sorted(GUIDELINE_NODES)}")
+    rows = measure(CreativeDirection(args.direction), args.iterations)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"Full guideline: {rows[0]['full_tokens']:,} tokens | direction: {args.direction} | "
+          f"refinement rounds: {args.iterations}")
+    header = f"{'platform':<20}{'format':<8}" + "".join(f"{node:>20}" for node in NODE_ORDER) + f"{'saved/run':>12}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        cells = "".join(
+            f"{row['nodes'][node]['tokens']:>9,} (-{row['nodes'][node]['saved']:>6,})" for node in NODE_ORDER
+        )
+        print(f"{row['platform']:<20}{row['format']:<8}{cells}{row['saved_per_run']:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Prompt tokens and latency per serialization profile.
+
+Renders every message builder in `src/agent/utils.py` for each state in a JSONL
+file under the `pretty`, `compact` and `minimal` profiles and reports the mean
+prompt tokens, the saving relative to `pretty` and the mean build time. With
+`--invoke` each prompt is also sent to the configured model once per profile
+(bypassing the response cache) to measure the end-to-end call latency.
+
+The input is either the output of `batch-main.py` (completed runs carry the
+full state under `result`) or one AgentState-shaped record per line; builders
+whose inputs are missing from a state are skipped.
+
+    python benchmarks/serialization_profiles.py --input results.jsonl [--repeat 20] [--invoke] [--json]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from statistics import mean
+from collections import defaultdict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config.config import config, PromptSerialization
+from src.agent.llm import get_structured_llm
+from src.agent.tokens import count_message_tokens
+from src.agent.guideline import ad_format
+from src.agent.state import AgentState, AudienceInsight, EvaluationReport, VideoScriptDraft, StaticAdDraft
+from src.agent.nodes.creative_strategy import CreativeStrategyResponse
+from src.agent.utils import (build_audience_insight_message, build_creative_strategy_message,
+                             build_script_generation_message, build_evaluation_message,
+                             build_script_refinement_message, build_variation_generation_message)
+
+
+def _draft_schema(state: AgentState):
+    return StaticAdDraft if ad_format(state.ad_platform) == "static" else VideoScriptDraft
+
+
+# Builder name -> (builder, inputs present?, (LLM role, output schema) for --invoke)
+BUILDERS = {
+    "audience_insight": (build_audience_insight_message, lambda s: True,
+                         lambda s: ("audience_insight", AudienceInsight)),
+    "creative_strategy": (build_creative_strategy_message, lambda s: s.audience_insight is not None,
+                          lambda s: ("creative_strategy", CreativeStrategyResponse)),
+    "script_generation": (build_script_generation_message,
+                          lambda s: s.audience_insight is not None and s.core_message_pillars is not None,
+                          lambda s: ("script_generation1", _draft_schema(s))),
+    "script_evaluation": (build_evaluation_message,
+                          lambda s: s.audience_insight is not None and s.script_draft is not None,
+                          lambda s: ("script_evaluation_and_refinement", EvaluationReport)),
+    "script_refinement": (build_script_refinement_message,
+                          lambda s: s.audience_insight is not None and s.script_draft is not None
+                          and s.evaluation_report is not None,
+                          lambda s: ("script_evaluation_and_refinement", _draft_schema(s))),
+    "variation_generation": (build_variation_generation_message,
+                             lambda s: s.audience_insight is not None and s.script_draft is not None,
+                             lambda s: ("script_generation1", _draft_schema(s))),
+}
+
+
+def load_states(path: str) -> list:
+    states = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "result" in record:
+                if record.get("status") != "completed":
+                    continue
+                record = record["result"]
+            record.pop("brief_id", None)
+            states.append(AgentState(**record))
+    return states
+
+
+def measure(states: list, repeat: int, invoke: bool) -> dict:
+    results = defaultdict(dict)
+    for profile in PromptSerialization:
+        config.prompt_serialization = profile
+        for name, (build, ready, llm_role) in BUILDERS.items():
+            tokens, build_ms, call_s = [], [], []
+            for state in [s for s in states if ready(s)]:
+                messages = build(state)
+                tokens.append(count_message_tokens(messages))
+
+                started_at = time.perf_counter()
+                for _ in range(repeat):
+                    build(state)
+                build_ms.append((time.perf_counter() - started_at) / repeat * 1000)
+
+                if invoke:
+                    role, schema = llm_role(state)
+                    started_at = time.perf_counter()
+                    get_structured_llm(role, schema).runnable.invoke(messages)
+                    call_s.append(time.perf_counter() - started_at)
+
+            if tokens:
+                results[name][profile.value] = {
+                    "prompts": len(tokens),
+                    "prompt_tokens": round(mean(tokens)),
+                    "build_ms": round(mean(build_ms), 3),
+                    "call_seconds": round(mean(call_s), 3) if call_s else None,
+                }
+    config.prompt_serialization = PromptSerialization.pretty
+    return dict(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt tokens and latency of the serialization profiles.")
+    parser.add_argument("--input", default="results.jsonl", help="Batch results or AgentState JSONL file.")
+    parser.add_argument("--repeat", type=int, default=20, help="Builds per prompt when timing the builders.")
+    parser.add_argument("--invoke", action="store_true", help="Also time one model call per prompt and profile.")
+    parser.add_argument("--json", action="store_true", help="Print the measurements as JSON.")
+    args = parser.parse_args()
+
+    states = load_states(args.input)
+    if not states:
+        sys.exit(f"No usable states in {args.input}")
+    results = measure(states, args.repeat, args.invoke)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{len(states)} states from {args.input}")
+    header = f"{'builder':<22}{'profile':<10}{'prompts':>8}{'tokens':>10}{'vs pretty':>11}{'build ms':>10}"
+    if args.invoke:
+        header += f"{'call s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, profiles in results.items():
+        baseline = profiles["pretty"]["prompt_tokens"]
+        for profile, row in profiles.items():
+            change = f"{row['prompt_tokens'] / baseline - 1:+.1%}" if baseline and profile != "pretty" else "-"
+            line = (f"{name:<22}{profile:<10}{row['prompts']:>8}{row['prompt_tokens']:>10,}"
+                    f"{change:>11}{row['build_ms']:>10.3f}")
+            if args.invoke:
+                line += f"{row['call_seconds']:>9.3f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,71 @@
 import streamlit as st
-import time
 
-from src.agent.graph import build_pre_review_graph
+from src.agent.registry import get_graph
+from src.agent.checkpoint import stream_graph, new_run_id
 from src.agent.state import AgentState
 
 
+# Human readable names of the graph nodes shown while streaming
+NODE_LABELS = {
+    "audience_insight_node": "audience analysis",
+    "creative_strategy_node": "creative strategy",
+    "script_generation_node": "script writing",
+    "dual_script_generation_node": "script writing",
+    "script_evaluation_node": "quality evaluation",
+    "script_refinement_node": "script refinement",
+}
+
+
+# Workflow step (index into the page's step list) that runs after each node.
+# Evaluation and refinement alternate until the script is approved, so the
+# bar only reads complete once the stream has ended.
+NEXT_STEP = {
+    "audience_insight_node": 1,
+    "creative_strategy_node": 2,
+    "script_generation_node": 3,
+    "dual_script_generation_node": 3,
+    "script_evaluation_node": 4,
+    "script_refinement_node": 3,
+}
+
+
+def completed_steps(values: dict) -> int:
+    """Number of workflow steps whose output is already present in the streamed state."""
+    step_outputs = ['audience_insight', 'core_message_pillars', 'script_draft', 'evaluation_report']
+    done = 0
+    for field in step_outputs:
+        if not values.get(field):
+            break
+        done += 1
+    return done
+
+
+def render_progress(placeholder, steps, current_step: int, complete: bool, running: bool):
+    """Draws the progress bar and per-step status into `placeholder`."""
+    with placeholder.container():
+        st.progress(1.0 if complete else current_step / len(steps))
+
+        for i, (title, description) in enumerate(steps):
+            col1, col2, col3 = st.columns([1, 3, 6])
+
+            with col1:
+                if i < current_step or complete:
+                    st.write("✅")
+                elif i == current_step and running:
+                    st.write("🔄")
+                else:
+                    st.write("⏳")
+
+            with col2:
+                if i == current_step and running:
+                    st.write(f"**{title}**...")
+                else:
+                    st.write(f"**{title}**")
+
+            with col3:
+                st.write(description)
+
+
 def processing_ui():
     st.set_page_config(
         page_title="Processing Ad Script",
@@ -36,7 +97,7 @@ def processing_ui():
         """, unsafe_allow_html=True)
 
     st.title("🤖 Generating Your Ad Script...")
-    st.markdown("Please wait while our AI agents work on your script. This may take 2-5 minutes.")
+    st.markdown("Please wait while our AI agents work on your script. Progress updates as each step finishes.")
 
     # Check if we have the required state
     if 'agent_state' not in st.session_state:
@@ -62,109 +123,64 @@ def processing_ui():
         ("🔧 Refining Script", "Improving script based on evaluation")
     ]
 
-    # Create progress container
+    # Create progress container (redrawn in place as graph nodes finish)
     progress_container = st.container()
     with progress_container:
         st.subheader("Workflow Progress")
+        progress_placeholder = st.empty()
 
-        current_step = st.session_state.get('current_step', 0)
-
-        # Overall progress bar
-        if st.session_state.get('processing_complete'):
-            overall_progress = 1.0
-        else:
-            overall_progress = current_step / len(steps)
-
-        st.progress(overall_progress)
-
-        # Individual step status
-        for i, (title, description) in enumerate(steps):
-            col1, col2, col3 = st.columns([1, 3, 6])
-
-            with col1:
-                if i < current_step:
-                    st.write("✅")
-                elif i == current_step and st.session_state.get('processing_started'):
-                    st.write("🔄")
-                else:
-                    st.write("⏳")
-
-            with col2:
-                if i == current_step and st.session_state.get('processing_started'):
-                    st.write(f"**{title}**...")
-                else:
-                    st.write(f"**{title}**")
-
-            with col3:
-                st.write(description)
+    running = not st.session_state['processing_complete'] and not st.session_state['processing_error']
+    render_progress(progress_placeholder, steps, st.session_state['current_step'],
+                    st.session_state['processing_complete'], running)
 
     # Status messages
     status_container = st.container()
 
-    # Start processing if not started
-    if not st.session_state['processing_started']:
-        with st.spinner("Initializing workflow..."):
-            time.sleep(30)
+    # Run the workflow, advancing the progress as each node actually finishes
+    if running:
         st.session_state['processing_started'] = True
-        st.rerun()
-
-    # Run the workflow with simulated progress
-    if st.session_state['processing_started'] and not st.session_state['processing_complete'] and not st.session_state[
-        'processing_error']:
+        with status_container:
+            status_placeholder = st.empty()
+            status_placeholder.info("🚀 Workflow is running... This may take several minutes.")
 
         try:
-            with status_container:
-                st.info("🚀 Workflow is running... This may take several minutes.")
-
-            # Step 1: Analyzing Audience
-            if st.session_state['current_step'] == 0:
-                st.session_state['current_step'] = 1
-                st.rerun()
-
-            # Step 2: Creating Strategy
-            elif st.session_state['current_step'] == 1:
-                time.sleep(30)  # Show progress for a moment
-                st.session_state['current_step'] = 2
-                st.rerun()
-
-            # Step 3: Writing Script
-            elif st.session_state['current_step'] == 2:
-                time.sleep(30)
-                st.session_state['current_step'] = 3
-                st.rerun()
-
-            # Step 4: Evaluating Quality
-            elif st.session_state['current_step'] == 3:
-                time.sleep(30)
-                st.session_state['current_step'] = 4
-                st.rerun()
-
-            # Final step: Run the actual workflow
-            elif st.session_state['current_step'] == 4:
-                with st.spinner("Finalizing your ad script..."):
-                    # Build and run the graph
-                    graph = build_pre_review_graph()
-                    agent_state = st.session_state['agent_state']
-
-                    # Run the workflow
-                    result_dict = graph.invoke(agent_state)
-
-                    # Convert dictionary back to AgentState object
-                    try:
-                        result = AgentState(**result_dict)
-                    except Exception:
-                        result = result_dict
-
-                    # Store result
-                    st.session_state['workflow_result'] = result
-                    st.session_state['processing_complete'] = True
-                    st.session_state['current_step'] = len(steps)
-
-                st.rerun()
+            graph = get_graph("pre_review")
+            agent_state = st.session_state['agent_state']
+
+            # A retry with the same run id resumes from the last completed node
+            if 'run_id' not in st.session_state:
+                st.session_state['run_id'] = new_run_id()
+
+            result_dict = None
+            seen_update = False
+            for mode, chunk in stream_graph(graph, agent_state, st.session_state['run_id']):
+                if mode == "values":
+                    result_dict = chunk
+                    if not seen_update:
+                        # Resumed runs start from the outputs already checkpointed
+                        st.session_state['current_step'] = completed_steps(chunk)
+                else:
+                    seen_update = True
+                    for node_name in chunk:
+                        st.session_state['current_step'] = NEXT_STEP.get(node_name, st.session_state['current_step'])
+                        status_placeholder.info(f"🚀 Finished {NODE_LABELS.get(node_name, node_name)}, continuing...")
+                render_progress(progress_placeholder, steps, st.session_state['current_step'], False, True)
+
+            # Convert dictionary back to AgentState object
+            try:
+                result = AgentState(**result_dict)
+            except Exception:
+                result = result_dict
+
+            # Store result
+            st.session_state['workflow_result'] = result
+            st.session_state['processing_complete'] = True
+            st.session_state['current_step'] = len(steps)
 
         except Exception as e:
             st.session_state['processing_error'] = str(e)
-            st.rerun()
+
+        st.rerun()
 
     # Handle completion (rest of your existing code...)
     if st.session_state['processing_complete']:
@@ -216,7 +232,7 @@ def processing_ui():
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("Try Again"):
-                    # Reset processing state
+                    # Reset processing state (run_id is kept, so the run resumes from its last checkpoint)
                     st.session_state['processing_started'] = False
                     st.session_state['processing_complete'] = False
                     st.session_state['processing_error'] = None
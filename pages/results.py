@@ -2,7 +2,7 @@ import streamlit as st
 import json
 from src.agent.state import AgentState
 from src.ui_components.display import display_video_script, display_static_script, display_evaluation_scores, \
-    display_iteration_history
+    display_iteration_history, display_call_timeline
 
 
 def safe_get_attribute(obj, attr_name, default=None):
@@ -213,6 +213,10 @@ def results_ui():
         iteration_history = safe_get_attribute(result, 'script_iteration_history')
         display_iteration_history(iteration_history)
 
+        # LLM call timeline
+        call_traces = safe_get_attribute(result, 'tool_calls_history')
+        display_call_timeline(call_traces)
+
     with tab4:
         st.subheader("💾 Export Your Script")
         st.markdown("Download your ad script in various formats:")
@@ -341,7 +345,7 @@ KEY TAKEAWAY: {key_takeaway}
         if st.button("🔄 Generate New Script", use_container_width=True):
             # Clear session state and go back to form
             keys_to_clear = ['agent_state', 'workflow_result', 'processing_started', 'processing_complete',
-                             'processing_error']
+                             'processing_error', 'current_step', 'run_id']
             for key in keys_to_clear:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -354,8 +358,9 @@ KEY TAKEAWAY: {key_takeaway}
 
     with col4:
         if st.button("🔄 Rerun Workflow", use_container_width=True):
-            # Keep agent state but clear results
-            keys_to_clear = ['workflow_result', 'processing_started', 'processing_complete', 'processing_error']
+            # Keep agent state but clear results (and the run id, so a fresh run is started)
+            keys_to_clear = ['workflow_result', 'processing_started', 'processing_complete', 'processing_error',
+                             'current_step', 'run_id']
             for key in keys_to_clear:
                 if key in st.session_state:
                     del st.session_state[key]
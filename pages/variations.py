@@ -1,6 +1,7 @@
 import streamlit as st
 import time
-from src.agent.graph import build_variation_graph
+from src.agent.registry import get_graph
+from src.agent.checkpoint import invoke_graph, new_run_id
 from src.agent.state import AgentState
 from src.ui_components.display import display_video_script, display_static_script
 
@@ -230,6 +231,8 @@ def variations_ui():
     if not st.session_state['variations_generated'] and not st.session_state['generating_variations']:
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
+            st.number_input("Number of A/B variants (generated in parallel)", min_value=1, max_value=6,
+                            value=st.session_state.get('variation_count', 1), key='variation_count')
             if st.button("🧪 Generate Enhanced A/B Test Variant", type="primary", use_container_width=True):
                 st.session_state['generating_variations'] = True
                 st.rerun()
@@ -245,8 +248,8 @@ def variations_ui():
         """, unsafe_allow_html=True)
         try:
             with st.spinner("Generating and refining your A/B test variant..."):
-                # Build and run the variation graph
-                variation_graph = build_variation_graph()
+                # Run the variation graph compiled once per process
+                variation_graph = get_graph("variation")
                 if isinstance(base_result, dict):
                     try:
                         agent_state = AgentState(**base_result)
@@ -254,7 +257,15 @@ def variations_ui():
                         agent_state = base_result
                 else:
                     agent_state = base_result
-                result = variation_graph.invoke(agent_state)
+                if isinstance(agent_state, AgentState):
+                    agent_state = agent_state.model_copy(
+                        update={"variation_count": st.session_state.get('variation_count', 1)}
+                    )
+                # Kept after a failure so the next attempt resumes the unfinished variants
+                if 'variation_run_id' not in st.session_state:
+                    st.session_state['variation_run_id'] = new_run_id()
+                result = invoke_graph(variation_graph, agent_state, st.session_state['variation_run_id'])
+                del st.session_state['variation_run_id']
                 st.session_state['variations_result'] = result
                 st.session_state['variations_generated'] = True
                 st.session_state['generating_variations'] = False
@@ -270,70 +281,26 @@ def variations_ui():
     if st.session_state['variations_generated'] and st.session_state['variations_result']:
         st.subheader("🎭 Generated Enhanced A/B Test Variant")
         variations_result = st.session_state['variations_result']
-        # Get single variation result
+        # Get all variation results (falls back to the single best variation)
         if isinstance(variations_result, dict):
+            variations = variations_result.get('variation_results') or []
             single_variation = variations_result.get('single_variation_result')
         else:
+            variations = getattr(variations_result, 'variation_results', None) or []
             single_variation = getattr(variations_result, 'single_variation_result', None)
-        if single_variation:
-            if hasattr(single_variation, 'variation_name'):
-                variation_name = single_variation.variation_name
-                variation_type = single_variation.variation_type
-                comparison = single_variation.base_script_comparison
-                notes = single_variation.notes
-                iteration_count = single_variation.variation_iteration_count
-                eval_report = single_variation.variation_evaluation_report
-                variant_script = single_variation.ad_script_variation
+        if not variations and single_variation:
+            variations = [single_variation]
+        if variations:
+            if len(variations) > 1:
+                tabs = st.tabs([
+                    v.variation_name if hasattr(v, 'variation_name') else v.get('variation_name', f'Variant {i + 1}')
+                    for i, v in enumerate(variations)
+                ])
+                for tab, variation in zip(tabs, variations):
+                    with tab:
+                        display_single_variation(variation)
             else:
-                variation_name = single_variation.get('variation_name', 'Enhanced A/B Variant')
-                variation_type = single_variation.get('variation_type', 'Enhanced Variant')
-                comparison = single_variation.get('base_script_comparison', '')
-                notes = single_variation.get('notes', '')
-                iteration_count = single_variation.get('variation_iteration_count', 0)
-                eval_report = single_variation.get('variation_evaluation_report')
-                variant_script = single_variation.get('ad_script_variation')
-
-            # Stats
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Refinement Iterations", iteration_count)
-            with col2:
-                if eval_report:
-                    if isinstance(eval_report, dict):
-                        overall_score = eval_report.get('overall_score', 0)
-                    else:
-                        overall_score = eval_report.overall_score
-                    st.metric("Final Quality Score", f"{overall_score:.1f}/5.0")
-                else:
-                    st.metric("Final Quality Score", "N/A")
-            with col3:
-                st.metric("Status", "✅ Ready for A/B Testing")
-
-            st.markdown(f"""
-            <div class="variant-card">
-                <div class="variant-header">
-                    <div class="variant-badge">{variation_type}</div>
-                    <h3 class="variant-title">{variation_name}</h3>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            if comparison:
-                st.markdown(f"**🔄 Changes Made:** {comparison}")
-            if notes:
-                st.markdown(f"**📝 Quality Notes:** {notes}")
-            st.markdown("---")
-            # Display the variation script
-            if variant_script:
-                if isinstance(variant_script, dict):
-                    script_type = variant_script.get('script_type', 'Video')
-                else:
-                    script_type = getattr(variant_script, 'script_type', 'Video')
-                if script_type == "Video":
-                    display_video_script(variant_script)
-                else:
-                    display_static_script(variant_script)
-            else:
-                st.error("❌ No variant script found to display.")
+                display_single_variation(variations[0])
             st.markdown("---")
             # Actions
             st.subheader("🚀 Next Steps")
@@ -360,5 +327,67 @@ def variations_ui():
                 st.session_state['generating_variations'] = False
                 st.rerun()
 
+
+def display_single_variation(single_variation):
+    """Renders one refined A/B variant (stats, badge, notes and script)."""
+    if hasattr(single_variation, 'variation_name'):
+        variation_name = single_variation.variation_name
+        variation_type = single_variation.variation_type
+        comparison = single_variation.base_script_comparison
+        notes = single_variation.notes
+        iteration_count = single_variation.variation_iteration_count
+        eval_report = single_variation.variation_evaluation_report
+        variant_script = single_variation.ad_script_variation
+    else:
+        variation_name = single_variation.get('variation_name', 'Enhanced A/B Variant')
+        variation_type = single_variation.get('variation_type', 'Enhanced Variant')
+        comparison = single_variation.get('base_script_comparison', '')
+        notes = single_variation.get('notes', '')
+        iteration_count = single_variation.get('variation_iteration_count', 0)
+        eval_report = single_variation.get('variation_evaluation_report')
+        variant_script = single_variation.get('ad_script_variation')
+
+    # Stats
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Refinement Iterations", iteration_count)
+    with col2:
+        if eval_report:
+            if isinstance(eval_report, dict):
+                overall_score = eval_report.get('overall_score', 0)
+            else:
+                overall_score = eval_report.overall_score
+            st.metric("Final Quality Score", f"{overall_score:.1f}/5.0")
+        else:
+            st.metric("Final Quality Score", "N/A")
+    with col3:
+        st.metric("Status", "✅ Ready for A/B Testing")
+
+    st.markdown(f"""
+    <div class="variant-card">
+        <div class="variant-header">
+            <div class="variant-badge">{variation_type}</div>
+            <h3 class="variant-title">{variation_name}</h3>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    if comparison:
+        st.markdown(f"**🔄 Changes Made:** {comparison}")
+    if notes:
+        st.markdown(f"**📝 Quality Notes:** {notes}")
+    st.markdown("---")
+    # Display the variation script
+    if variant_script:
+        if isinstance(variant_script, dict):
+            script_type = variant_script.get('script_type', 'Video')
+        else:
+            script_type = getattr(variant_script, 'script_type', 'Video')
+        if script_type == "Video":
+            display_video_script(variant_script)
+        else:
+            display_static_script(variant_script)
+    else:
+        st.error("❌ No variant script found to display.")
+
 if __name__ == "__main__":
     variations_ui()
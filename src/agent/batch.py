@@ -0,0 +1,242 @@
+"""
+Bulk campaign runner.
+
+Streams AgentState-shaped JSONL briefs through the async pre-review graph with a
+bounded number of briefs in flight. Input lines are read lazily, every finished
+brief is written to the output JSONL as soon as it completes, and records that
+cannot be parsed or validated are written to a quarantine file instead of
+aborting the batch.
+
+A run replaces the output and quarantine files of the previous one. With
+`append=True` (`--append`) it adds to them instead, skipping briefs whose
+record is already there: a brief completed with the same run id and input, or
+an invalid line already quarantined. Rerunning a batch with `--append` thus
+only adds the briefs that failed or changed.
+
+When checkpointing is enabled every brief runs under the run id
+`<input file stem>-<brief_id>`, so re-running the same input resumes failed
+briefs from their last completed node and returns finished ones from the
+checkpoint store. A brief whose content changed since the last run starts over.
+"""
+# Import libraries
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple, Union
+from pydantic import BaseModel, Field, ValidationError
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+from src.agent.state import AgentState
+from src.agent.registry import get_graph
+from src.agent.checkpoint import ainvoke_graph, input_fingerprint
+from src.agent.http_clients import get_connection_stats
+from src.agent.response_cache import get_cache_stats
+from src.agent.stage_cache import get_stage_cache_stats
+from src.agent.history import get_history_stats
+from src.agent.budget import get_prompt_budget_stats
+from src.agent.llm import get_prompt_cache_stats
+from src.agent.resilience import get_resilience_stats
+from src.agent.rate_limit import get_rate_limit_stats
+from src.agent.routing import get_routing_stats
+from src.agent.metrics import get_llm_metrics_summary
+
+
+logger = get_logger(__name__)
+
+
+class BatchSummary(BaseModel):
+    """Counters reported once a batch has been drained."""
+    total_records: int = Field(default=0, description="Number of non-empty input lines read.")
+    completed: int = Field(default=0, description="Briefs that ran through the graph successfully.")
+    failed: int = Field(default=0, description="Valid briefs whose graph run raised an error.")
+    quarantined: int = Field(default=0, description="Records rejected before running the graph.")
+    skipped: int = Field(default=0, description="Records already in the output of an earlier run (append mode only).")
+    elapsed_seconds: float = Field(default=0.0, description="Wall time of the whole batch.")
+    http_connections: Dict = Field(default_factory=dict, description="Connection reuse counters of the shared LLM HTTP pool.")
+    llm_cache: Dict = Field(default_factory=dict, description="LLM response cache hits and misses per node.")
+    stage_cache: Dict = Field(default_factory=dict, description="Stage cache hits and misses per stage.")
+    prompt_history: Dict = Field(default_factory=dict, description="Prompt tokens before/after history compaction per node.")
+    prompt_budget: Dict = Field(default_factory=dict, description="Prompt tokens, truncations and budget rejections per node.")
+    prompt_cache: Dict = Field(default_factory=dict, description="Input tokens served from the provider prompt cache per node.")
+    llm_calls: Dict = Field(default_factory=dict, description="Retries, timeouts, hedged requests and latency percentiles per node.")
+    rate_limits: Dict = Field(default_factory=dict, description="Paced requests, token estimates and waits per rate-limited endpoint.")
+    endpoints: Dict = Field(default_factory=dict, description="Calls, failures, failovers and latency/error EWMAs per LLM endpoint.")
+    llm_metrics: Dict = Field(default_factory=dict, description="Call outcomes, tokens and latency percentiles per node.")
+
+
+def iter_brief_records(input_path: Union[str, Path]) -> Iterator[Tuple[int, str, Union[AgentState, Exception], str]]:
+    """
+    Lazily yields `(line_number, brief_id, AgentState | error, raw_line)` for each non-empty line.
+
+    An optional `brief_id` key identifies the record in the output; it defaults to the line number.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            brief_id = f"line-{line_number}"
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Brief record must be a JSON object.")
+                brief_id = str(record.pop("brief_id", brief_id))
+                yield line_number, brief_id, AgentState(**record), line
+            except (json.JSONDecodeError, ValidationError, ValueError) as e:
+                yield line_number, brief_id, e, line
+
+
+class _JsonlWriter:
+    """Writes one JSON document per line and flushes so partial batches stay readable."""
+
+    def __init__(self, path: Path, append: bool = False):
+        self.path = path
+        self._file = None
+        if not append and path.exists():
+            # Replace the previous run's records rather than mixing runs
+            path.unlink()
+
+    def write(self, record: Dict) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def _read_records(path: Path) -> Iterator[Dict]:
+    if not path.exists():
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def _completed_briefs(output_path: Path) -> Set[Tuple[str, str]]:
+    """(run id, input fingerprint) of the briefs an earlier run completed."""
+    return {(record.get("run_id"), record.get("input_fingerprint"))
+            for record in _read_records(output_path) if record.get("status") == "completed"}
+
+
+def _quarantined_lines(quarantine_path: Path) -> Set[str]:
+    return {record.get("raw") for record in _read_records(quarantine_path)}
+
+
+async def run_batch(
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
+        quarantine_path: Optional[Union[str, Path]] = None,
+        concurrency: Optional[int] = None,
+        graph=None,
+        append: bool = False,
+) -> BatchSummary:
+    """
+    Runs every brief in `input_path` through the pre-review graph.
+
+    At most `concurrency` briefs (default `config.batch_concurrency`) are in flight at once;
+    the input file is only read ahead as fast as slots free up. With `append`, the
+    records are added to the existing output and quarantine files, and briefs already
+    recorded there are skipped.
+    """
+    concurrency = concurrency or config.batch_concurrency
+    output_path = Path(output_path)
+    quarantine_path = Path(quarantine_path) if quarantine_path else output_path.with_suffix(".quarantine.jsonl")
+    graph = graph or get_graph("async_pre_review")
+    run_id_prefix = Path(input_path).stem
+
+    completed_before = _completed_briefs(output_path) if append else set()
+    quarantined_before = _quarantined_lines(quarantine_path) if append else set()
+
+    summary = BatchSummary()
+    results = _JsonlWriter(output_path, append)
+    quarantine = _JsonlWriter(quarantine_path, append)
+    slots = asyncio.Semaphore(concurrency)
+    in_flight = set()
+    started_at = time.perf_counter()
+
+    async def run_one(line_number: int, brief_id: str, run_id: str, fingerprint: str, state: AgentState) -> None:
+        run_started_at = time.perf_counter()
+        record = {"brief_id": brief_id, "run_id": run_id, "input_fingerprint": fingerprint, "line": line_number}
+        try:
+            result_dict = await ainvoke_graph(graph, state, run_id)
+            result = AgentState(**result_dict)
+            record.update({
+                "status": "completed",
+                "result": result.model_dump(mode="json"),
+            })
+            summary.completed += 1
+        except Exception as e:
+            logger.error(f"Brief {brief_id} failed: {e}", exc_info=True)
+            record.update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+            summary.failed += 1
+        finally:
+            slots.release()
+
+        record["elapsed_seconds"] = round(time.perf_counter() - run_started_at, 3)
+        results.write(record)
+
+    try:
+        for line_number, brief_id, item, raw_line in iter_brief_records(input_path):
+            summary.total_records += 1
+
+            if isinstance(item, Exception):
+                if raw_line in quarantined_before:
+                    summary.skipped += 1
+                    continue
+                logger.warning(f"Quarantining brief {brief_id} (line {line_number}): {item}")
+                quarantine.write({
+                    "brief_id": brief_id,
+                    "line": line_number,
+                    "error": f"{type(item).__name__}: {item}",
+                    "raw": raw_line,
+                })
+                summary.quarantined += 1
+                continue
+
+            run_id = f"{run_id_prefix}-{brief_id}"
+            fingerprint = input_fingerprint(item)
+            if (run_id, fingerprint) in completed_before:
+                summary.skipped += 1
+                continue
+
+            # Wait for a free slot before reading further into the file
+            await slots.acquire()
+            task = asyncio.create_task(run_one(line_number, brief_id, run_id, fingerprint, item))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    finally:
+        # Let briefs already in flight finish and be recorded before closing the files
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        results.close()
+        quarantine.close()
+
+    summary.elapsed_seconds = round(time.perf_counter() - started_at, 3)
+    summary.http_connections = get_connection_stats()
+    summary.llm_cache = get_cache_stats()
+    summary.stage_cache = get_stage_cache_stats()
+    summary.prompt_history = get_history_stats()
+    summary.prompt_budget = get_prompt_budget_stats()
+    summary.prompt_cache = get_prompt_cache_stats()
+    summary.llm_calls = get_resilience_stats()
+    summary.rate_limits = get_rate_limit_stats()
+    summary.endpoints = get_routing_stats()
+    summary.llm_metrics = get_llm_metrics_summary()
+    logger.info(f"Batch finished: {summary.model_dump()}")
+    return summary
+
+
+__all__ = ['run_batch', 'iter_brief_records', 'BatchSummary']
@@ -0,0 +1,138 @@
+"""
+Per-node prompt token budgets.
+
+Every node renders its messages through `fit_prompt`, which counts the prompt
+tokens locally (see `src.agent.tokens`) before the LLM is called. Budgets are
+configured per node in `PROMPT_TOKEN_BUDGETS` (a node without a budget is only
+measured). When a prompt is over budget, deterministic truncation steps are
+applied in order until it fits:
+
+1. copywriting guideline sections, dropped from the last one to the first;
+2. iteration history, first compacting every entry, then dropping it;
+3. audience insights, keeping only the first 3 and then 1 item of each list.
+
+A prompt that still does not fit raises `PromptBudgetExceeded` instead of
+paying for a request that the model would reject or answer slowly.
+"""
+# Import libraries
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from langchain_core.messages import BaseMessage
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+from src.agent.state import AgentState
+from src.agent.tokens import count_message_tokens
+from src.agent.guideline import guideline_service
+
+logger = get_logger(__name__)
+
+# Items kept per audience insight list by the successive insight truncation steps
+_INSIGHT_ITEM_STEPS = [3, 1]
+
+
+class PromptTrim(NamedTuple):
+    """Truncation applied by a message builder; `None` leaves that part of the prompt untouched."""
+    guideline_sections: Optional[int] = None
+    history_keep_last: Optional[int] = None
+    history_token_budget: Optional[int] = None
+    insight_items: Optional[int] = None
+
+
+NO_TRIM = PromptTrim()
+
+
+class PromptBudgetExceeded(ValueError):
+    """Raised when a prompt does not fit its node's token budget even after truncation."""
+
+    def __init__(self, node: str, tokens: int, budget: int):
+        self.node = node
+        self.tokens = tokens
+        self.budget = budget
+        super().__init__(f"Prompt for {node} needs {tokens} tokens after truncation, over its budget of {budget}")
+
+
+def get_prompt_budget(node: str) -> int:
+    """Token budget of `node` (0 means unlimited)."""
+    return config.prompt_token_budgets.get(node, 0)
+
+
+def _trim_steps() -> Iterator[PromptTrim]:
+    """Cumulative truncation steps in policy order: guideline, history, insights."""
+    trim = NO_TRIM
+    for sections in range(guideline_service.section_count() - 1, -1, -1):
+        trim = trim._replace(guideline_sections=sections)
+        yield trim
+    trim = trim._replace(history_keep_last=0)
+    yield trim
+    trim = trim._replace(history_token_budget=1)
+    yield trim
+    for items in _INSIGHT_ITEM_STEPS:
+        trim = trim._replace(insight_items=items)
+        yield trim
+
+
+def _trim_insights(state: AgentState, items: Optional[int]) -> AgentState:
+    if items is None or state.audience_insight is None:
+        return state
+    insight = state.audience_insight
+    trimmed = insight.model_copy(update={
+        field: value[:items]
+        for field, value in insight
+        if isinstance(value, list)
+    })
+    return state.model_copy(update={"audience_insight": trimmed})
+
+
+_stats = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "max_prompt_tokens": 0, "trimmed": 0, "rejected": 0})
+_stats_lock = threading.Lock()
+
+
+def _record(node: str, tokens: int, trimmed: bool = False, rejected: bool = False) -> None:
+    with _stats_lock:
+        stats = _stats[node]
+        stats["calls"] += 1
+        stats["prompt_tokens"] += tokens
+        stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], tokens)
+        stats["trimmed"] += int(trimmed)
+        stats["rejected"] += int(rejected)
+
+
+def fit_prompt(node: str, build: Callable[..., List[BaseMessage]], state: AgentState) -> List[BaseMessage]:
+    """
+    Render the messages of `node` with `build` and enforce the node's token budget.
+
+    `build(state, trim=...)` must honour the `PromptTrim` it is given. Returns the
+    untruncated messages when they fit, else the first truncation step that does.
+    """
+    messages = build(state, trim=NO_TRIM)
+    tokens = count_message_tokens(messages)
+    budget = get_prompt_budget(node)
+    if not budget or tokens <= budget:
+        _record(node, tokens)
+        return messages
+
+    untrimmed_tokens = tokens
+    for trim in _trim_steps():
+        messages = build(_trim_insights(state, trim.insight_items), trim=trim)
+        tokens = count_message_tokens(messages)
+        if tokens <= budget:
+            logger.warning(f"{node} prompt over its budget of {budget} tokens ({untrimmed_tokens}), "
+                           f"truncated to {tokens} tokens with {trim}")
+            _record(node, tokens, trimmed=True)
+            return messages
+
+    _record(node, tokens, rejected=True)
+    raise PromptBudgetExceeded(node, tokens, budget)
+
+
+def get_prompt_budget_stats() -> Dict[str, Dict[str, int]]:
+    """Per-node prompt token counts, truncations and rejections since start."""
+    with _stats_lock:
+        return {node: dict(stats) for node, stats in _stats.items()}
+
+
+__all__ = ['PromptTrim', 'NO_TRIM', 'PromptBudgetExceeded', 'get_prompt_budget', 'fit_prompt',
+           'get_prompt_budget_stats']
@@ -0,0 +1,65 @@
+"""
+Per-run call traces in `AgentState.tool_calls_history`.
+
+Each node appends a compact `LLMCallTrace` of its LLM call to the state: node,
+model, endpoint, latency, tokens, cache hit, retries and a hash of the prompt
+instead of its text. The list is a ring buffer of the latest
+`CALL_TRACE_MAX_ENTRIES` calls, so checkpoints do not grow with the number of
+refinement rounds, and the results page renders it as a timeline of the run.
+
+The trace is built from the `src.agent.metrics` record of the last call the
+node made; a node that reused a stage cache result records a `stage_cache_hit`.
+"""
+# Import libraries
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from src.config.config import config
+from src.agent.state import AgentState, LLMCallTrace
+from src.agent.metrics import LLMCallMetrics, take_last_call
+
+
+def call_trace_from(record: LLMCallMetrics) -> LLMCallTrace:
+    """Compact trace of a call metrics record."""
+    models = list(record.tokens)
+    return LLMCallTrace(
+        node=record.node,
+        started_at=datetime.fromtimestamp(record.started_at),
+        latency_seconds=record.duration_seconds or 0.0,
+        model=", ".join(models) if models else None,
+        endpoint=record.endpoint,
+        input_tokens=sum(usage["input_tokens"] for usage in record.tokens.values()),
+        output_tokens=sum(usage["output_tokens"] for usage in record.tokens.values()),
+        cached_input_tokens=sum(usage["cached_input_tokens"] for usage in record.tokens.values()),
+        cache_hit=record.outcome == "cache_hit",
+        retries=max(record.requests - 1, 0),
+        outcome=record.outcome,
+        prompt_hash=record.prompt_hash,
+    )
+
+
+def _bounded(traces: List[LLMCallTrace]) -> List[LLMCallTrace]:
+    return traces[-config.call_trace_max_entries:]
+
+
+def record_call_trace(state: AgentState, node: str) -> List[LLMCallTrace]:
+    """
+    `tool_calls_history` of `state` with the trace of the node's last call appended
+    (or a `stage_cache_hit` trace when the node made no call).
+    """
+    record = take_last_call()
+    if record is not None and record.node == node:
+        trace = call_trace_from(record)
+    else:
+        trace = LLMCallTrace(node=node, started_at=datetime.now(), cache_hit=True, outcome="stage_cache_hit")
+    return _bounded([*(state.tool_calls_history or []), trace])
+
+
+def merge_call_traces(base: Optional[List[LLMCallTrace]], branches: Iterable[Optional[List[LLMCallTrace]]]) -> List[LLMCallTrace]:
+    """Traces of `base` plus the new traces of parallel branches that started from it, in start order."""
+    base = list(base or [])
+    new = [trace for branch in branches for trace in (branch or []) if trace not in base]
+    return _bounded(base + sorted(new, key=lambda trace: trace.started_at))
+
+
+__all__ = ['call_trace_from', 'record_call_trace', 'merge_call_traces']
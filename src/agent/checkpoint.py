@@ -0,0 +1,440 @@
+"""
+Checkpointing for graph runs.
+
+Every graph can be compiled with a checkpointer so that a run identified by a
+run id (the LangGraph `thread_id`) keeps the state of each completed node. A run
+that fails half-way (timeout during refinement, provider error, ...) can then be
+resumed from the last completed node instead of starting again from the audience
+insight.
+
+Checkpoints are keyed by the run id together with a fingerprint of the input
+state (`input_fingerprint`), so a run is only resumed, or its finished result
+returned, when it is invoked again with the same input; a run id that comes back
+with a different brief starts a new run.
+
+Backends (selected with `CHECKPOINT_BACKEND`):
+- `none`: no checkpointing (previous behaviour)
+- `memory`: in-process only, survives Streamlit reruns but not a restart
+- `sqlite`: local file, works offline
+- `mongodb`: shared store through `langgraph-checkpoint-mongodb`
+"""
+# Import libraries
+import json
+import uuid
+import hashlib
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.config.config import config, CheckpointBackend
+from src.config.logging_config import get_logger
+from src.agent.metrics import run_context
+from src.agent.tracing import tracer, span, use_span
+
+logger = get_logger(__name__)
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Checkpoint saver backed by a local SQLite file (stdlib `sqlite3`).
+
+    Each checkpoint is stored as a single serialized row together with the pending
+    writes of its tasks, so a run can be listed, inspected and resumed after a crash.
+    Async methods run the blocking queries in a worker thread.
+    """
+
+    def __init__(self, path: str, *, serde=None) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self._setup()
+
+    def _setup(self) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT,
+                    type TEXT,
+                    checkpoint BLOB,
+                    metadata_type TEXT,
+                    metadata BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT,
+                    value BLOB,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                )
+            """)
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the latest one of the thread when no `checkpoint_id` is given."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+
+        with self.lock:
+            row = self.conn.execute(query, params).fetchone()
+            return self._to_tuple(row) if row else None
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first, optionally filtered by thread, metadata and `before`."""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+            items = []
+            for row in rows:
+                if limit is not None and len(items) >= limit:
+                    break
+                item = self._to_tuple(row)
+                # Metadata is serialized, so filtering happens after loading
+                if filter and not all(item.metadata.get(key) == value for key, value in filter.items()):
+                    continue
+                items.append(item)
+
+        yield from items
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint and return the config pointing at it."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized_checkpoint,
+                    metadata_type,
+                    serialized_metadata,
+                ),
+            )
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        """Store the writes of a task that completed after the given checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self.lock, self.conn:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                type_, serialized_value = self.serde.dumps_typed(value)
+                # Special writes (errors, interrupts...) are overwritten, regular writes are kept once
+                statement = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+                self.conn.execute(
+                    f"{statement} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, "
+                    "type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, serialized_value, task_path),
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint and write of a run."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def build_checkpointer(backend: Optional[CheckpointBackend] = None) -> Optional[BaseCheckpointSaver]:
+    """Create a checkpointer for the given backend (default `config.checkpoint_backend`)."""
+    backend = CheckpointBackend(backend or config.checkpoint_backend)
+
+    if backend == CheckpointBackend.none:
+        return None
+    if backend == CheckpointBackend.memory:
+        return InMemorySaver()
+    if backend == CheckpointBackend.sqlite:
+        logger.info(f"Using SQLite checkpoints at {config.checkpoint_sqlite_path}")
+        return SqliteCheckpointSaver(config.checkpoint_sqlite_path)
+    if backend == CheckpointBackend.mongodb:
+        # Optional dependency, only needed for the MongoDB backend
+        from pymongo import MongoClient
+        from langgraph.checkpoint.mongodb import MongoDBSaver
+
+        logger.info(f"Using MongoDB checkpoints in database '{config.checkpoint_mongodb_db}'")
+        return MongoDBSaver(MongoClient(config.checkpoint_mongodb_uri), db_name=config.checkpoint_mongodb_db)
+
+    raise ValueError(f"Checkpoint backend {backend} is not supported.")
+
+
+@lru_cache(maxsize=None)
+def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """Process-wide checkpointer for the configured backend, so every graph shares the same store."""
+    return build_checkpointer()
+
+
+def new_run_id() -> str:
+    """Return a fresh run id, used as the LangGraph `thread_id`."""
+    return uuid.uuid4().hex
+
+
+def input_fingerprint(state: Any) -> str:
+    """Short SHA-256 of a graph input (an AgentState or a state dict)."""
+    if isinstance(state, BaseModel):
+        state = state.model_dump(mode="json")
+    encoded = json.dumps(state, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def run_config(run_id: str, state: Any = None) -> RunnableConfig:
+    """
+    Graph config that binds an invocation to the checkpoints of `run_id`; with
+    `state`, to those of the run that `run_id` started with this input.
+    """
+    thread_id = run_id if state is None else f"{run_id}:{input_fingerprint(state)}"
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _resume_plan(snapshot, run_id: str) -> str:
+    """`start` a new run, `resume` an interrupted one, or reuse a run that is already `done`."""
+    if not snapshot.values:
+        return "start"
+    if snapshot.next:
+        logger.info(f"Resuming run {run_id} from {', '.join(snapshot.next)}")
+        return "resume"
+    logger.info(f"Run {run_id} already completed with the same input, returning its checkpointed state")
+    return "done"
+
+
+def invoke_graph(graph, state, run_id: Optional[str] = None) -> dict:
+    """
+    Run `state` through `graph`; with a checkpointer and a `run_id` that already has
+    checkpoints for the same `state`, continue from the last completed node instead
+    of starting over.
+    """
+    with run_context(run_id), span("graph_run", root=True, **{"agent.run_id": run_id}):
+        if graph.checkpointer is None or run_id is None:
+            return graph.invoke(state)
+
+        run = run_config(run_id, state)
+        snapshot = graph.get_state(run)
+        plan = _resume_plan(snapshot, run_id)
+        if plan == "done":
+            return snapshot.values
+        return graph.invoke(None if plan == "resume" else state, run)
+
+
+def _stream_graph(graph, state, run_id: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+    stream_mode = ["updates", "values"]
+    if graph.checkpointer is None or run_id is None:
+        yield from graph.stream(state, stream_mode=stream_mode)
+        return
+
+    run = run_config(run_id, state)
+    snapshot = graph.get_state(run)
+    plan = _resume_plan(snapshot, run_id)
+    if plan == "done":
+        yield "values", snapshot.values
+        return
+    yield from graph.stream(None if plan == "resume" else state, run, stream_mode=stream_mode)
+
+
+def stream_graph(graph, state, run_id: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming counterpart of `invoke_graph`. Yields `("updates", {node: update})` when a
+    node finishes and `("values", state_dict)` after every step; the last `values` chunk
+    is the final state. A resumed run starts with the values of its last checkpoint.
+    """
+    chunks = _stream_graph(graph, state, run_id)
+    run_span = tracer.start_span("graph_run", root=True, **{"agent.run_id": run_id})
+    error = None
+    try:
+        while True:
+            # The graph steps run inside next(); the consumer of the chunks runs outside the run context
+            with run_context(run_id), use_span(run_span):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        tracer.end_span(run_span, error)
+
+
+async def ainvoke_graph(graph, state, run_id: Optional[str] = None) -> dict:
+    """Asyncio counterpart of `invoke_graph`."""
+    with run_context(run_id), span("graph_run", root=True, **{"agent.run_id": run_id}):
+        if graph.checkpointer is None or run_id is None:
+            return await graph.ainvoke(state)
+
+        run = run_config(run_id, state)
+        snapshot = await graph.aget_state(run)
+        plan = _resume_plan(snapshot, run_id)
+        if plan == "done":
+            return snapshot.values
+        return await graph.ainvoke(None if plan == "resume" else state, run)
+
+
+__all__ = [
+    'SqliteCheckpointSaver', 'build_checkpointer', 'get_checkpointer',
+    'new_run_id', 'input_fingerprint', 'run_config', 'invoke_graph', 'stream_graph', 'ainvoke_graph',
+]
@@ -1,22 +1,35 @@
+from typing import List
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 
+from src.config.config import config
 from src.config.logging_config import get_logger
 from src.agent.state import AgentState, SingleVariation
+from src.agent.call_trace import merge_call_traces
+from src.agent.tracing import traced_node
+from src.agent.profiling import profiled
 
-from src.agent.nodes.audience_insight import audience_insight_node
-from src.agent.nodes.creative_strategy import creative_strategy_node
-from src.agent.nodes.script_generator import script_generation_node
-from src.agent.nodes.script_evaluator import script_evaluation_node
-from src.agent.nodes.script_refiner import script_refinement_node
-from src.agent.nodes.variation_generator import variation_generation_node
-from src.agent.nodes.variation_evaluator import variation_evaluation_node
-from src.agent.nodes.variation_refiner import variation_refinement_node
+from src.agent.nodes.audience_insight import audience_insight_node, async_audience_insight_node
+from src.agent.nodes.creative_strategy import creative_strategy_node, async_creative_strategy_node
+from src.agent.nodes.script_generator import script_generation_node, async_script_generation_node
+from src.agent.nodes.script_evaluator import script_evaluation_node, async_script_evaluation_node
+from src.agent.nodes.script_refiner import script_refinement_node, async_script_refinement_node
+from src.agent.nodes.dual_script_generator import dual_script_generation_node, async_dual_script_generation_node
+from src.agent.nodes.variation_generator import (variation_generation_node, async_variation_generation_node,
+                                                 get_variation_profile)
+from src.agent.nodes.variation_evaluator import variation_evaluation_node, async_variation_evaluation_node
+from src.agent.nodes.variation_refiner import variation_refinement_node, async_variation_refinement_node
 
 logger = get_logger(__name__)
 
 MAX_REFINEMENT_ITERATIONS = 3
 MAX_VARIATION_REFINEMENT_ITERATIONS = 3
 
+def _add_node(builder: StateGraph, name: str, node) -> None:
+    """Add `node` to the graph as a traced (see `src.agent.tracing`) and optionally profiled node."""
+    builder.add_node(name, traced_node(name, profiled(node, name)))
+
+
 def route_after_evaluation(state: AgentState) -> str:
     if state.evaluation_report and state.evaluation_report.is_approved_for_next_stage:
         logger.info("Script approved by AI. Moving to next node.")
@@ -28,19 +41,33 @@ def route_after_evaluation(state: AgentState) -> str:
         logger.info(f"Script not approved by AI. Iteration {state.iteration_count+1}/{MAX_REFINEMENT_ITERATIONS}. Sending to script_refinement_node for revision.")
         return "script_refinement_node"
 
-# First graph (pre-review)
-def build_pre_review_graph():
+def _build_pre_review_graph(nodes: dict, dual_generation: bool, checkpointer=None):
     builder = StateGraph(AgentState)
-    builder.add_node("audience_insight_node", audience_insight_node)
-    builder.add_node("creative_strategy_node", creative_strategy_node)
-    builder.add_node("script_generation_node", script_generation_node)
-    builder.add_node("script_evaluation_node", script_evaluation_node)
-    builder.add_node("script_refinement_node", script_refinement_node)
+    _add_node(builder, "audience_insight_node", nodes["audience_insight_node"])
+    _add_node(builder, "creative_strategy_node", nodes["creative_strategy_node"])
+    _add_node(builder, "script_evaluation_node", nodes["script_evaluation_node"])
+    _add_node(builder, "script_refinement_node", nodes["script_refinement_node"])
 
     builder.add_edge(START, "audience_insight_node")
     builder.add_edge("audience_insight_node", "creative_strategy_node")
-    builder.add_edge("creative_strategy_node", "script_generation_node")
-    builder.add_edge("script_generation_node", "script_evaluation_node")
+
+    if dual_generation:
+        # Both generation LLMs draft and get scored in parallel; the best draft enters the refinement loop
+        _add_node(builder, "dual_script_generation_node", nodes["dual_script_generation_node"])
+        builder.add_edge("creative_strategy_node", "dual_script_generation_node")
+        builder.add_conditional_edges(
+            "dual_script_generation_node",
+            route_after_evaluation,
+            {
+                "script_refinement_node": "script_refinement_node",
+                END: END
+            }
+        )
+    else:
+        _add_node(builder, "script_generation_node", nodes["script_generation_node"])
+        builder.add_edge("creative_strategy_node", "script_generation_node")
+        builder.add_edge("script_generation_node", "script_evaluation_node")
+
     builder.add_conditional_edges(
         "script_evaluation_node",
         route_after_evaluation,
@@ -51,7 +78,45 @@ def build_pre_review_graph():
     )
     builder.add_edge("script_refinement_node", "script_evaluation_node")
 
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer)
+
+
+# First graph (pre-review)
+def build_pre_review_graph(dual_generation: bool = None, checkpointer=None):
+    """
+    Build the pre-review graph. With `dual_generation` (default `config.script_generation_dual_model`)
+    the first draft is generated by both script generation LLMs and the best-scored one is refined.
+    Pass a `checkpointer` (see `src.agent.checkpoint`) to make runs resumable by run id.
+    """
+    if dual_generation is None:
+        dual_generation = config.script_generation_dual_model
+
+    return _build_pre_review_graph({
+        "audience_insight_node": audience_insight_node,
+        "creative_strategy_node": creative_strategy_node,
+        "script_generation_node": script_generation_node,
+        "dual_script_generation_node": dual_script_generation_node,
+        "script_evaluation_node": script_evaluation_node,
+        "script_refinement_node": script_refinement_node,
+    }, dual_generation, checkpointer)
+
+
+def build_async_pre_review_graph(dual_generation: bool = None, checkpointer=None):
+    """
+    Same topology as `build_pre_review_graph`, wired with the asyncio nodes.
+    Drive it with `ainvoke`/`astream` so many campaigns can share one event loop.
+    """
+    if dual_generation is None:
+        dual_generation = config.script_generation_dual_model
+
+    return _build_pre_review_graph({
+        "audience_insight_node": async_audience_insight_node,
+        "creative_strategy_node": async_creative_strategy_node,
+        "script_generation_node": async_script_generation_node,
+        "dual_script_generation_node": async_dual_script_generation_node,
+        "script_evaluation_node": async_script_evaluation_node,
+        "script_refinement_node": async_script_refinement_node,
+    }, dual_generation, checkpointer)
 
 
 def route_after_variation_evaluation(state: AgentState) -> str:
@@ -72,17 +137,22 @@ def route_after_variation_evaluation(state: AgentState) -> str:
 
 def finalize_variation_node(state: AgentState) -> AgentState:
     """Final node to package the variation result."""
-    logger.info("Finalizing single variation result...")
+    logger.info(f"Finalizing variation result #{state.variation_index + 1}...")
+
+    profile = get_variation_profile(state.variation_index)
 
     # Create the final single variation result
     single_variation = SingleVariation(
-        variation_name="Enhanced A/B Test Variant",
-        variation_type="Hook + CTA + Emotional Tone Enhancement",
-        base_script_comparison="Modified opening hook, enhanced call-to-action, and shifted emotional tone for A/B testing against the original script",
+        variation_name=profile["variation_name"],
+        variation_type=profile["variation_focus"],
+        base_script_comparison=profile["base_script_comparison"],
         ad_script_variation=state.variation_script_draft,
         variation_evaluation_report=state.variation_evaluation_report,
         variation_iteration_count=state.variation_iteration_count,
-        notes=f"Refined through {state.variation_iteration_count} iterations with final quality score of {state.variation_evaluation_report.overall_score:.1f}/5.0" if state.variation_evaluation_report else "Generated single variation for A/B testing"
+        notes=f"Refined through {state.variation_iteration_count} iterations with final quality score of {state.variation_evaluation_report.overall_score:.1f}/5.0" if state.variation_evaluation_report else "Generated single variation for A/B testing",
+        variation_index=state.variation_index,
+        total_llm_tokens=state.total_llm_tokens,
+        call_traces=state.tool_calls_history or [],
     )
 
     return state.model_copy(update={
@@ -90,15 +160,14 @@ def finalize_variation_node(state: AgentState) -> AgentState:
     })
 
 
-def build_variation_graph():
-    """Build the variation workflow graph with evaluation and refinement loop."""
+def _build_single_variation_graph(nodes: dict):
+    """Generate -> evaluate -> refine loop for one variant, used as the body of each fan-out branch."""
     builder = StateGraph(AgentState)
 
     # Add nodes
-    builder.add_node("variation_generation_node", variation_generation_node)
-    builder.add_node("variation_evaluation_node", variation_evaluation_node)
-    builder.add_node("variation_refinement_node", variation_refinement_node)
-    builder.add_node("finalize_variation_node", finalize_variation_node)
+    for name, node in nodes.items():
+        _add_node(builder, name, node)
+    _add_node(builder, "finalize_variation_node", finalize_variation_node)
 
     # Linear flow: START -> generate -> evaluate
     builder.add_edge(START, "variation_generation_node")
@@ -121,3 +190,99 @@ def build_variation_graph():
     builder.add_edge("finalize_variation_node", END)
 
     return builder.compile()
+
+
+def prepare_variations_node(state: AgentState) -> dict:
+    """Clears results of a previous variation run before fanning out."""
+    logger.info(f"Fanning out {state.variation_count} A/B variant pipeline(s)...")
+    return {"variation_results": None}
+
+
+def fan_out_variations(state: AgentState) -> List[Send]:
+    """One Send per requested variant; each branch starts from a clean variation state, token count and call trace."""
+    return [
+        Send("variation_branch_node", state.model_copy(update={
+            "variation_index": index,
+            "variation_request": None,
+            "variation_script_draft": None,
+            "variation_evaluation_report": None,
+            "variation_iteration_count": 0,
+            "single_variation_result": None,
+            "variation_results": [],
+            "total_llm_tokens": 0,
+            "tool_calls_history": [],
+        }))
+        for index in range(state.variation_count)
+    ]
+
+
+def collect_variations_node(state: AgentState) -> dict:
+    """Aggregates branch tokens and call traces and exposes the best variant as `single_variation_result`."""
+    variations = state.variation_results
+    if not variations:
+        raise ValueError("No A/B variant was produced by the variation branches.")
+
+    best = max(
+        variations,
+        key=lambda v: (
+            v.variation_evaluation_report.is_approved_for_next_stage if v.variation_evaluation_report else False,
+            v.variation_evaluation_report.overall_score if v.variation_evaluation_report else 0,
+        )
+    )
+    logger.info(f"Collected {len(variations)} variant(s); best is '{best.variation_name}'.")
+
+    return {
+        "single_variation_result": best,
+        "is_variation_workflow": True,
+        "total_llm_tokens": state.total_llm_tokens + sum(v.total_llm_tokens for v in variations),
+        "tool_calls_history": merge_call_traces(state.tool_calls_history, (v.call_traces for v in variations)),
+    }
+
+
+def _build_variation_graph(variation_branch_node, checkpointer=None):
+    builder = StateGraph(AgentState)
+    _add_node(builder, "prepare_variations_node", prepare_variations_node)
+    _add_node(builder, "variation_branch_node", variation_branch_node)
+    _add_node(builder, "collect_variations_node", collect_variations_node)
+
+    # START -> reset -> N concurrent branches -> collect
+    builder.add_edge(START, "prepare_variations_node")
+    builder.add_conditional_edges("prepare_variations_node", fan_out_variations, ["variation_branch_node"])
+    builder.add_edge("variation_branch_node", "collect_variations_node")
+    builder.add_edge("collect_variations_node", END)
+
+    return builder.compile(checkpointer=checkpointer)
+
+
+def build_variation_graph(checkpointer=None):
+    """
+    Build the variation workflow graph. `AgentState.variation_count` sub-pipelines
+    (generate -> evaluate -> refine) run concurrently and land in `variation_results`.
+    With a `checkpointer`, branches that already finished are not re-run on resume.
+    """
+    single_variation_graph = _build_single_variation_graph({
+        "variation_generation_node": variation_generation_node,
+        "variation_evaluation_node": variation_evaluation_node,
+        "variation_refinement_node": variation_refinement_node,
+    })
+
+    def variation_branch_node(state: AgentState) -> dict:
+        result = single_variation_graph.invoke(state)
+        return {"variation_results": [result["single_variation_result"]]}
+
+    return _build_variation_graph(variation_branch_node, checkpointer)
+
+
+def build_async_variation_graph(checkpointer=None):
+    """Build the variation workflow graph wired with the asyncio nodes."""
+    single_variation_graph = _build_single_variation_graph({
+        "variation_generation_node": async_variation_generation_node,
+        "variation_evaluation_node": async_variation_evaluation_node,
+        "variation_refinement_node": async_variation_refinement_node,
+    })
+
+    async def variation_branch_node(state: AgentState) -> dict:
+        result = await single_variation_graph.ainvoke(state)
+        return {"variation_results": [result["single_variation_result"]]}
+
+    return _build_variation_graph(variation_branch_node, checkpointer)
@@ -0,0 +1,254 @@
+"""
+Copywriting guideline service.
+
+`copywriting_guideline.yaml` is embedded in the creative strategy, generation,
+evaluation and refinement prompts. The file is resolved relative to this
+package, parsed once and its prompt text (`yaml.dump(..., sort_keys=False)` in
+the default `pretty` serialization profile) rendered once; both are reused until
+the file changes on disk.
+
+Prompts only embed the sections relevant to them: `SECTION_INDEX` maps every
+top-level section to the ad formats (video or static placements), the nodes and
+optionally the creative directions it applies to, so e.g. a static feed ad is
+not sent the scene flow, on-screen text, visual and audio directives.
+
+Changes are detected by comparing the file mtime on access. When the optional
+`watchdog` package is installed and `start_watching()` was called, file system
+events invalidate the cache instead, so no `stat` is needed per access.
+"""
+# Import libraries
+import os
+import time
+import threading
+from pathlib import Path
+from enum import Enum
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+import yaml
+
+from src.config.logging_config import get_logger
+from src.agent.serialization import current_profile, render_document
+
+logger = get_logger(__name__)
+
+GUIDELINE_PATH = Path(__file__).parent / "copywriting_guideline.yaml"
+
+# Placements that run static ads; every other platform is a video placement
+STATIC_PLATFORMS = frozenset({"instagram_feeds", "facebook_feeds"})
+
+# Nodes whose prompts embed the guideline (variations reuse the evaluation and refinement prompts)
+GUIDELINE_NODES = frozenset({"creative_strategy", "script_generation", "script_evaluation", "script_refinement"})
+
+
+class GuidelineSection(NamedTuple):
+    """Where a guideline section applies; `directions=None` means every creative direction."""
+    formats: FrozenSet[str] = frozenset({"video", "static"})
+    nodes: FrozenSet[str] = GUIDELINE_NODES
+    directions: Optional[FrozenSet[str]] = None
+
+
+_VIDEO_ONLY = frozenset({"video"})
+_PLANNING_AND_REVIEW = frozenset({"creative_strategy", "script_evaluation"})
+
+# Top-level section -> applicability; sections missing from the index are always included
+SECTION_INDEX: Dict[str, GuidelineSection] = {
+    "key_principles": GuidelineSection(),
+    "do_and_dont_s": GuidelineSection(),
+    "script_flow_guide": GuidelineSection(formats=_VIDEO_ONLY),
+    "on_screen_text": GuidelineSection(formats=_VIDEO_ONLY),
+    "overall_visual_directives": GuidelineSection(formats=_VIDEO_ONLY),
+    "overall_audio_directives": GuidelineSection(formats=_VIDEO_ONLY),
+    "primary_effectiveness_drivers": GuidelineSection(nodes=_PLANNING_AND_REVIEW),
+    "typical_performance_metrics_focus": GuidelineSection(nodes=_PLANNING_AND_REVIEW),
+}
+
+
+def _value(item) -> Optional[str]:
+    return item.value if isinstance(item, Enum) else item
+
+
+def ad_format(ad_platform) -> str:
+    """'static' for feed placements, 'video' for every other platform."""
+    return "static" if _value(ad_platform) in STATIC_PLATFORMS else "video"
+
+
+def section_applies(section: GuidelineSection, ad_platform, creative_direction, node: str) -> bool:
+    """Whether a section is relevant to the platform, creative direction and node of a prompt."""
+    if ad_format(ad_platform) not in section.formats or node not in section.nodes:
+        return False
+    return section.directions is None or _value(creative_direction) in section.directions
+
+
+class GuidelineService:
+    """Parses a YAML guideline once, keeps its prompt text and reloads it when the file changes."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = None
+        self._texts = {}
+        self._selections = {}
+        self._mtime = None
+        self._observer = None
+        self._stats = {
+            "loads": 0,
+            "load_seconds": 0.0,
+            "serializations": 0,
+            "serialize_seconds": 0.0,
+        }
+
+    def _is_stale(self) -> bool:
+        if self._data is None:
+            return True
+        if self._observer is not None:
+            # Invalidation is pushed by watchdog events
+            return False
+        try:
+            return os.stat(self.path).st_mtime_ns != self._mtime
+        except OSError:
+            return False
+
+    def _load(self) -> None:
+        started_at = time.perf_counter()
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+        elapsed = time.perf_counter() - started_at
+
+        self._data, self._mtime = data, mtime
+        self._texts = {}
+        self._selections = {}
+        self._stats["loads"] += 1
+        self._stats["load_seconds"] += elapsed
+        logger.info(f"Loaded copywriting guideline {self.path.name} in {elapsed * 1000:.1f} ms")
+
+    def get(self) -> Dict:
+        """Parsed guideline (do not mutate, it is shared)."""
+        with self._lock:
+            if self._is_stale():
+                self._load()
+            return self._data
+
+    def _render(self, data, profile) -> str:
+        started_at = time.perf_counter()
+        text = render_document(data, profile)
+        self._stats["serializations"] += 1
+        self._stats["serialize_seconds"] += time.perf_counter() - started_at
+        return text
+
+    def get_text(self, sections: Optional[Tuple[str, ...]] = None, max_sections: Optional[int] = None) -> str:
+        """
+        Guideline rendered for prompts in the configured serialization profile
+        (`yaml.dump(guideline, sort_keys=False)` for `pretty`).
+
+        With `sections`, only those top-level sections are rendered (in file
+        order); with `max_sections`, only the first `max_sections` of them (used
+        to fit a prompt into its token budget). Every selection is rendered once
+        per serialization profile.
+        """
+        profile = current_profile()
+        with self._lock:
+            if self._is_stale():
+                self._load()
+            keys = tuple(self._data) if sections is None else tuple(k for k in self._data if k in sections)
+            if max_sections is not None:
+                keys = keys[:max(max_sections, 0)]
+            text = self._texts.get((keys, profile))
+            if text is None:
+                text = self._render({k: self._data[k] for k in keys}, profile) if keys else ""
+                self._texts[(keys, profile)] = text
+            return text
+
+    def select_sections(self, ad_platform, creative_direction, node: str) -> Tuple[str, ...]:
+        """Names of the sections relevant to a platform, creative direction and node (see `SECTION_INDEX`)."""
+        key = (ad_format(ad_platform), _value(creative_direction), node)
+        with self._lock:
+            if self._is_stale():
+                self._load()
+            selection = self._selections.get(key)
+            if selection is None:
+                selection = tuple(
+                    name for name in self._data
+                    if name not in SECTION_INDEX
+                    or section_applies(SECTION_INDEX[name], ad_platform, creative_direction, node)
+                )
+                self._selections[key] = selection
+            return selection
+
+    def section_count(self) -> int:
+        """Number of top-level sections in the guideline."""
+        return len(self.get())
+
+    def invalidate(self) -> None:
+        """Force a reload on the next access."""
+        with self._lock:
+            self._data = None
+            self._texts = {}
+            self._selections = {}
+
+    def start_watching(self) -> bool:
+        """Invalidate on file system events with `watchdog`; returns False when it is not installed."""
+        if self._observer is not None:
+            return True
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.info("watchdog is not installed, the copywriting guideline is checked by mtime")
+            return False
+
+        service = self
+
+        class _GuidelineChangeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = {getattr(event, 'src_path', None), getattr(event, 'dest_path', None)}
+                if str(service.path) in paths:
+                    logger.info(f"Copywriting guideline {service.path.name} changed, reloading on next use")
+                    service.invalidate()
+
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(_GuidelineChangeHandler(), str(self.path.parent), recursive=False)
+        observer.start()
+        self._observer = observer
+        return True
+
+    def stats(self) -> Dict:
+        """Load/serialize counters and cumulative timings in milliseconds."""
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "loads": self._stats["loads"],
+                "load_ms": round(self._stats["load_seconds"] * 1000, 3),
+                "serializations": self._stats["serializations"],
+                "serialize_ms": round(self._stats["serialize_seconds"] * 1000, 3),
+                "watching": self._observer is not None,
+            }
+
+
+guideline_service = GuidelineService(GUIDELINE_PATH)
+
+
+def get_guideline() -> Dict:
+    """Parsed copywriting guideline."""
+    return guideline_service.get()
+
+
+def get_guideline_text(sections: Optional[Tuple[str, ...]] = None, max_sections: Optional[int] = None) -> str:
+    """Copywriting guideline as embedded in the prompts (optionally only the given / first `max_sections` sections)."""
+    return guideline_service.get_text(sections, max_sections)
+
+
+def guideline_sections(ad_platform, creative_direction, node: str) -> Tuple[str, ...]:
+    """Guideline sections embedded in the prompt of `node` for a platform and creative direction."""
+    return guideline_service.select_sections(ad_platform, creative_direction, node)
+
+
+def get_guideline_stats() -> Dict:
+    """Load and serialize timings of the copywriting guideline."""
+    return guideline_service.stats()
+
+
+__all__ = ['GuidelineService', 'GuidelineSection', 'guideline_service', 'GUIDELINE_PATH', 'SECTION_INDEX',
+           'STATIC_PLATFORMS', 'ad_format', 'section_applies', 'get_guideline', 'get_guideline_text',
+           'guideline_sections', 'get_guideline_stats']
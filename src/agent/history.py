@@ -0,0 +1,164 @@
+"""
+Token-budgeted compaction of `script_iteration_history`.
+
+Every refinement appends the full evaluation report and refined script to the
+history, and the evaluation and refinement prompts used to embed all of it, so
+each iteration paid for every previous one. The history is now windowed: the
+last `HISTORY_KEEP_LAST` entries stay verbatim, older ones are reduced to their
+score deltas and the recommendations that were applied, and when the rendered
+history still exceeds `HISTORY_TOKEN_BUDGET` the oldest compacted entries are
+dropped. Prompt tokens before and after compaction are logged and counted per
+node (`get_history_stats()`).
+"""
+# Import libraries
+import threading
+from enum import Enum
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from langchain_core.messages import BaseMessage
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+from src.agent.tokens import count_tokens, count_message_tokens
+from src.agent.serialization import render_value
+
+logger = get_logger(__name__)
+
+
+class CompactedHistory(NamedTuple):
+    entries: List[Dict]
+    tokens_before: int
+    tokens_after: int
+    compacted: int
+    dropped: int
+
+
+def _key(criterion) -> str:
+    return criterion.value if isinstance(criterion, Enum) else str(criterion)
+
+
+def _report(entry: Dict) -> Dict:
+    return entry.get("previous_evaluation_report") or {}
+
+
+def _score_deltas(report: Dict, previous_report: Optional[Dict]) -> Dict:
+    """Overall and per-criterion score changes relative to the previous evaluation."""
+    overall = report.get("overall_score")
+    if not previous_report:
+        return {"overall_score": overall, "score_delta": None}
+
+    previous_scores = {_key(k): v.get("score") for k, v in (previous_report.get("detailed_scores") or {}).items()}
+    criterion_deltas = {}
+    for criterion, metric in (report.get("detailed_scores") or {}).items():
+        previous = previous_scores.get(_key(criterion))
+        if previous is not None and metric.get("score") != previous:
+            criterion_deltas[_key(criterion)] = metric.get("score") - previous
+
+    previous_overall = previous_report.get("overall_score")
+    return {
+        "overall_score": overall,
+        "score_delta": round(overall - previous_overall, 2) if None not in (overall, previous_overall) else None,
+        "criterion_score_deltas": criterion_deltas,
+    }
+
+
+def _window(verbatim: List[Dict], compacted: List[Dict], keep_last: int, token_budget: int) -> CompactedHistory:
+    tokens_before = count_tokens(render_value(verbatim, 1))
+
+    keep = min(max(keep_last, 0), len(verbatim))
+    older = compacted[:len(verbatim) - keep]
+    recent = verbatim[len(verbatim) - keep:]
+
+    entries = older + recent
+    tokens_after = count_tokens(render_value(entries, 1))
+    dropped = 0
+    while token_budget and tokens_after > token_budget and older:
+        older = older[1:]
+        dropped += 1
+        entries = older + recent
+        tokens_after = count_tokens(render_value(entries, 1))
+
+    return CompactedHistory(entries, tokens_before, tokens_after, len(verbatim) - keep - dropped, dropped)
+
+
+def compact_refinement_history(history: Optional[List[Dict]], keep_last: int = None,
+                               token_budget: int = None) -> CompactedHistory:
+    """History for the refinement prompt: recent entries in full, older ones as score deltas and applied recommendations."""
+    keep_last = config.history_keep_last if keep_last is None else keep_last
+    token_budget = config.history_token_budget if token_budget is None else token_budget
+
+    verbatim, compacted = [], []
+    previous_report = None
+    for iteration, entry in enumerate(history or [], start=1):
+        # wall-clock timestamps are left out so identical runs render identical prompts
+        verbatim.append({k: v for k, v in entry.items() if k != "timestamp"})
+        report = _report(entry)
+        compacted.append({
+            "iteration": iteration,
+            "action": entry.get("action"),
+            **_score_deltas(report, previous_report),
+            "recommendations_applied": report.get("actionable_recommendations", []),
+        })
+        previous_report = report
+
+    return _window(verbatim, compacted, keep_last, token_budget)
+
+
+def compact_evaluation_history(history: Optional[List[Dict]], keep_last: int = None,
+                               token_budget: int = None) -> CompactedHistory:
+    """History for the evaluation prompt: recent entries with the produced takeaway and CTA, older ones as the score delta."""
+    keep_last = config.history_keep_last if keep_last is None else keep_last
+    token_budget = config.history_token_budget if token_budget is None else token_budget
+
+    verbatim, compacted = [], []
+    previous_report = None
+    for iteration, entry in enumerate(history or [], start=1):
+        report = _report(entry)
+        verbatim.append({
+            "iteration": iteration,
+            "recommendations_given": report.get("actionable_recommendations", []),
+            "script_produced_key_takeaway": entry.get("output_refined_script", {}).get("key_takeaway"),
+            "script_produced_cta": entry.get("output_refined_script", {}).get("call_to_action_text"),
+        })
+        compacted.append({
+            "iteration": iteration,
+            "score_delta": _score_deltas(report, previous_report)["score_delta"],
+            "recommendations_given": report.get("actionable_recommendations", []),
+        })
+        previous_report = report
+
+    return _window(verbatim, compacted, keep_last, token_budget)
+
+
+_stats = defaultdict(lambda: {"calls": 0, "entries_compacted": 0, "entries_dropped": 0,
+                              "prompt_tokens_before": 0, "prompt_tokens_after": 0})
+_stats_lock = threading.Lock()
+
+
+def record_compaction(node: str, history: CompactedHistory, messages: List[BaseMessage]) -> None:
+    """Log and count the prompt tokens of `messages` with and without the history compaction."""
+    prompt_tokens_after = count_message_tokens(messages)
+    prompt_tokens_before = prompt_tokens_after + history.tokens_before - history.tokens_after
+
+    with _stats_lock:
+        stats = _stats[node]
+        stats["calls"] += 1
+        stats["entries_compacted"] += history.compacted
+        stats["entries_dropped"] += history.dropped
+        stats["prompt_tokens_before"] += prompt_tokens_before
+        stats["prompt_tokens_after"] += prompt_tokens_after
+
+    if history.compacted or history.dropped:
+        logger.info(f"{node} prompt: {prompt_tokens_before} -> {prompt_tokens_after} tokens "
+                    f"({history.compacted} history entries compacted, {history.dropped} dropped)")
+
+
+def get_history_stats() -> Dict[str, Dict[str, int]]:
+    """Per-node prompt tokens before/after history compaction since start."""
+    with _stats_lock:
+        return {node: dict(stats) for node, stats in _stats.items()}
+
+
+__all__ = ['CompactedHistory', 'compact_refinement_history', 'compact_evaluation_history',
+           'record_compaction', 'get_history_stats']
@@ -0,0 +1,179 @@
+"""
+Shared HTTP connection pools for the LLM clients.
+
+Every `ChatOpenAI` instance gets the same sync and async `httpx` clients, so
+connections (and their TLS sessions) to the `*_BASE_URL` endpoints are kept
+alive and reused across nodes, runs and Streamlit sessions instead of paying a
+new handshake per call. Pool limits come from `config`.
+
+Connection reuse is measured through the httpcore `trace` extension: a request
+that had to open a TCP connection counts as a new connection, any other request
+reused a pooled one. `get_connection_stats()` reports the counters per host.
+"""
+# Import libraries
+import time
+import asyncio
+import threading
+import weakref
+from functools import lru_cache
+from collections import defaultdict
+from typing import Dict
+
+import httpx
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class ConnectionStats:
+    """Thread-safe per-host counters of pooled connection usage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: {
+            "requests": 0,
+            "new_connections": 0,
+            "tls_handshakes": 0,
+            "connect_seconds": 0.0,
+        })
+
+    def record(self, host: str, new_connection: bool, tls_handshake: bool, connect_seconds: float) -> None:
+        with self._lock:
+            stats = self._hosts[host]
+            stats["requests"] += 1
+            stats["new_connections"] += int(new_connection)
+            stats["tls_handshakes"] += int(tls_handshake)
+            stats["connect_seconds"] += connect_seconds
+
+    def snapshot(self) -> Dict:
+        """Totals and per-host counters, with `reused_connections` and `reuse_ratio` derived."""
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._hosts.items()}
+
+        totals = {"requests": 0, "new_connections": 0, "tls_handshakes": 0, "connect_seconds": 0.0}
+        for stats in hosts.values():
+            for key in totals:
+                totals[key] += stats[key]
+        for stats in [totals, *hosts.values()]:
+            stats["reused_connections"] = stats["requests"] - stats["new_connections"]
+            stats["reuse_ratio"] = round(stats["reused_connections"] / stats["requests"], 3) if stats["requests"] else 0.0
+            stats["connect_seconds"] = round(stats["connect_seconds"], 3)
+
+        return {**totals, "hosts": hosts}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+connection_stats = ConnectionStats()
+
+
+class _RequestTrace:
+    """Follows the httpcore trace events of one request and records them once headers are sent."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.new_connection = False
+        self.tls_handshake = False
+        self.connect_seconds = 0.0
+        self._started_at = None
+
+    def handle(self, event: str) -> None:
+        if event in ("connection.connect_tcp.started", "connection.start_tls.started"):
+            self._started_at = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self._started_at is not None:
+                self.connect_seconds += time.perf_counter() - self._started_at
+            if event == "connection.connect_tcp.complete":
+                self.new_connection = True
+            else:
+                self.tls_handshake = True
+        elif event.endswith("send_request_headers.started"):
+            connection_stats.record(self.host, self.new_connection, self.tls_handshake, self.connect_seconds)
+
+
+def _trace_request(request: httpx.Request) -> None:
+    request_trace = _RequestTrace(request.url.host)
+
+    def trace(event: str, info: dict) -> None:
+        request_trace.handle(event)
+
+    request.extensions["trace"] = trace
+
+
+async def _atrace_request(request: httpx.Request) -> None:
+    request_trace = _RequestTrace(request.url.host)
+
+    async def trace(event: str, info: dict) -> None:
+        request_trace.handle(event)
+
+    request.extensions["trace"] = trace
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.http_max_connections,
+        max_keepalive_connections=config.http_max_keepalive_connections,
+        keepalive_expiry=config.http_keepalive_expiry,
+    )
+
+
+class _LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport with one connection pool per event loop.
+
+    Pooled asyncio connections cannot be used from another loop, while the batch
+    runner, Streamlit and scripts each drive their own loop. Pools are dropped
+    together with their loop.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._transports = weakref.WeakKeyDictionary()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(limits=self.limits)
+            self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_http_client() -> httpx.Client:
+    """Process-wide sync client shared by every LLM role."""
+    logger.info(f"Creating shared HTTP client (max {config.http_max_connections} connections)")
+    return httpx.Client(
+        limits=_pool_limits(),
+        event_hooks={"request": [_trace_request]},
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Process-wide async client shared by every LLM role (one pool per event loop)."""
+    logger.info(f"Creating shared async HTTP client (max {config.http_max_connections} connections)")
+    return httpx.AsyncClient(
+        transport=_LoopLocalAsyncTransport(_pool_limits()),
+        event_hooks={"request": [_atrace_request]},
+    )
+
+
+def get_connection_stats() -> Dict:
+    """Connection reuse counters since start (or the last reset)."""
+    return connection_stats.snapshot()
+
+
+__all__ = ['get_http_client', 'get_async_http_client', 'get_connection_stats', 'connection_stats', 'ConnectionStats']
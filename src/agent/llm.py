@@ -0,0 +1,320 @@
+"""
+Shared LLM runnables for the graph nodes.
+
+Building a `ChatOpenAI` client and wrapping it with `with_structured_output` on
+every node call is pure overhead: the result only depends on the connection
+settings of the LLM role, the output schema and the request timeout of the node.
+Runnables are therefore built once per (model, base_url, temperature, api_key,
+schema, timeout) and reused by every node, run and Streamlit session of the
+process. All OpenAI-compatible ones share the pooled HTTP clients of
+`src.agent.http_clients`; `google_genai` endpoints use `langchain-google-genai`,
+imported when the first one is built.
+
+Nodes call the model through `invoke_structured` / `ainvoke_structured`, which
+return the parsed response with its token usage and consult the optional
+response cache (`src.agent.response_cache`) first. Model calls are made through
+`src.agent.resilience` (retries with backoff, per-node timeouts, hedging), and
+routed across the role's endpoints by `src.agent.routing`, and each request is
+paced by the endpoint's `src.agent.rate_limit` limiter. The input tokens served
+from the provider's prompt cache (`input_token_details.cache_read` in the usage
+metadata) are counted per node, see `get_prompt_cache_stats()`, and every call
+leaves a `src.agent.metrics` record and, in a traced run, a `src.agent.tracing`
+span with one child span per request.
+"""
+# Import libraries
+import copy
+import time
+import asyncio
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+from pydantic import BaseModel
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+
+from src.config.config import config, LLMProvider
+from src.config.logging_config import get_logger
+from src.agent.http_clients import get_http_client, get_async_http_client
+from src.agent.response_cache import build_cache_key, get_response_cache
+from src.agent.resilience import call_with_resilience, acall_with_resilience, node_timeout
+from src.agent.rate_limit import call_with_rate_limit, acall_with_rate_limit
+from src.agent.routing import route, aroute, endpoint_name
+from src.agent.metrics import LLMCallMetrics, track_call, current_call, prompt_hash
+from src.agent.tracing import SpanKind, span
+
+logger = get_logger(__name__)
+
+
+class StructuredLLM(NamedTuple):
+    """A structured-output runnable with the settings that identify its responses (and its fallbacks)."""
+    runnable: Runnable
+    model: str
+    base_url: str
+    temperature: str
+    api_key: str
+    output_schema: Type[BaseModel]
+    provider: LLMProvider = LLMProvider.openai
+    fallbacks: Tuple["StructuredLLM", ...] = ()
+
+
+@lru_cache(maxsize=None)
+def _build_structured_llm(model: str, base_url: str, temperature: str, api_key: str, output_schema: Type[BaseModel],
+                          timeout: Optional[float] = None, provider: LLMProvider = LLMProvider.openai):
+    logger.debug(f"Building structured runnable for {model} ({output_schema.__name__}, timeout {timeout})")
+    if provider == LLMProvider.google_genai:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        # max_retries counts attempts here; retries are handled by src.agent.resilience
+        llm = ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=float(temperature),
+            timeout=timeout,
+            max_retries=1,
+        )
+    else:
+        llm = ChatOpenAI(
+            model=model,
+            api_key=api_key,
+            temperature=temperature,
+            base_url=base_url,
+            timeout=timeout,
+            # Retries are handled by src.agent.resilience
+            max_retries=0,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client()
+        )
+
+    return StructuredLLM(
+        runnable=llm.with_structured_output(output_schema, method='json_mode'),
+        model=model,
+        base_url=base_url,
+        temperature=temperature,
+        api_key=api_key,
+        output_schema=output_schema,
+        provider=provider,
+    )
+
+
+def get_structured_llm(llm_role: str, output_schema: Type[BaseModel], node: Optional[str] = None) -> StructuredLLM:
+    """
+    Return the cached structured-output runnable of an LLM role (see `config.LLM_ROLES`) for a schema,
+    with the runnables of the role's fallback endpoints (`LLM_FALLBACK_ENDPOINTS`) attached. With `node`,
+    the runnables use the request timeout of that node (`LLM_TIMEOUT_SECONDS`).
+    """
+    timeout = node_timeout(node) if node is not None else None
+    primary, *fallbacks = [
+        _build_structured_llm(settings.model, settings.base_url, settings.temperature, settings.api_key, output_schema,
+                              timeout, settings.provider)
+        for settings in config.get_llm_endpoints(llm_role)
+    ]
+    return primary._replace(fallbacks=tuple(fallbacks)) if fallbacks else primary
+
+
+def _endpoints(structured_llm: StructuredLLM) -> Tuple[StructuredLLM, ...]:
+    return (structured_llm._replace(fallbacks=()), *structured_llm.fallbacks)
+
+
+class _RequestCallback(UsageMetadataCallbackHandler):
+    """
+    Collects the usage of one request and timestamps its model call, which splits
+    the request's time into model and output parsing.
+    """
+
+    # Called in the event loop rather than a worker thread, so the timestamps are taken when the events happen
+    run_inline = True
+
+    def __init__(self):
+        super().__init__()
+        self.started_at = None
+        self.ended_at = None
+
+    def on_chat_model_start(self, *args, **kwargs) -> None:
+        self.started_at = time.perf_counter()
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self.ended_at = time.perf_counter()
+        super().on_llm_end(response, **kwargs)
+
+
+def _start_request() -> _RequestCallback:
+    record = current_call()
+    if record is not None:
+        record.requests += 1
+    return _RequestCallback()
+
+
+def _finish_request(endpoint: StructuredLLM, callback: _RequestCallback) -> None:
+    record = current_call()
+    if record is not None and callback.started_at is not None and callback.ended_at is not None:
+        record.endpoint = endpoint_name(endpoint)
+        record.model_seconds = round(callback.ended_at - callback.started_at, 4)
+        record.parse_seconds = round(time.perf_counter() - callback.ended_at, 6)
+
+
+def _request_span(endpoint: StructuredLLM):
+    return span(f"chat {endpoint.model}", SpanKind.client, **{
+        "gen_ai.request.model": endpoint.model,
+        "gen_ai.system": endpoint.provider.value,
+        "agent.endpoint": endpoint_name(endpoint),
+    })
+
+
+def _call_endpoint(endpoint: StructuredLLM, messages: List[BaseMessage],
+                   call_usage: UsageMetadataCallbackHandler) -> Tuple[StructuredLLM, BaseModel]:
+    """
+    One request to `endpoint`, whose usage is also added to `call_usage`; returns the
+    endpoint with the response, so the caller knows which one answered.
+    """
+    runnable = endpoint.runnable
+    with _request_span(endpoint):
+        callback = _start_request()
+        response = call_with_rate_limit(endpoint.base_url, endpoint.api_key, messages,
+                                        lambda: runnable.invoke(messages, config={"callbacks": [callback, call_usage]}),
+                                        callback)
+        _finish_request(endpoint, callback)
+    return endpoint, response
+
+
+async def _acall_endpoint(endpoint: StructuredLLM, messages: List[BaseMessage],
+                          call_usage: UsageMetadataCallbackHandler) -> Tuple[StructuredLLM, BaseModel]:
+    runnable = endpoint.runnable
+    with _request_span(endpoint):
+        callback = _start_request()
+        response = await acall_with_rate_limit(endpoint.base_url, endpoint.api_key, messages,
+                                               lambda: runnable.ainvoke(messages, config={"callbacks": [callback, call_usage]}),
+                                               callback)
+        _finish_request(endpoint, callback)
+    return endpoint, response
+
+
+@contextmanager
+def _traced_call(node: str) -> Iterator[LLMCallMetrics]:
+    """`track_call` inside a span of the call, annotated with the finished metrics record."""
+    with span(f"llm_call {node}", **{"agent.node": node}) as call_span:
+        try:
+            with track_call(node) as record:
+                yield record
+        finally:
+            if call_span is not None:
+                call_span.set_attributes(**{
+                    "agent.outcome": record.outcome,
+                    "agent.requests": record.requests,
+                    "agent.endpoint": record.endpoint,
+                    "agent.prompt_hash": record.prompt_hash,
+                    "gen_ai.usage.input_tokens": sum(t["input_tokens"] for t in record.tokens.values()),
+                    "gen_ai.usage.output_tokens": sum(t["output_tokens"] for t in record.tokens.values()),
+                })
+
+
+def _usage_snapshot(call_usage: UsageMetadataCallbackHandler) -> Dict:
+    # A hedged request that loses the race can still report its usage after the call returned
+    with call_usage._lock:
+        return copy.deepcopy(call_usage.usage_metadata)
+
+
+def _total_tokens(token_usage: Dict) -> int:
+    return sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+
+
+_prompt_cache_stats = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0})
+_prompt_cache_lock = threading.Lock()
+
+
+def _record_prompt_cache(node: str, token_usage: Dict) -> None:
+    input_tokens = sum(usage.get('input_tokens', 0) for usage in token_usage.values())
+    cached_tokens = sum((usage.get('input_token_details') or {}).get('cache_read', 0) or 0
+                        for usage in token_usage.values())
+    with _prompt_cache_lock:
+        stats = _prompt_cache_stats[node]
+        stats["calls"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cached_input_tokens"] += cached_tokens
+    logger.debug(f"{node}: {cached_tokens}/{input_tokens} input tokens served from the provider prompt cache")
+
+
+def get_prompt_cache_stats() -> Dict[str, Dict]:
+    """Per-node input tokens and the share of them served from the provider prompt cache."""
+    with _prompt_cache_lock:
+        return {
+            node: {**stats, "cached_ratio": (stats["cached_input_tokens"] / stats["input_tokens"]
+                                             if stats["input_tokens"] else 0.0)}
+            for node, stats in _prompt_cache_stats.items()
+        }
+
+
+def invoke_structured(structured_llm: StructuredLLM, messages: List[BaseMessage], node: str) -> Tuple[BaseModel, Dict]:
+    """
+    Call the model and return `(response, token_usage)`, where `token_usage` is the
+    per-model usage metadata of the call (including retried and hedged requests).
+    Cache hits return an empty usage. The cache key names the role's primary endpoint,
+    so responses served by a fallback endpoint are not cached.
+    """
+    with _traced_call(node) as record:
+        record.prompt_hash = prompt_hash(messages)
+        cache = get_response_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = build_cache_key(messages, structured_llm.model, structured_llm.base_url,
+                                        structured_llm.temperature, structured_llm.output_schema)
+            cached = cache.get(cache_key, structured_llm.output_schema, node)
+            if cached is not None:
+                record.outcome = "cache_hit"
+                record.output_chars = len(cached.model_dump_json())
+                return cached, {}
+
+        endpoints = _endpoints(structured_llm)
+        # One handler per call, passed through the invoke config of each of its requests
+        call_usage = UsageMetadataCallbackHandler()
+        answered_by, response = call_with_resilience(node, lambda: route(
+            node, endpoints, lambda endpoint: _call_endpoint(endpoint, messages, call_usage)))
+        token_usage = _usage_snapshot(call_usage)
+        _record_prompt_cache(node, token_usage)
+        record.set_usage(token_usage)
+        record.output_chars = len(response.model_dump_json())
+
+        if cache is not None and answered_by is endpoints[0]:
+            cache.put(cache_key, response, _total_tokens(token_usage))
+        return response, token_usage
+
+
+async def ainvoke_structured(structured_llm: StructuredLLM, messages: List[BaseMessage], node: str) -> Tuple[BaseModel, Dict]:
+    """Asyncio counterpart of `invoke_structured`; cache reads and writes run in a worker thread."""
+    with _traced_call(node) as record:
+        record.prompt_hash = prompt_hash(messages)
+        cache = get_response_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = build_cache_key(messages, structured_llm.model, structured_llm.base_url,
+                                        structured_llm.temperature, structured_llm.output_schema)
+            cached = await asyncio.to_thread(cache.get, cache_key, structured_llm.output_schema, node)
+            if cached is not None:
+                record.outcome = "cache_hit"
+                record.output_chars = len(cached.model_dump_json())
+                return cached, {}
+
+        endpoints = _endpoints(structured_llm)
+        call_usage = UsageMetadataCallbackHandler()
+        answered_by, response = await acall_with_resilience(node, lambda: aroute(
+            node, endpoints, lambda endpoint: _acall_endpoint(endpoint, messages, call_usage)))
+        token_usage = _usage_snapshot(call_usage)
+        _record_prompt_cache(node, token_usage)
+        record.set_usage(token_usage)
+        record.output_chars = len(response.model_dump_json())
+
+        if cache is not None and answered_by is endpoints[0]:
+            await asyncio.to_thread(cache.put, cache_key, response, _total_tokens(token_usage))
+        return response, token_usage
+
+
+def clear_structured_llm_cache() -> None:
+    """Drop every cached runnable, e.g. after the LLM settings were changed at runtime."""
+    _build_structured_llm.cache_clear()
+
+
+__all__ = ['StructuredLLM', 'get_structured_llm', 'invoke_structured', 'ainvoke_structured', 'clear_structured_llm_cache',
+           'get_prompt_cache_stats']
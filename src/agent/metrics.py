@@ -0,0 +1,278 @@
+"""
+Per-call metrics of the node LLM calls.
+
+`invoke_structured` opens one `LLMCallMetrics` record per node call
+(`track_call`) and fills it in as the call goes: the requests sent (retries,
+failovers and hedges included), the endpoint that answered, the time the model
+took and the time spent parsing its structured output, the prompt, completion
+and cached tokens per model, the size of the output and the outcome (`ok`,
+`cache_hit`, `parse_error` or `error`). The record of the current call is held
+in a context variable, so the layers below can annotate it from worker threads
+and tasks as well.
+
+Calls are attributed to the run whose graph invocation they belong to
+(`run_context`, entered by `invoke_graph` / `ainvoke_graph`). The most recent
+`METRICS_MAX_RECORDS` records are kept in memory, summarized per node by
+`get_llm_metrics_summary()` and exported as JSON (`export_metrics_json`) or as a
+Prometheus textfile for the node_exporter textfile collector
+(`export_prometheus_textfile`).
+"""
+# Import libraries
+import os
+import json
+import hashlib
+import time
+import threading
+import contextvars
+from pathlib import Path
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+from pydantic import BaseModel, Field
+from langchain_core.messages import BaseMessage
+from langchain_core.exceptions import OutputParserException
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_current_run_id = contextvars.ContextVar("llm_metrics_run_id", default=None)
+_current_call = contextvars.ContextVar("llm_metrics_call", default=None)
+_last_call = contextvars.ContextVar("llm_metrics_last_call", default=None)
+
+
+class LLMCallMetrics(BaseModel):
+    """Metrics of one structured LLM call of a node."""
+    run_id: Optional[str] = Field(default=None, description="Run the call belongs to, if it ran inside `run_context`.")
+    node: str = Field(description="Node that made the call.")
+    started_at: float = Field(description="Unix time the call started.")
+    ended_at: Optional[float] = Field(default=None, description="Unix time the call returned or raised.")
+    duration_seconds: Optional[float] = Field(default=None, description="Wall time of the call.")
+    outcome: str = Field(default="ok", description="ok, cache_hit, parse_error or error.")
+    error: Optional[str] = Field(default=None, description="Error of a failed call.")
+    requests: int = Field(default=0, description="Requests sent, including retries, failovers and hedges.")
+    endpoint: Optional[str] = Field(default=None, description="Endpoint that produced the response.")
+    model_seconds: Optional[float] = Field(default=None, description="Time the model took for the successful request.")
+    parse_seconds: Optional[float] = Field(
+        default=None,
+        description="Time from the end of the model response to the parsed output (in asyncio, the parser runs in the "
+                    "default executor, so this includes waiting for a worker thread)."
+    )
+    tokens: Dict[str, Dict[str, int]] = Field(
+        default_factory=dict,
+        description="Per model: input_tokens, output_tokens and cached_input_tokens."
+    )
+    output_chars: int = Field(default=0, description="Size of the structured output as JSON.")
+    prompt_hash: Optional[str] = Field(default=None, description="Short SHA-256 of the prompt messages.")
+
+    def set_usage(self, usage_metadata: Dict) -> None:
+        """Fill in the token counts from the per-model usage metadata of the call."""
+        for model, usage in usage_metadata.items():
+            self.tokens[model] = {
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "cached_input_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0) or 0,
+            }
+
+
+class MetricsRecorder:
+    """Bounded, thread-safe store of finished call records."""
+
+    def __init__(self, max_records: int):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+
+    def add(self, record: LLMCallMetrics) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def records(self, run_id: Optional[str] = None) -> List[LLMCallMetrics]:
+        """Finished records, oldest first, optionally of one run only."""
+        with self._lock:
+            records = list(self._records)
+        return [r for r in records if r.run_id == run_id] if run_id is not None else records
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+metrics_recorder = MetricsRecorder(config.metrics_max_records)
+
+
+def prompt_hash(messages: Sequence[BaseMessage]) -> str:
+    """Short SHA-256 of the prompt messages, which identifies a prompt without storing its text."""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message.type}\0{message.content}\0".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+@contextmanager
+def run_context(run_id: Optional[str]) -> Iterator[None]:
+    """Attribute the LLM calls made inside the block to `run_id`."""
+    token = _current_run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _current_run_id.reset(token)
+
+
+def current_run_id() -> Optional[str]:
+    """Run the code in progress belongs to, if it runs inside `run_context`."""
+    return _current_run_id.get()
+
+
+def current_call() -> Optional[LLMCallMetrics]:
+    """Record of the node call in progress, if any."""
+    return _current_call.get()
+
+
+def take_last_call() -> Optional[LLMCallMetrics]:
+    """Record of the last call finished in this context (thread or task), consumed so it is returned only once."""
+    record = _last_call.get()
+    _last_call.set(None)
+    return record
+
+
+@contextmanager
+def track_call(node: str) -> Iterator[LLMCallMetrics]:
+    """Open the record of one node call; it is finished and stored when the block exits."""
+    record = LLMCallMetrics(run_id=_current_run_id.get(), node=node, started_at=time.time())
+    started_at = time.perf_counter()
+    token = _current_call.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        # Also covers calls cancelled by asyncio
+        record.outcome = "parse_error" if isinstance(e, OutputParserException) else "error"
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_call.reset(token)
+        record.duration_seconds = round(time.perf_counter() - started_at, 4)
+        record.ended_at = record.started_at + record.duration_seconds
+        metrics_recorder.add(record)
+        _last_call.set(record)
+
+
+def _percentile(samples: List[float], percentile: float) -> Optional[float]:
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * percentile / 100))], 3)
+
+
+def get_llm_metrics_summary(run_id: Optional[str] = None) -> Dict[str, Dict]:
+    """Per node: calls by outcome, requests, tokens and p50/p95/p99 call duration."""
+    by_node = defaultdict(list)
+    for record in metrics_recorder.records(run_id):
+        by_node[record.node].append(record)
+
+    summary = {}
+    for node, records in by_node.items():
+        outcomes = defaultdict(int)
+        for record in records:
+            outcomes[record.outcome] += 1
+        durations = [r.duration_seconds for r in records if r.outcome != "cache_hit"]
+        parse_times = [r.parse_seconds for r in records if r.parse_seconds is not None]
+        summary[node] = {
+            "calls": len(records),
+            "outcomes": dict(outcomes),
+            "requests": sum(r.requests for r in records),
+            "input_tokens": sum(t["input_tokens"] for r in records for t in r.tokens.values()),
+            "output_tokens": sum(t["output_tokens"] for r in records for t in r.tokens.values()),
+            "cached_input_tokens": sum(t["cached_input_tokens"] for r in records for t in r.tokens.values()),
+            "total_seconds": round(sum(durations), 3),
+            "p50_seconds": _percentile(durations, 50),
+            "p95_seconds": _percentile(durations, 95),
+            "p99_seconds": _percentile(durations, 99),
+            "mean_parse_ms": round(sum(parse_times) / len(parse_times) * 1000, 3) if parse_times else None,
+        }
+    return summary
+
+
+def _write_atomically(path: Union[str, Path], text: str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_metrics_json(path: Union[str, Path], run_id: Optional[str] = None) -> Path:
+    """Write the call records and the per-node summary as one JSON document."""
+    document = {
+        "generated_at": time.time(),
+        "summary": get_llm_metrics_summary(run_id),
+        "calls": [record.model_dump() for record in metrics_recorder.records(run_id)],
+    }
+    return _write_atomically(path, json.dumps(document, ensure_ascii=False, indent=2))
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus() -> str:
+    """The metrics in the Prometheus text exposition format."""
+    records = metrics_recorder.records()
+    calls, requests, tokens = defaultdict(int), defaultdict(int), defaultdict(int)
+    durations, parse_times = defaultdict(list), defaultdict(list)
+    for record in records:
+        calls[(record.node, record.outcome)] += 1
+        requests[record.node] += record.requests
+        for model, usage in record.tokens.items():
+            for kind, count in usage.items():
+                tokens[(record.node, model, kind.replace("_tokens", ""))] += count
+        if record.outcome != "cache_hit":
+            durations[record.node].append(record.duration_seconds)
+        if record.parse_seconds is not None:
+            parse_times[record.node].append(record.parse_seconds)
+
+    lines = [
+        "# HELP ad_agent_llm_calls_total Structured LLM calls per node and outcome.",
+        "# TYPE ad_agent_llm_calls_total counter",
+        *(f"ad_agent_llm_calls_total{_labels(node=node, outcome=outcome)} {count}"
+          for (node, outcome), count in sorted(calls.items())),
+        "# HELP ad_agent_llm_requests_total Requests sent per node, including retries, failovers and hedges.",
+        "# TYPE ad_agent_llm_requests_total counter",
+        *(f"ad_agent_llm_requests_total{_labels(node=node)} {count}" for node, count in sorted(requests.items())),
+        "# HELP ad_agent_llm_tokens_total Tokens per node, model and kind (input, output, cached_input).",
+        "# TYPE ad_agent_llm_tokens_total counter",
+        *(f"ad_agent_llm_tokens_total{_labels(node=node, model=model, kind=kind)} {count}"
+          for (node, model, kind), count in sorted(tokens.items())),
+        "# HELP ad_agent_llm_call_duration_seconds Wall time of the structured LLM calls per node.",
+        "# TYPE ad_agent_llm_call_duration_seconds summary",
+    ]
+    for node, samples in sorted(durations.items()):
+        for quantile in (0.5, 0.95, 0.99):
+            lines.append(f"ad_agent_llm_call_duration_seconds{_labels(node=node, quantile=quantile)} "
+                         f"{_percentile(samples, quantile * 100)}")
+        lines.append(f"ad_agent_llm_call_duration_seconds_sum{_labels(node=node)} {round(sum(samples), 6)}")
+        lines.append(f"ad_agent_llm_call_duration_seconds_count{_labels(node=node)} {len(samples)}")
+    lines += [
+        "# HELP ad_agent_llm_parse_duration_seconds Time spent parsing structured outputs per node.",
+        "# TYPE ad_agent_llm_parse_duration_seconds summary",
+    ]
+    for node, samples in sorted(parse_times.items()):
+        lines.append(f"ad_agent_llm_parse_duration_seconds_sum{_labels(node=node)} {round(sum(samples), 6)}")
+        lines.append(f"ad_agent_llm_parse_duration_seconds_count{_labels(node=node)} {len(samples)}")
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus_textfile(path: Union[str, Path]) -> Path:
+    """Write the metrics as a Prometheus textfile (replaced atomically, as the textfile collector expects)."""
+    return _write_atomically(path, render_prometheus())
+
+
+__all__ = ['LLMCallMetrics', 'MetricsRecorder', 'metrics_recorder', 'run_context', 'current_run_id', 'current_call', 'take_last_call',
+           'track_call', 'prompt_hash',
+           'get_llm_metrics_summary', 'export_metrics_json', 'render_prometheus', 'export_prometheus_textfile']
@@ -1,51 +1,80 @@
 # Import libraries
 # from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
 
-from langchain_core.callbacks import get_usage_metadata_callback
-
-from src.config.config import config
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
 from src.config.logging_config import get_logger
 from src.agent.utils import build_audience_insight_message
+from src.agent.budget import fit_prompt
+from src.agent.stage_cache import load_stage_result, save_stage_result, aload_stage_result, asave_stage_result
 from src.agent.state import AgentState, AudienceInsight
 
 
 logger = get_logger(__name__)
 
 
+def _prepare(state: AgentState):
+    # Structured LLM and messages of the node's call, shared by the sync and async nodes
+    structured_llm = get_structured_llm("audience_insight", AudienceInsight, node="audience_insight")
+    messages_list = fit_prompt("audience_insight", build_audience_insight_message, state)
+    return structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: AudienceInsight, token_usage: dict) -> AgentState:
+    # Extract token usage from the callback
+    total_tokens = 0
+
+    for model_name, usage in token_usage.items():
+        total_tokens += usage.get('total_tokens', 0)
+
+    # Unpack results and return a new AgentState with fields populated
+    return state.model_copy(update={
+        "audience_insight": response,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "audience_insight"),
+    })
+
+
 def audience_insight_node(state: AgentState) -> AgentState:
     try:
         logger.info("Start Audience Insight Node")
-        llm = ChatOpenAI(
-            model=config.audience_insight_llm,
-            api_key=config.audience_insight_api_key,
-            temperature=config.audience_insight_temperature,
-            base_url=config.audience_insight_base_url
 
-        )
+        # Reuse the result of an earlier campaign with the same stage inputs
+        cached = load_stage_result("audience_insight", state, AudienceInsight)
+        if cached is not None:
+            logger.info("End Audience Insight Node (reused stage result)")
+            return _update_state(state, cached, {})
+
+        # Call model and parse structured response
+        response, token_usage = invoke_structured(*_prepare(state), node="audience_insight")
+        save_stage_result("audience_insight", state, response, token_usage)
 
-        structured_llm = llm.with_structured_output(AudienceInsight, method='json_mode')
+        logger.info("End Audience Insight Node")
 
-        messages_list = build_audience_insight_message(state)
+        return _update_state(state, response, token_usage)
 
-        # Call model and parse structured response
-        with get_usage_metadata_callback() as cb:
-            response = structured_llm.invoke(messages_list)
+    except Exception as e:
+        logger.error(f"LLM invocation failed: {e}", exc_info=True)
+        raise
+
+
+async def async_audience_insight_node(state: AgentState) -> AgentState:
+    """Asyncio counterpart of `audience_insight_node` for `ainvoke`/`astream` graphs."""
+    try:
+        logger.info("Start Audience Insight Node (async)")
 
-        logger.info("End Creative Strategy Node")
+        cached = await aload_stage_result("audience_insight", state, AudienceInsight)
+        if cached is not None:
+            logger.info("End Audience Insight Node (async, reused stage result)")
+            return _update_state(state, cached, {})
 
-        # Extract token usage from the callback
-        token_usage = cb.usage_metadata
-        total_tokens = 0
+        # Await the model without blocking the event loop
+        response, token_usage = await ainvoke_structured(*_prepare(state), node="audience_insight")
+        await asave_stage_result("audience_insight", state, response, token_usage)
 
-        for model_name, usage in token_usage.items():
-            total_tokens += usage.get('total_tokens', 0)
+        logger.info("End Audience Insight Node (async)")
 
-        # Unpack results and return a new AgentState with fields populated
-        return state.model_copy(update={
-            "audience_insight": response,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        return _update_state(state, response, token_usage)
 
     except Exception as e:
         logger.error(f"LLM invocation failed: {e}", exc_info=True)
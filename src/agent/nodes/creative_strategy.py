@@ -1,77 +1,83 @@
 # Import libraries
-from typing import List
-from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
-
-from src.agent.state import AgentState
-from src.config.config import config
+from src.agent.state import AgentState, CreativeStrategyResponse
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
 from src.config.logging_config import get_logger
 from src.agent.utils import build_creative_strategy_message
+from src.agent.budget import fit_prompt
+from src.agent.stage_cache import load_stage_result, save_stage_result, aload_stage_result, asave_stage_result
 
 
 logger = get_logger(__name__)
 
 
-class CreativeStrategyResponse(BaseModel):
-    """Node's response schema"""
-    core_message_pillars: List[str] = Field(
-        description="3 most important messages the ad should convey."
-    )
-    brainstormed_hooks: List[str] = Field(
-        description="3-5 ideas for attention-grabbing opening lines."
-    )
-    generated_ctas: List[str] = Field(
-        description="A set of diverse Call-to-Action phrases relevant to the campaign_goal and brand_voice."
-    )
-    emotional_triggers: List[str] = Field(
-        description="Specific emotions to evoke in the audience."
-    )
-    primary_visual_concept: str = Field(
-        description="A brief description of the recommended visual style and concepts for the ad."
-    )
-    audio_strategy: str = Field(
-        description="A brief description of the recommended audio strategy (e.g., trending music, voiceover)."
-    )
+def _prepare(state: AgentState):
+    # Structured LLM and messages of the node's call, shared by the sync and async nodes
+    structured_llm = get_structured_llm("creative_strategy", CreativeStrategyResponse, node="creative_strategy")
+    messages_list = fit_prompt("creative_strategy", build_creative_strategy_message, state)
+    return structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: CreativeStrategyResponse, token_usage: dict) -> AgentState:
+    # Extract token usage from the callback
+    total_tokens = 0
+
+    for model_name, usage in token_usage.items():
+        total_tokens += usage.get('total_tokens', 0)
+
+    # Unpack results and return a new AgentState with fields populated
+    return state.model_copy(update={
+        "core_message_pillars": response.core_message_pillars,
+        "brainstormed_hooks": response.brainstormed_hooks,
+        "generated_ctas": response.generated_ctas,
+        "emotional_triggers": response.emotional_triggers,
+        "primary_visual_concept": response.primary_visual_concept,
+        "audio_strategy": response.audio_strategy,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "creative_strategy"),
+    })
 
 
 def creative_strategy_node(state: AgentState) -> AgentState:
     try:
         logger.info("Start Creative Strategy Node")
-        llm = ChatOpenAI(
-            model=config.creative_strategy_llm,
-            api_key=config.creative_strategy_api_key,
-            temperature=config.creative_strategy_temperature,
-            base_url=config.creative_strategy_base_url
-        )
 
-        structured_llm = llm.with_structured_output(CreativeStrategyResponse, method='json_mode')
-
-        messages_list = build_creative_strategy_message(state)
+        # Reuse the result of an earlier campaign with the same stage inputs
+        cached = load_stage_result("creative_strategy", state, CreativeStrategyResponse)
+        if cached is not None:
+            logger.info("End Creative Strategy Node (reused stage result)")
+            return _update_state(state, cached, {})
 
         # Call model and parse structured response
-        with get_usage_metadata_callback() as cb:
-            response = structured_llm.invoke(messages_list)
+        response, token_usage = invoke_structured(*_prepare(state), node="creative_strategy")
+        save_stage_result("creative_strategy", state, response, token_usage)
 
         logger.info("End Creative Strategy Node")
 
-        # Extract token usage from the callback
-        token_usage = cb.usage_metadata
-        total_tokens = 0
-
-        for model_name, usage in token_usage.items():
-            total_tokens += usage.get('total_tokens', 0)
-
-        # Unpack results and return a new AgentState with fields populated
-        return state.model_copy(update={
-            "core_message_pillars": response.core_message_pillars,
-            "brainstormed_hooks": response.brainstormed_hooks,
-            "generated_ctas": response.generated_ctas,
-            "emotional_triggers": response.emotional_triggers,
-            "primary_visual_concept": response.primary_visual_concept,
-            "audio_strategy": response.audio_strategy,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        return _update_state(state, response, token_usage)
+
+    except Exception as e:
+        logger.error(f"LLM invocation failed: {e}", exc_info=True)
+        raise
+
+
+async def async_creative_strategy_node(state: AgentState) -> AgentState:
+    """Asyncio counterpart of `creative_strategy_node` for `ainvoke`/`astream` graphs."""
+    try:
+        logger.info("Start Creative Strategy Node (async)")
+
+        cached = await aload_stage_result("creative_strategy", state, CreativeStrategyResponse)
+        if cached is not None:
+            logger.info("End Creative Strategy Node (async, reused stage result)")
+            return _update_state(state, cached, {})
+
+        # Await the model without blocking the event loop
+        response, token_usage = await ainvoke_structured(*_prepare(state), node="creative_strategy")
+        await asave_stage_result("creative_strategy", state, response, token_usage)
+
+        logger.info("End Creative Strategy Node (async)")
+
+        return _update_state(state, response, token_usage)
 
     except Exception as e:
         logger.error(f"LLM invocation failed: {e}", exc_info=True)
@@ -0,0 +1,112 @@
+# Import libraries
+import asyncio
+import contextvars
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config.config import config
+from src.agent.state import AgentState
+from src.config.logging_config import get_logger
+from src.agent.call_trace import merge_call_traces
+from src.agent.nodes.script_generator import generate_script_draft, async_generate_script_draft
+from src.agent.nodes.script_evaluator import script_evaluation_node, async_script_evaluation_node
+
+logger = get_logger(__name__)
+
+SCRIPT_GENERATION_ROLES = ["script_generation1", "script_generation2"]
+
+
+def _draft_and_evaluate(state: AgentState, llm_role: str) -> AgentState:
+    return script_evaluation_node(generate_script_draft(state, llm_role))
+
+
+async def _async_draft_and_evaluate(state: AgentState, llm_role: str) -> AgentState:
+    return await async_script_evaluation_node(await async_generate_script_draft(state, llm_role))
+
+
+def _select_best_candidate(state: AgentState, outcomes: List[Tuple[str, Optional[AgentState], Optional[Exception]]]) -> AgentState:
+    """
+    Picks the best evaluated draft (approved first, then highest overall score; ties keep llm1)
+    and folds the tokens spent and the calls traced by every candidate into the returned state.
+    """
+    successful = [(role, candidate) for role, candidate, error in outcomes if candidate is not None]
+    if not successful:
+        # Surface the first failure when no model produced a usable draft
+        raise next(error for _, _, error in outcomes if error is not None)
+
+    best_role, best = max(
+        successful,
+        key=lambda item: (item[1].evaluation_report.is_approved_for_next_stage, item[1].evaluation_report.overall_score)
+    )
+
+    candidates_summary = []
+    total_tokens = state.total_llm_tokens
+    for role, candidate, error in outcomes:
+        summary = {"llm_role": role, "model": config.get_llm_settings(role).model, "selected": role == best_role}
+        if candidate is not None:
+            total_tokens += candidate.total_llm_tokens - state.total_llm_tokens
+            summary.update({
+                "overall_score": candidate.evaluation_report.overall_score,
+                "is_approved_for_next_stage": candidate.evaluation_report.is_approved_for_next_stage,
+            })
+        else:
+            summary["error"] = f"{type(error).__name__}: {error}"
+        candidates_summary.append(summary)
+
+    logger.info(f"Selected draft from {best_role} with score {best.evaluation_report.overall_score:.1f}/5.0")
+
+    return best.model_copy(update={
+        "script_candidates": candidates_summary,
+        "total_llm_tokens": total_tokens,
+        "tool_calls_history": merge_call_traces(
+            state.tool_calls_history, (candidate.tool_calls_history for _, candidate in successful)
+        ),
+    })
+
+
+def dual_script_generation_node(state: AgentState) -> AgentState:
+    """
+    Generates a draft with both script generation LLMs at the same time, evaluates both drafts
+    concurrently and keeps the best-scored one (with its evaluation report) for the refinement loop.
+    """
+    logger.info("Start Dual Script Generation Node")
+
+    def run(llm_role: str):
+        try:
+            return llm_role, _draft_and_evaluate(state, llm_role), None
+        except Exception as e:
+            logger.error(f"Draft from {llm_role} failed: {e}", exc_info=True)
+            return llm_role, None, e
+
+    # Each draft runs in a copy of the node's context, so its metrics and spans stay attributed to the run
+    with ThreadPoolExecutor(max_workers=len(SCRIPT_GENERATION_ROLES)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run, llm_role) for llm_role in SCRIPT_GENERATION_ROLES]
+        outcomes = [future.result() for future in futures]
+
+    logger.info("End Dual Script Generation Node")
+
+    return _select_best_candidate(state, outcomes)
+
+
+async def async_dual_script_generation_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `dual_script_generation_node` for `ainvoke`/`astream` graphs.
+    """
+    logger.info("Start Dual Script Generation Node (async)")
+
+    results = await asyncio.gather(
+        *(_async_draft_and_evaluate(state, llm_role) for llm_role in SCRIPT_GENERATION_ROLES),
+        return_exceptions=True
+    )
+
+    outcomes = []
+    for llm_role, result in zip(SCRIPT_GENERATION_ROLES, results):
+        if isinstance(result, Exception):
+            logger.error(f"Draft from {llm_role} failed: {result}", exc_info=result)
+            outcomes.append((llm_role, None, result))
+        else:
+            outcomes.append((llm_role, result, None))
+
+    logger.info("End Dual Script Generation Node (async)")
+
+    return _select_best_candidate(state, outcomes)
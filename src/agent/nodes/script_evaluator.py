@@ -1,9 +1,8 @@
 # Import libraries
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
-
-from src.config.config import config
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
 from src.agent.utils import build_evaluation_message
+from src.agent.budget import fit_prompt
 from src.config.logging_config import get_logger
 from src.agent.state import AgentState, EvaluationReport
 
@@ -11,50 +10,58 @@ from src.agent.state import AgentState, EvaluationReport
 logger = get_logger(__name__)
 
 
-def script_evaluation_node(state: AgentState) -> AgentState:
-    """
-    Evaluates the generated ad script and updates the AgentState with an EvaluationReport.
-    """
-
+def _prepare(state: AgentState):
     # Pre-check: Ensure script_draft exists before evaluation
     if not state.script_draft:
         raise ValueError("Script draft is missing for evaluation.")
 
-    try:
-        logger.info("Start Script Evaluation Node")
+    # Structured LLM and messages of the node's call, shared by the sync and async nodes
+    structured_llm = get_structured_llm("script_evaluation_and_refinement", EvaluationReport, node="script_evaluation")
+    messages_list = fit_prompt("script_evaluation", build_evaluation_message, state)
+    return structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: EvaluationReport, token_usage: dict) -> AgentState:
+    # Extract token usage from the callback
+    total_tokens = 0
+
+    for model_name, usage in token_usage.items():
+        total_tokens += usage.get('total_tokens', 0)
 
-        llm = ChatOpenAI(
-            model=config.script_evaluation_and_refinement_llm,
-            api_key=config.script_evaluation_and_refinement_api_key,
-            temperature=config.script_evaluation_and_refinement_temperature,
-            base_url=config.script_evaluation_and_refinement_base_url
+    # Update AgentState with the evaluation report and revision feedback
+    return state.model_copy(update={
+        "evaluation_report": response,
+        "revision_feedback": "\n".join(response.actionable_recommendations) if response.actionable_recommendations else None,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "script_evaluation"),
+    })
 
-        )
 
-        # Set up structured output for EvaluationReport
-        structured_llm = llm.with_structured_output(EvaluationReport, method='json_mode')
+def script_evaluation_node(state: AgentState) -> AgentState:
+    """
+    Evaluates the generated ad script and updates the AgentState with an EvaluationReport.
+    """
+    structured_llm, messages_list = _prepare(state)
+
+    logger.info("Start Script Evaluation Node")
 
-        # Build the messages list for the LLM call
-        messages_list = build_evaluation_message(state)
+    response, token_usage = invoke_structured(structured_llm, messages_list, node="script_evaluation")
 
-        with get_usage_metadata_callback() as cb:
-            response: EvaluationReport = structured_llm.invoke(messages_list)
+    logger.info("End Script Evaluation Node")
 
-        logger.info("End Script Evaluation Node")
+    return _update_state(state, response, token_usage)
+
+
+async def async_script_evaluation_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `script_evaluation_node` for `ainvoke`/`astream` graphs.
+    """
+    structured_llm, messages_list = _prepare(state)
 
-        # Extract token usage from the callback
-        token_usage = cb.usage_metadata
-        total_tokens = 0
+    logger.info("Start Script Evaluation Node (async)")
 
-        for model_name, usage in token_usage.items():
-            total_tokens += usage.get('total_tokens', 0)
+    response, token_usage = await ainvoke_structured(structured_llm, messages_list, node="script_evaluation")
 
-        # Update AgentState with the evaluation report and revision feedback
-        return state.model_copy(update={
-            "evaluation_report": response,
-            "revision_feedback": "\n".join(response.actionable_recommendations) if response.actionable_recommendations else None,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+    logger.info("End Script Evaluation Node (async)")
 
-    except Exception as e:
-        raise
+    return _update_state(state, response, token_usage)
@@ -1,71 +1,102 @@
 # Import libraries
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
-
-from src.config.config import config
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
 from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft, ScriptDraft
 from src.config.logging_config import get_logger
 from src.agent.utils import build_script_generation_message
+from src.agent.budget import fit_prompt
 
 logger = get_logger(__name__)
 
 
+def _build_structured_llm(state: AgentState, llm_role: str = "script_generation1"):
+    # Define video and static platforms for a clean conditional check
+    video_platforms = [
+        "instagram_reels", "instagram_stories", "facebook_stories",
+        "youtube_shorts", "tiktok_feed", "snapchat_spotlight"
+    ]
+    static_platforms = [
+        "instagram_feeds", "facebook_feeds"
+    ]
+
+    # Select the correct schema based on the ad platform
+    if state.ad_platform.value in video_platforms:
+        output_schema = VideoScriptDraft
+    elif state.ad_platform.value in static_platforms:
+        output_schema = StaticAdDraft
+    else:
+        # Handle unsupported platforms gracefully
+        raise ValueError(f"Ad platform {state.ad_platform.value} is not supported by the script generator.")
+
+    # Set up structured output for ScriptDraft
+    return get_structured_llm(llm_role, output_schema, node="script_generation")
+
+
+def _update_state(state: AgentState, response: ScriptDraft, token_usage: dict) -> AgentState:
+    # Extract token usage from the callback
+    total_tokens = 0
+
+    for model_name, usage in token_usage.items():
+        total_tokens += usage.get('total_tokens', 0)
+
+    # Update AgentState with the generated script
+    return state.model_copy(update={
+        "script_draft": response,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "script_generation"),
+    })
+
+
+def _prepare(state: AgentState, llm_role: str):
+    # Structured LLM and messages of the call, shared by the sync and async variants
+    structured_llm = _build_structured_llm(state, llm_role)
+    messages_list = fit_prompt("script_generation", build_script_generation_message, state)
+    return structured_llm, messages_list
+
+
+def generate_script_draft(state: AgentState, llm_role: str = "script_generation1") -> AgentState:
+    """
+    Generates one script draft with the given script generation LLM role (`script_generation1` or `2`).
+    """
+    logger.info(f"Start Script Generation ({llm_role})")
+
+    response, token_usage = invoke_structured(*_prepare(state, llm_role), node="script_generation")
+
+    logger.info(f"End Script Generation ({llm_role})")
+
+    return _update_state(state, response, token_usage)
+
+
+async def async_generate_script_draft(state: AgentState, llm_role: str = "script_generation1") -> AgentState:
+    """
+    Asyncio counterpart of `generate_script_draft`.
+    """
+    logger.info(f"Start Script Generation ({llm_role}, async)")
+
+    response, token_usage = await ainvoke_structured(*_prepare(state, llm_role), node="script_generation")
+
+    logger.info(f"End Script Generation ({llm_role}, async)")
+
+    return _update_state(state, response, token_usage)
+
+
 def script_generation_node(state: AgentState) -> AgentState:
     """
     Generates the ad script based on the campaign brief and creative strategy.
     """
     try:
-        logger.info("Start Script Generation Node")
-        llm = ChatOpenAI(
-            model=config.script_generation_llm1,
-            api_key=config.script_generation_api_key1,
-            temperature=config.script_generation_temperature1,
-            base_url=config.script_generation_base_url1
-
-        )
-
-        # Define video and static platforms for a clean conditional check
-        video_platforms = [
-            "instagram_reels", "instagram_stories", "facebook_stories",
-            "youtube_shorts", "tiktok_feed", "snapchat_spotlight"
-        ]
-        static_platforms = [
-            "instagram_feeds", "facebook_feeds"
-        ]
-
-        # Select the correct schema based on the ad platform
-        if state.ad_platform.value in video_platforms:
-            output_schema = VideoScriptDraft
-        elif state.ad_platform.value in static_platforms:
-            output_schema = StaticAdDraft
-        else:
-            # Handle unsupported platforms gracefully
-            raise ValueError(f"Ad platform {state.ad_platform.value} is not supported by the script generator.")
-
-        # Set up structured output for ScriptDraft
-        structured_llm = llm.with_structured_output(output_schema, method='json_mode')
-
-        # Build the messages list for the LLM call
-        messages_list = build_script_generation_message(state)
-
-        with get_usage_metadata_callback() as cb:
-            response = structured_llm.invoke(messages_list)
-
-        logger.info("End Script Generation Node")
-
-        # Extract token usage from the callback
-        token_usage = cb.usage_metadata
-        total_tokens = 0
-
-        for model_name, usage in token_usage.items():
-            total_tokens += usage.get('total_tokens', 0)
-
-
-        # Update AgentState with the generated script
-        return state.model_copy(update={
-            "script_draft": response,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        return generate_script_draft(state, "script_generation1")
+
+    except Exception as e:
+        raise
+
+
+async def async_script_generation_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `script_generation_node` for `ainvoke`/`astream` graphs.
+    """
+    try:
+        return await async_generate_script_draft(state, "script_generation1")
 
     except Exception as e:
         raise
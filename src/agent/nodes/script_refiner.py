@@ -1,22 +1,17 @@
 # Import libraries
 from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
 
-from src.config.config import config
-from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
+from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft, ScriptDraft
 from src.config.logging_config import get_logger
 from src.agent.utils import build_script_refinement_message
+from src.agent.budget import fit_prompt
 
 logger = get_logger(__name__)
 
 
-def script_refinement_node(state: AgentState) -> AgentState:
-    """
-    Refines the ad script based on the evaluation report's actionable recommendations.
-    """
-    logger.info("Start Script Refinement Node...")
-
+def _select_output_schema(state: AgentState):
     # Ensure necessary data is present for refinement
     if not state.script_draft:
         logger.error("No script_draft found for refinement.")
@@ -36,58 +31,89 @@ def script_refinement_node(state: AgentState) -> AgentState:
 
     # Select the correct schema based on the ad platform
     if state.ad_platform.value in video_platforms:
-        output_schema = VideoScriptDraft
+        return VideoScriptDraft
     elif state.ad_platform.value in static_platforms:
-        output_schema = StaticAdDraft
+        return StaticAdDraft
     else:
         # Handle unsupported platforms gracefully
         raise ValueError(f"Ad platform {state.ad_platform.value} is not supported by the script refiner.")
 
-    try:
-        llm = ChatOpenAI(
-            model=config.script_evaluation_and_refinement_llm,
-            api_key=config.script_evaluation_and_refinement_api_key,
-            temperature=config.script_evaluation_and_refinement_temperature,
-            base_url=config.script_evaluation_and_refinement_base_url
-        )
 
-        # The refinement node will output a new (refined) ScriptDraft
-        structured_llm = llm.with_structured_output(output_schema, method='json_mode')
+def _prepare(state: AgentState):
+    # Structured LLM and messages of the node's call, shared by the sync and async nodes
+    output_schema = _select_output_schema(state)
+
+    # The refinement node will output a new (refined) ScriptDraft
+    structured_llm = get_structured_llm("script_evaluation_and_refinement", output_schema, node="script_refinement")
+
+    # Build the messages list, passing relevant state data
+    messages_list = fit_prompt("script_refinement", build_script_refinement_message, state)
+    return structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: ScriptDraft, token_usage: dict) -> AgentState:
+    iteration_log = state.script_iteration_history or []
+
+    iteration_log.append({
+        "timestamp": datetime.now().isoformat(),
+        "action": "script_refined",
+        "previous_evaluation_report": state.evaluation_report.model_dump(),
+        "output_refined_script": response.model_dump(),
+    })
+
+    # Extract token usage from the callback
+    total_tokens = 0
+
+    for model_name, usage in token_usage.items():
+        total_tokens += usage.get('total_tokens', 0)
+
+
+    # Update AgentState with the refined script
+    return state.model_copy(update={
+        "script_draft": response,
+        "script_iteration_history": iteration_log,
+        "revision_feedback": None,
+        "iteration_count": state.iteration_count + 1,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "script_refinement"),
+    })
 
-        # Build the messages list, passing relevant state data
-        messages_list = build_script_refinement_message(state)
+
+def script_refinement_node(state: AgentState) -> AgentState:
+    """
+    Refines the ad script based on the evaluation report's actionable recommendations.
+    """
+    logger.info("Start Script Refinement Node...")
+
+    try:
+        structured_llm, messages_list = _prepare(state)
 
         logger.info("Calling LLM for script refinement...")
 
-        with get_usage_metadata_callback() as cb:
-            response: output_schema = structured_llm.invoke(messages_list)
+        response, token_usage = invoke_structured(structured_llm, messages_list, node="script_refinement")
 
-        iteration_log = state.script_iteration_history or []
+        return _update_state(state, response, token_usage)
 
-        iteration_log.append({
-            "timestamp": datetime.now().isoformat(),
-            "action": "script_refined",
-            "previous_evaluation_report": state.evaluation_report.model_dump(),
-            "output_refined_script": response.model_dump(),
-        })
+    except Exception as e:
+        logger.error(f"Error in ScriptRefinementNode: {e}", exc_info=True)
+        raise
 
-        # Extract token usage from the callback
-        token_usage = cb.usage_metadata
-        total_tokens = 0
 
-        for model_name, usage in token_usage.items():
-            total_tokens += usage.get('total_tokens', 0)
+async def async_script_refinement_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `script_refinement_node` for `ainvoke`/`astream` graphs.
+    """
+    logger.info("Start Script Refinement Node (async)...")
+
+    try:
+        structured_llm, messages_list = _prepare(state)
+
+        logger.info("Awaiting LLM for script refinement...")
 
+        response, token_usage = await ainvoke_structured(structured_llm, messages_list, node="script_refinement")
 
-        # Update AgentState with the refined script
-        return state.model_copy(update={
-            "script_draft": response,
-            "script_iteration_history": iteration_log,
-            "revision_feedback": None,
-            "iteration_count": state.iteration_count + 1,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        return _update_state(state, response, token_usage)
 
     except Exception as e:
         logger.error(f"Error in ScriptRefinementNode: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
@@ -1,51 +1,72 @@
 # Import libraries
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
-
-from src.config.config import config
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
 from src.agent.utils import build_evaluation_message
+from src.agent.budget import fit_prompt
 from src.config.logging_config import get_logger
 from src.agent.state import AgentState, EvaluationReport
 
 logger = get_logger(__name__)
 
 
+def _prepare(state: AgentState):
+    if not state.variation_script_draft:
+        raise ValueError("Variation script draft is missing for evaluation.")
+
+    # Structured LLM and messages of the node's call, shared by the sync and async nodes
+    structured_llm = get_structured_llm("script_evaluation_and_refinement", EvaluationReport, node="variation_evaluation")
+
+    # Use variation script for evaluation by temporarily swapping
+    temp_state = state.model_copy(update={"script_draft": state.variation_script_draft})
+    messages_list = fit_prompt("variation_evaluation", build_evaluation_message, temp_state)
+    return structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: EvaluationReport, token_usage: dict) -> AgentState:
+    # Extract token usage
+    total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+
+    return state.model_copy(update={
+        "variation_evaluation_report": response,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "variation_evaluation"),
+    })
+
+
 def variation_evaluation_node(state: AgentState) -> AgentState:
     """
     Evaluates the generated variation script.
     """
-    if not state.variation_script_draft:
-        raise ValueError("Variation script draft is missing for evaluation.")
+    structured_llm, messages_list = _prepare(state)
 
     try:
         logger.info("Start Variation Script Evaluation Node")
 
-        llm = ChatOpenAI(
-            model=config.script_evaluation_and_refinement_llm,
-            api_key=config.script_evaluation_and_refinement_api_key,
-            temperature=config.script_evaluation_and_refinement_temperature,
-            base_url=config.script_evaluation_and_refinement_base_url
-        )
+        response, token_usage = invoke_structured(structured_llm, messages_list, node="variation_evaluation")
 
-        structured_llm = llm.with_structured_output(EvaluationReport, method='json_mode')
+        logger.info("End Variation Script Evaluation Node")
+
+        return _update_state(state, response, token_usage)
 
-        # Use variation script for evaluation by temporarily swapping
-        temp_state = state.model_copy(update={"script_draft": state.variation_script_draft})
-        messages_list = build_evaluation_message(temp_state)
+    except Exception as e:
+        logger.error(f"Error in Variation Evaluation Node: {e}", exc_info=True)
+        raise
 
-        with get_usage_metadata_callback() as cb:
-            response: EvaluationReport = structured_llm.invoke(messages_list)
 
-        logger.info("End Variation Script Evaluation Node")
+async def async_variation_evaluation_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `variation_evaluation_node` for `ainvoke`/`astream` graphs.
+    """
+    structured_llm, messages_list = _prepare(state)
+
+    try:
+        logger.info("Start Variation Script Evaluation Node (async)")
+
+        response, token_usage = await ainvoke_structured(structured_llm, messages_list, node="variation_evaluation")
 
-        # Extract token usage
-        token_usage = cb.usage_metadata
-        total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+        logger.info("End Variation Script Evaluation Node (async)")
 
-        return state.model_copy(update={
-            "variation_evaluation_report": response,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        return _update_state(state, response, token_usage)
 
     except Exception as e:
         logger.error(f"Error in Variation Evaluation Node: {e}", exc_info=True)
@@ -1,14 +1,124 @@
 # Import libraries
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
-
-from src.config.config import config
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
 from src.config.logging_config import get_logger
-from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft, VariationRequest
+from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft, VariationRequest, ScriptDraft
 from src.agent.utils import build_variation_generation_message
+from src.agent.budget import fit_prompt
 
 logger = get_logger(__name__)
 
+# Distinct A/B angles, one per parallel variant (cycled when more variants are requested)
+VARIATION_PROFILES = [
+    {
+        "variation_name": "Enhanced A/B Test Variant",
+        "variation_focus": "Hook + CTA + Emotional Tone Enhancement",
+        "target_changes": [
+            "Modified opening hook using different audience pain point/aspiration",
+            "Enhanced call-to-action with stronger urgency and emotional resonance",
+            "Shifted emotional tone to align with different audience values/preferences"
+        ],
+        "base_script_comparison": "Modified opening hook, enhanced call-to-action, and shifted emotional tone for A/B testing against the original script",
+    },
+    {
+        "variation_name": "Pain-Point Hook Variant",
+        "variation_focus": "Problem-First Hook + Urgency CTA",
+        "target_changes": [
+            "Open on the most frustrating audience pain point shown in a relatable moment",
+            "Call-to-action framed around ending that frustration today",
+            "More direct, urgent tone in the first seconds"
+        ],
+        "base_script_comparison": "Leads with the audience's pain point and closes with an urgency-driven call-to-action instead of the original hook",
+    },
+    {
+        "variation_name": "Social Proof Variant",
+        "variation_focus": "Social Proof + Trust-Building Tone",
+        "target_changes": [
+            "Hook built around a peer testimonial or a result other users achieved",
+            "Call-to-action that lowers perceived risk (free trial, guarantee, reviews)",
+            "Reassuring, credible tone aimed at skeptical decision makers"
+        ],
+        "base_script_comparison": "Replaces the original angle with peer proof and trust signals to test credibility against the base script",
+    },
+    {
+        "variation_name": "Aspiration Variant",
+        "variation_focus": "Aspirational Outcome + Benefit-Led CTA",
+        "target_changes": [
+            "Hook showing the desired end state the audience aspires to",
+            "Call-to-action tied to reaching that outcome",
+            "Inspirational, forward-looking emotional tone"
+        ],
+        "base_script_comparison": "Frames the product through the audience's aspiration instead of the original hook to test a benefit-led angle",
+    },
+]
+
+
+def get_variation_profile(variation_index: int) -> dict:
+    """Returns the A/B angle for a variant index; indices past the catalogue cycle with a numbered name."""
+    profile = dict(VARIATION_PROFILES[variation_index % len(VARIATION_PROFILES)])
+    cycle = variation_index // len(VARIATION_PROFILES)
+    if cycle:
+        profile["variation_name"] = f"{profile['variation_name']} #{cycle + 1}"
+    return profile
+
+
+def _with_variation_request(state: AgentState) -> AgentState:
+    # Create variation request details for this branch's A/B angle
+    profile = get_variation_profile(state.variation_index)
+    variation_request = VariationRequest(
+        variation_focus=profile["variation_focus"],
+        target_changes=profile["target_changes"]
+    )
+    return state.model_copy(update={"variation_request": variation_request})
+
+
+def _build_structured_llm(state: AgentState):
+    # Determine output schema based on platform
+    video_platforms = [
+        "instagram_reels", "instagram_stories", "facebook_stories",
+        "youtube_shorts", "tiktok_feed", "snapchat_spotlight"
+    ]
+    static_platforms = [
+        "instagram_feeds", "facebook_feeds"
+    ]
+
+    if state.ad_platform.value in video_platforms:
+        output_schema = VideoScriptDraft
+    elif state.ad_platform.value in static_platforms:
+        output_schema = StaticAdDraft
+    else:
+        raise ValueError(f"Ad platform {state.ad_platform.value} is not supported.")
+
+    return get_structured_llm("script_generation1", output_schema, node="variation_generation")
+
+
+def _prepare(state: AgentState):
+    # State with this branch's variation request, plus the structured LLM and messages
+    # of the node's call, shared by the sync and async nodes
+    if not state.script_draft:
+        logger.error("No script_draft found for variation generation.")
+        raise ValueError("Approved script draft is missing for variation generation.")
+
+    state = _with_variation_request(state)
+    structured_llm = _build_structured_llm(state)
+    messages_list = fit_prompt("variation_generation", build_variation_generation_message, state)
+    return state, structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: ScriptDraft, token_usage: dict) -> AgentState:
+    # Extract token usage
+    total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+
+    logger.info(f"Generated variation script #{state.variation_index + 1} for A/B testing")
+
+    # Update AgentState with the variation draft (ready for evaluation)
+    return state.model_copy(update={
+        "variation_script_draft": response,
+        "is_variation_workflow": True,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "variation_generation"),
+    })
+
 
 def variation_generation_node(state: AgentState) -> AgentState:
     """
@@ -17,64 +127,32 @@ def variation_generation_node(state: AgentState) -> AgentState:
     """
     logger.info("--- Entering Single Variation Generation Node ---")
 
-    if not state.script_draft:
-        logger.error("No script_draft found for variation generation.")
-        raise ValueError("Approved script draft is missing for variation generation.")
+    try:
+        state, structured_llm, messages_list = _prepare(state)
+
+        # Track token usage
+        response, token_usage = invoke_structured(structured_llm, messages_list, node="variation_generation")
+
+        return _update_state(state, response, token_usage)
+
+    except Exception as e:
+        logger.error(f"Error in Single Variation Generation Node: {e}", exc_info=True)
+        raise
+
+
+async def async_variation_generation_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `variation_generation_node` for `ainvoke`/`astream` graphs.
+    """
+    logger.info("--- Entering Single Variation Generation Node (async) ---")
 
     try:
-        llm = ChatOpenAI(
-            model=config.script_generation_llm1,
-            api_key=config.script_generation_api_key1,
-            temperature=config.script_generation_temperature1,
-            base_url=config.script_generation_base_url1
-        )
-
-        # Determine output schema based on platform
-        video_platforms = [
-            "instagram_reels", "instagram_stories", "facebook_stories",
-            "youtube_shorts", "tiktok_feed", "snapchat_spotlight"
-        ]
-        static_platforms = [
-            "instagram_feeds", "facebook_feeds"
-        ]
-
-        if state.ad_platform.value in video_platforms:
-            output_schema = VideoScriptDraft
-        elif state.ad_platform.value in static_platforms:
-            output_schema = StaticAdDraft
-        else:
-            raise ValueError(f"Ad platform {state.ad_platform.value} is not supported.")
-
-        structured_llm = llm.with_structured_output(output_schema, method='json_mode')
-        messages_list = build_variation_generation_message(state)
+        state, structured_llm, messages_list = _prepare(state)
 
         # Track token usage
-        with get_usage_metadata_callback() as cb:
-            response = structured_llm.invoke(messages_list)
-
-        # Extract token usage
-        token_usage = cb.usage_metadata
-        total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
-
-        # Create variation request details
-        variation_request = VariationRequest(
-            variation_focus="Hook + CTA + Emotional Tone Enhancement",
-            target_changes=[
-                "Modified opening hook using different audience pain point/aspiration",
-                "Enhanced call-to-action with stronger urgency and emotional resonance",
-                "Shifted emotional tone to align with different audience values/preferences"
-            ]
-        )
-
-        logger.info(f"Generated single variation script for A/B testing")
-
-        # Update AgentState with the variation draft (ready for evaluation)
-        return state.model_copy(update={
-            "variation_request": variation_request,
-            "variation_script_draft": response,
-            "is_variation_workflow": True,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        response, token_usage = await ainvoke_structured(structured_llm, messages_list, node="variation_generation")
+
+        return _update_state(state, response, token_usage)
 
     except Exception as e:
         logger.error(f"Error in Single Variation Generation Node: {e}", exc_info=True)
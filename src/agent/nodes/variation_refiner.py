@@ -1,21 +1,17 @@
 # Import libraries
 from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import get_usage_metadata_callback
 
-from src.config.config import config
-from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft
+from src.agent.llm import get_structured_llm, invoke_structured, ainvoke_structured
+from src.agent.call_trace import record_call_trace
+from src.agent.state import AgentState, VideoScriptDraft, StaticAdDraft, ScriptDraft
 from src.config.logging_config import get_logger
 from src.agent.utils import build_script_refinement_message
+from src.agent.budget import fit_prompt
 
 logger = get_logger(__name__)
 
-def variation_refinement_node(state: AgentState) -> AgentState:
-    """
-    Refines the variation script based on evaluation feedback.
-    """
-    logger.info("Start Variation Script Refinement Node...")
 
+def _select_output_schema(state: AgentState):
     if not state.variation_script_draft:
         raise ValueError("Variation script draft is missing for refinement.")
     if not state.variation_evaluation_report:
@@ -31,44 +27,76 @@ def variation_refinement_node(state: AgentState) -> AgentState:
     ]
 
     if state.ad_platform.value in video_platforms:
-        output_schema = VideoScriptDraft
+        return VideoScriptDraft
     elif state.ad_platform.value in static_platforms:
-        output_schema = StaticAdDraft
+        return StaticAdDraft
     else:
         raise ValueError(f"Ad platform {state.ad_platform.value} is not supported.")
 
+
+def _prepare(state: AgentState):
+    # Structured LLM and messages of the node's call, shared by the sync and async nodes
+    output_schema = _select_output_schema(state)
+
+    # The refinement node will output a new (refined) ScriptDraft
+    structured_llm = get_structured_llm("script_evaluation_and_refinement", output_schema, node="variation_refinement")
+
+    # Use variation script and evaluation for refinement by temporarily swapping
+    temp_state = state.model_copy(update={
+        "script_draft": state.variation_script_draft,
+        "evaluation_report": state.variation_evaluation_report
+    })
+    messages_list = fit_prompt("variation_refinement", build_script_refinement_message, temp_state)
+    return structured_llm, messages_list
+
+
+def _update_state(state: AgentState, response: ScriptDraft, token_usage: dict) -> AgentState:
+    # Extract token usage
+    total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+
+    # Update AgentState with the refined variation script
+    return state.model_copy(update={
+        "variation_script_draft": response,
+        "variation_iteration_count": state.variation_iteration_count + 1,
+        "total_llm_tokens": state.total_llm_tokens + total_tokens,
+        "tool_calls_history": record_call_trace(state, "variation_refinement"),
+    })
+
+
+def variation_refinement_node(state: AgentState) -> AgentState:
+    """
+    Refines the variation script based on evaluation feedback.
+    """
+    logger.info("Start Variation Script Refinement Node...")
+
     try:
-        llm = ChatOpenAI(
-            model=config.script_evaluation_and_refinement_llm,
-            api_key=config.script_evaluation_and_refinement_api_key,
-            temperature=config.script_evaluation_and_refinement_temperature,
-            base_url=config.script_evaluation_and_refinement_base_url
-        )
-
-        structured_llm = llm.with_structured_output(output_schema, method='json_mode')
-
-        # Use variation script and evaluation for refinement by temporarily swapping
-        temp_state = state.model_copy(update={
-            "script_draft": state.variation_script_draft,
-            "evaluation_report": state.variation_evaluation_report
-        })
-        messages_list = build_script_refinement_message(temp_state)
+        structured_llm, messages_list = _prepare(state)
 
         logger.info("Calling LLM for variation script refinement...")
 
-        with get_usage_metadata_callback() as cb:
-            response = structured_llm.invoke(messages_list)
+        response, token_usage = invoke_structured(structured_llm, messages_list, node="variation_refinement")
+
+        return _update_state(state, response, token_usage)
+
+    except Exception as e:
+        logger.error(f"Error in Variation Refinement Node: {e}", exc_info=True)
+        raise
+
+
+async def async_variation_refinement_node(state: AgentState) -> AgentState:
+    """
+    Asyncio counterpart of `variation_refinement_node` for `ainvoke`/`astream` graphs.
+    """
+    logger.info("Start Variation Script Refinement Node (async)...")
+
+    try:
+        structured_llm, messages_list = _prepare(state)
+
+        logger.info("Awaiting LLM for variation script refinement...")
 
-        # Extract token usage
-        token_usage = cb.usage_metadata
-        total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+        response, token_usage = await ainvoke_structured(structured_llm, messages_list, node="variation_refinement")
 
-        # Update AgentState with the refined variation script
-        return state.model_copy(update={
-            "variation_script_draft": response,
-            "variation_iteration_count": state.variation_iteration_count + 1,
-            "total_llm_tokens": state.total_llm_tokens + total_tokens,
-        })
+        return _update_state(state, response, token_usage)
 
     except Exception as e:
         logger.error(f"Error in Variation Refinement Node: {e}", exc_info=True)
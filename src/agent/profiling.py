@@ -0,0 +1,176 @@
+"""
+Opt-in CPU profiling of graph nodes and prompt builders.
+
+With `PROFILING_MODE=cprofile` every graph node and every `build_*_message`
+builder of `src.agent.utils` whose name matches one of `PROFILING_TARGETS`
+(fnmatch patterns, e.g. `["script_refinement_node", "build_*"]`) is run under
+`cProfile`, and each call leaves a `.pstats` file in
+`PROFILING_OUTPUT_DIR/<run id>/`. `PROFILING_MODE=sampling` uses the sampling
+profiler `pyinstrument` instead when it is installed (falling back to cProfile
+otherwise) and writes speedscope JSON files, which https://www.speedscope.app
+renders as flame graphs; `.pstats` files open in snakeviz, tuna or flameprof.
+
+Targets are wrapped when the graphs are built and when `src.agent.utils` is
+imported; with `PROFILING_MODE=off` (the default) the functions are left as they
+are, so profiling costs nothing. A profiler covers the thread it was started in,
+one at a time: a target called while another profile is running in the same
+thread (a builder inside a profiled node, or concurrent nodes on one event loop)
+is not profiled separately, its time is part of the running profile.
+
+    python -m src.agent.profiling profiles/<run id> [--top 30] [--output merged.pstats]
+
+merges the `.pstats` files of a run and prints its most expensive functions.
+"""
+# Import libraries
+import re
+import time
+import pstats
+import cProfile
+import argparse
+import itertools
+import threading
+import functools
+import inspect
+from pathlib import Path
+from fnmatch import fnmatch
+from functools import lru_cache
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from src.config.config import config, ProfilingMode
+from src.config.logging_config import get_logger
+from src.agent.metrics import current_run_id
+
+logger = get_logger(__name__)
+
+_thread_state = threading.local()
+_sequence = itertools.count(1)
+
+
+@lru_cache(maxsize=None)
+def _sampling_available() -> bool:
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        logger.warning("PROFILING_MODE=sampling needs pyinstrument (pip install pyinstrument); using cProfile")
+        return False
+    return True
+
+
+def _profile_path(target: str, suffix: str) -> Path:
+    run_dir = re.sub(r"[^\w.-]", "_", current_run_id() or "no-run")
+    path = Path(config.profiling_output_dir) / run_dir / f"{next(_sequence):05d}-{target}{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _cprofile(target: str) -> Iterator[None]:
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Python 3.12+ allows one cProfile per process at a time
+        logger.debug(f"Not profiling {target}: {e}")
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = _profile_path(target, ".pstats")
+        profiler.dump_stats(path)
+        logger.debug(f"Profile of {target} ({time.perf_counter() - started_at:.3f}s) written to {path}")
+
+
+@contextmanager
+def _sampling_profile(target: str, is_async: bool) -> Iterator[None]:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    # Coroutines are profiled per task; sync targets per thread, also in threads that copied a profiled context
+    profiler = Profiler(interval=config.profiling_sample_interval_seconds,
+                        async_mode="enabled" if is_async else "disabled")
+    try:
+        profiler.start()
+    except RuntimeError as e:
+        logger.debug(f"Not profiling {target}: {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        session = profiler.stop()
+        path = _profile_path(target, ".speedscope.json")
+        path.write_text(SpeedscopeRenderer().render(session), encoding="utf-8")
+        logger.debug(f"Profile of {target} ({session.duration:.3f}s) written to {path}")
+
+
+@contextmanager
+def profile_block(target: str, is_async: bool = False) -> Iterator[None]:
+    """
+    Profile the block as `target`, unless a profile is already running in this thread
+    (`is_async`: the block awaits, so the sampling profiler follows its task).
+    """
+    if getattr(_thread_state, "active", False):
+        yield
+        return
+    _thread_state.active = True
+    try:
+        if config.profiling_mode == ProfilingMode.sampling and _sampling_available():
+            with _sampling_profile(target, is_async):
+                yield
+        else:
+            with _cprofile(target):
+                yield
+    finally:
+        _thread_state.active = False
+
+
+def profiled(func: Callable, name: Optional[str] = None) -> Callable:
+    """
+    `func` profiled on every call when profiling is on and `name` (default: its
+    `__name__`) matches `PROFILING_TARGETS`; otherwise `func` itself.
+    """
+    name = name or func.__name__
+    if config.profiling_mode == ProfilingMode.off or not any(fnmatch(name, p) for p in config.profiling_targets):
+        return func
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with profile_block(name, is_async=True):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile_block(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+__all__ = ['profiled', 'profile_block']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the cProfile files of a run and print its hot spots.")
+    parser.add_argument("profile_dir", help="Directory with .pstats files, e.g. profiles/<run id>.")
+    parser.add_argument("--top", type=int, default=30, help="Number of functions to print.")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, calls, ...).")
+    parser.add_argument("--output", default=None, help="Also write the merged profile to this .pstats file.")
+    args = parser.parse_args()
+
+    files = sorted(str(path) for path in Path(args.profile_dir).rglob("*.pstats"))
+    if not files:
+        parser.error(f"No .pstats files in {args.profile_dir}")
+    stats = pstats.Stats(*files)
+    if args.output:
+        stats.dump_stats(args.output)
+        print(f"Merged profile of {len(files)} file(s) written to {args.output}")
+    stats.sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
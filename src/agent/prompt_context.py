@@ -0,0 +1,170 @@
+"""
+Memoized prompt context fragments.
+
+The creative strategy, generation, evaluation, refinement and variation message
+builders all embed the same blocks of the brief (campaign brief, product
+details, demographic profile, audience insights, creative strategy). Those
+inputs do not change during a run, so each block is serialized once (in the
+configured serialization profile), keyed by a fingerprint of the state fields it
+is built from, and spliced verbatim into every later prompt.
+
+`render_object` reassembles the fragments exactly like serializing the whole
+dictionary at once would, so the rendered prompts are byte-identical (and
+identical prefixes across calls are what provider-side prompt caching keys on).
+"""
+# Import libraries
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from pydantic_core import to_json
+
+from src.config.config import config
+from src.agent.state import AgentState
+from src.agent.serialization import current_profile, render_value
+
+
+def _demographic_profile(state: AgentState) -> Dict:
+    a = state.audience_persona
+    return {
+        "age_range": a.age_range,
+        "gender": a.gender.value,
+        "location": [c.value for c in a.location],
+        "income_range": a.income_range.value,
+        "education_level": a.education_level.value if a.education_level else 'Not specified'
+    }
+
+
+def _campaign_brief(state: AgentState) -> Dict:
+    return {
+        "campaign_goal": state.campaign_goal.value,
+        "ad_platform": state.ad_platform.value,
+        "creative_direction": state.creative_direction.value,
+        "script_tone": state.script_tone.value,
+    }
+
+
+def _product_details(state: AgentState) -> Dict:
+    p = state.product
+    return {
+        "name": p.product_name,
+        "overview": p.product_description,
+        "focused_feature": {
+            "name": state.product_feature_focus,
+            "description": p.product_features.get(state.product_feature_focus)
+        },
+        "unique_selling_points": p.unique_selling_point,
+        "problems_solved": p.problems_solved,
+    }
+
+
+def _campaign_brief_with_product(state: AgentState) -> Dict:
+    product_details = _product_details(state)
+    product_details["supported_platforms"] = [sp.value for sp in state.product.supported_platforms]
+    return {**_campaign_brief(state), "product_details": product_details}
+
+
+def _creative_strategy(state: AgentState) -> Dict:
+    return {
+        "core_message_pillars": state.core_message_pillars,
+        "brainstormed_hooks": state.brainstormed_hooks,
+        "generated_ctas": state.generated_ctas,
+        "emotional_triggers": state.emotional_triggers,
+    }
+
+
+def _creative_strategy_with_visuals(state: AgentState) -> Dict:
+    return {
+        **_creative_strategy(state),
+        "primary_visual_concept": state.primary_visual_concept,
+        "audio_strategy": state.audio_strategy
+    }
+
+
+def _audience_insights(state: AgentState) -> Dict:
+    return {
+        "demographic_profile": _demographic_profile(state),
+        "detailed_insights": state.audience_insight.model_dump()
+    }
+
+
+_BRIEF_FIELDS = ["campaign_goal", "ad_platform", "creative_direction", "script_tone"]
+_PRODUCT_FIELDS = ["product", "product_feature_focus"]
+_STRATEGY_FIELDS = ["core_message_pillars", "brainstormed_hooks", "generated_ctas", "emotional_triggers"]
+
+# Fragment name -> (AgentState fields it is built from, builder)
+FRAGMENTS: Dict[str, Tuple[List[str], Callable[[AgentState], Any]]] = {
+    "campaign_brief": (_BRIEF_FIELDS, _campaign_brief),
+    "campaign_brief_with_product": (_BRIEF_FIELDS + _PRODUCT_FIELDS, _campaign_brief_with_product),
+    "product_details": (_PRODUCT_FIELDS, _product_details),
+    "demographic_profile": (["audience_persona"], _demographic_profile),
+    "detailed_insights": (["audience_insight"], lambda state: state.audience_insight.model_dump()),
+    "audience_insights": (["audience_persona", "audience_insight"], _audience_insights),
+    "creative_strategy": (_STRATEGY_FIELDS, _creative_strategy),
+    "creative_strategy_with_visuals": (_STRATEGY_FIELDS + ["primary_visual_concept", "audio_strategy"],
+                                       _creative_strategy_with_visuals),
+}
+
+
+def context_fingerprint(state: AgentState, fields: List[str]) -> str:
+    """Hash of the given state fields (serialized by pydantic-core, which is far cheaper than indented json)."""
+    return hashlib.sha1(to_json([getattr(state, field) for field in fields])).hexdigest()
+
+
+class PromptContextCache:
+    """Bounded LRU of serialized fragments keyed by (name, depth, profile, input fingerprint)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, state: AgentState, name: str, depth: int = 0) -> str:
+        """Serialized fragment `name` for `state`, rendered for nesting `depth`."""
+        fields, build = FRAGMENTS[name]
+        profile = current_profile()
+        key = (name, depth, profile, context_fingerprint(state, fields))
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return rendered
+
+        rendered = render_value(build(state), depth, profile)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._entries[key] = rendered
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        """Drop every fragment and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._stats = {"hits": 0, "misses": 0}
+
+
+prompt_context_cache = PromptContextCache(config.prompt_context_cache_max_entries)
+
+
+def context_fragment(state: AgentState, name: str, depth: int = 0) -> str:
+    """Serialized context fragment `name` for `state`, nested `depth` levels deep."""
+    return prompt_context_cache.get(state, name, depth)
+
+
+def get_prompt_context_stats() -> Dict[str, int]:
+    """Hit/miss counters of the prompt context fragment cache."""
+    return prompt_context_cache.stats()
+
+
+__all__ = ['FRAGMENTS', 'PromptContextCache', 'prompt_context_cache', 'context_fingerprint', 'context_fragment',
+           'get_prompt_context_stats']
@@ -0,0 +1,180 @@
+"""
+Client-side rate limits per provider endpoint.
+
+Concurrent runs share the `*_BASE_URL` endpoints, whose providers enforce
+requests-per-minute and tokens-per-minute limits per API key. Without
+coordination the runs overshoot, get 429s, back off and overshoot again. One
+`RateLimiter` per (base_url, api_key) paces every request of the process
+instead:
+
+- limits come from `RATE_LIMITS` (JSON, keyed by base url, `*` for every
+  endpoint), scaled by `RATE_LIMIT_HEADROOM` to stay just under the provider's;
+- each request reserves its send time (GCRA): one unit of the request budget and
+  an estimate of its tokens (prompt tokens plus the endpoint's recent mean
+  completion size). Reservations are handed out in arrival order, so waiting
+  calls of every run are served first come, first served;
+- once the call returns, the estimate is reconciled with the usage metadata the
+  caller's callback handler collected for that request (requests the provider
+  rejected give their tokens back).
+
+Bursts are limited to `RATE_LIMIT_BURST_SECONDS` worth of budget, which keeps
+the throughput flat rather than spending a whole minute's allowance at once.
+"""
+# Import libraries
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import openai
+from langchain_core.messages import BaseMessage
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+from src.agent.tokens import count_message_tokens
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute pacing of one endpoint and API key."""
+
+    def __init__(self, name: str, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        self.name = name
+        headroom = config.rate_limit_headroom
+        # Budget per second of each limited dimension (None: not limited)
+        self._rates = {
+            "requests": requests_per_minute * headroom / 60 if requests_per_minute else None,
+            "tokens": tokens_per_minute * headroom / 60 if tokens_per_minute else None,
+        }
+        # Theoretical arrival time of each dimension (GCRA)
+        self._tat = {"requests": 0.0, "tokens": 0.0}
+        self._lock = threading.Lock()
+        self._output_tokens = float(config.rate_limit_default_output_tokens)
+        self._stats = {"requests": 0, "estimated_tokens": 0, "actual_tokens": 0, "delayed": 0,
+                       "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def estimate(self, messages: List[BaseMessage]) -> int:
+        """Tokens a call is expected to use: its prompt plus the recent mean completion."""
+        return count_message_tokens(messages) + round(self._output_tokens)
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve the next send slot for a request of `tokens`; returns the seconds to wait for it."""
+        costs = {"requests": 1, "tokens": tokens}
+        burst = config.rate_limit_burst_seconds
+        with self._lock:
+            now = time.monotonic()
+            send_at = now
+            for dimension, rate in self._rates.items():
+                if rate:
+                    send_at = max(send_at, self._tat[dimension] - burst)
+            for dimension, rate in self._rates.items():
+                if rate:
+                    self._tat[dimension] = max(self._tat[dimension], send_at) + costs[dimension] / rate
+            wait = send_at - now
+            self._stats["requests"] += 1
+            self._stats["estimated_tokens"] += tokens
+            if wait > 0:
+                self._stats["delayed"] += 1
+                self._stats["wait_seconds"] += wait
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+        return wait
+
+    def reconcile(self, estimated: int, actual: int, output_tokens: Optional[int] = None) -> None:
+        """Correct the token reservation of a finished call by its actual usage."""
+        with self._lock:
+            self._stats["actual_tokens"] += actual
+            if self._rates["tokens"]:
+                self._tat["tokens"] += (actual - estimated) / self._rates["tokens"]
+            if output_tokens:
+                self._output_tokens += 0.2 * (output_tokens - self._output_tokens)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+        return stats
+
+
+_limiters: Dict[Tuple[str, str], Optional[RateLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url: str, api_key: str) -> Optional[RateLimiter]:
+    """Shared limiter of an endpoint and key, or None when `RATE_LIMITS` has no entry for the base url."""
+    key = (base_url, api_key)
+    with _limiters_lock:
+        if key not in _limiters:
+            limits = config.rate_limits.get(base_url.rstrip("/")) or config.rate_limits.get("*")
+            limiter = None
+            if limits and (limits.get("rpm") or limits.get("tpm")):
+                key_id = hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:8]
+                limiter = RateLimiter(f"{base_url} (key {key_id})", limits.get("rpm"), limits.get("tpm"))
+                logger.info(f"Rate limiting {limiter.name}: {limits.get('rpm')} rpm / {limits.get('tpm')} tpm")
+            _limiters[key] = limiter
+        return _limiters[key]
+
+
+def _usage(usage_metadata: Dict) -> Tuple[int, int]:
+    total = sum(usage.get('total_tokens', 0) for usage in usage_metadata.values())
+    output = sum(usage.get('output_tokens', 0) for usage in usage_metadata.values())
+    return total, output
+
+
+def call_with_rate_limit(base_url: str, api_key: str, messages: List[BaseMessage], call: Callable[[], T],
+                         usage: UsageMetadataCallbackHandler) -> T:
+    """
+    Make one request through the endpoint's limiter (waiting for its slot first); `usage`
+    is the handler `call` passes to the model, which collects the usage of this request only.
+    """
+    limiter = get_rate_limiter(base_url, api_key)
+    if limiter is None:
+        return call()
+
+    estimated = limiter.estimate(messages)
+    wait = limiter.reserve(estimated)
+    if wait > 0:
+        time.sleep(wait)
+    try:
+        result = call()
+    except openai.APIStatusError:
+        # Rejected by the provider: the tokens were not spent
+        limiter.reconcile(estimated, 0)
+        raise
+    limiter.reconcile(estimated, *_usage(usage.usage_metadata))
+    return result
+
+
+async def acall_with_rate_limit(base_url: str, api_key: str, messages: List[BaseMessage],
+                                acall: Callable[[], Awaitable[T]], usage: UsageMetadataCallbackHandler) -> T:
+    """Asyncio counterpart of `call_with_rate_limit`."""
+    limiter = get_rate_limiter(base_url, api_key)
+    if limiter is None:
+        return await acall()
+
+    estimated = limiter.estimate(messages)
+    wait = limiter.reserve(estimated)
+    if wait > 0:
+        await asyncio.sleep(wait)
+    try:
+        result = await acall()
+    except openai.APIStatusError:
+        limiter.reconcile(estimated, 0)
+        raise
+    limiter.reconcile(estimated, *_usage(usage.usage_metadata))
+    return result
+
+
+def get_rate_limit_stats() -> Dict[str, Dict]:
+    """Paced requests, estimated vs. actual tokens and time spent waiting per limited endpoint."""
+    with _limiters_lock:
+        limiters = [limiter for limiter in _limiters.values() if limiter is not None]
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+__all__ = ['RateLimiter', 'get_rate_limiter', 'call_with_rate_limit', 'acall_with_rate_limit', 'get_rate_limit_stats']
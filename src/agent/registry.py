@@ -0,0 +1,90 @@
+"""
+Process-wide registry of compiled graphs.
+
+Compiling a LangGraph graph validates the topology and builds its channels, and
+the pages used to do that on every run. The registry compiles each graph once
+(with the configured checkpointer) and hands the same instance to every caller.
+`warm_up()` compiles all graphs and builds the structured-output runnables the
+nodes call (per LLM role, schema and node timeout) ahead of the first request.
+"""
+# Import libraries
+import time
+import threading
+from typing import Callable, Dict
+
+from src.config.logging_config import get_logger
+from src.agent.llm import get_structured_llm
+from src.agent.checkpoint import get_checkpointer
+from src.agent.guideline import guideline_service
+from src.agent.state import AudienceInsight, VideoScriptDraft, StaticAdDraft, EvaluationReport
+from src.agent.nodes.creative_strategy import CreativeStrategyResponse
+from src.agent.graph import (build_pre_review_graph, build_async_pre_review_graph,
+                             build_variation_graph, build_async_variation_graph)
+
+logger = get_logger(__name__)
+
+GRAPH_BUILDERS: Dict[str, Callable] = {
+    "pre_review": build_pre_review_graph,
+    "async_pre_review": build_async_pre_review_graph,
+    "variation": build_variation_graph,
+    "async_variation": build_async_variation_graph,
+}
+
+# (node, LLM role, output schema) of every structured call the nodes make; the node sets the request timeout
+STRUCTURED_OUTPUTS = [
+    ("audience_insight", "audience_insight", AudienceInsight),
+    ("creative_strategy", "creative_strategy", CreativeStrategyResponse),
+    ("script_generation", "script_generation1", VideoScriptDraft),
+    ("script_generation", "script_generation1", StaticAdDraft),
+    ("script_generation", "script_generation2", VideoScriptDraft),
+    ("script_generation", "script_generation2", StaticAdDraft),
+    ("script_evaluation", "script_evaluation_and_refinement", EvaluationReport),
+    ("script_refinement", "script_evaluation_and_refinement", VideoScriptDraft),
+    ("script_refinement", "script_evaluation_and_refinement", StaticAdDraft),
+    ("variation_generation", "script_generation1", VideoScriptDraft),
+    ("variation_generation", "script_generation1", StaticAdDraft),
+    ("variation_evaluation", "script_evaluation_and_refinement", EvaluationReport),
+    ("variation_refinement", "script_evaluation_and_refinement", VideoScriptDraft),
+    ("variation_refinement", "script_evaluation_and_refinement", StaticAdDraft),
+]
+
+_graphs = {}
+_lock = threading.Lock()
+
+
+def get_graph(name: str):
+    """Return the compiled graph registered under `name`, compiling it on first use."""
+    if name not in GRAPH_BUILDERS:
+        raise ValueError(f"Unknown graph '{name}'. Expected one of: {', '.join(GRAPH_BUILDERS)}")
+
+    graph = _graphs.get(name)
+    if graph is None:
+        with _lock:
+            graph = _graphs.get(name)
+            if graph is None:
+                started_at = time.perf_counter()
+                graph = GRAPH_BUILDERS[name](checkpointer=get_checkpointer())
+                _graphs[name] = graph
+                logger.info(f"Compiled graph '{name}' in {(time.perf_counter() - started_at) * 1000:.1f} ms")
+    return graph
+
+
+def warm_up() -> None:
+    """Compile every graph, build every structured-output runnable and load the guideline before the first run."""
+    started_at = time.perf_counter()
+    guideline_service.start_watching()
+    guideline_service.get_text()
+    for node, llm_role, output_schema in STRUCTURED_OUTPUTS:
+        get_structured_llm(llm_role, output_schema, node=node)
+    for name in GRAPH_BUILDERS:
+        get_graph(name)
+    logger.info(f"Registry warmed up in {(time.perf_counter() - started_at) * 1000:.1f} ms")
+
+
+def clear_graphs() -> None:
+    """Forget the compiled graphs so the next `get_graph` recompiles them."""
+    with _lock:
+        _graphs.clear()
+
+
+__all__ = ['get_graph', 'warm_up', 'clear_graphs', 'GRAPH_BUILDERS', 'STRUCTURED_OUTPUTS']
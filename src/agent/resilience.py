@@ -0,0 +1,280 @@
+"""
+Retries, timeouts and hedged requests for the node LLM calls.
+
+Every structured call of a node goes through `call_with_resilience` (or its
+asyncio counterpart), which
+
+- retries transient failures (429, 408/409, 5xx, connection errors and
+  timeouts) with exponential backoff and full jitter, honouring `Retry-After`;
+- leaves the per-request timeout to the model client, configured per node in
+  `LLM_TIMEOUT_SECONDS` (see `node_timeout`);
+- optionally hedges: when an attempt is still running after the node's recent
+  `LLM_HEDGE_PERCENTILE` latency, a duplicate request is fired and whichever
+  succeeds first is used. Hedging trades extra calls on the slowest few percent
+  of requests for a shorter tail, and only starts once the node has
+  `LLM_HEDGE_MIN_SAMPLES` latencies to derive the delay from.
+
+The model clients' own retries are disabled so attempts are not multiplied.
+`get_resilience_stats()` reports the counters and the latency percentiles per
+node.
+"""
+# Import libraries
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def node_timeout(node: str) -> float:
+    """Request timeout of a node in seconds (`LLM_TIMEOUT_SECONDS`, falling back to `LLM_DEFAULT_TIMEOUT_SECONDS`)."""
+    return config.llm_timeout_seconds.get(node, config.llm_default_timeout_seconds)
+
+
+@lru_cache(maxsize=None)
+def _google_transient_errors() -> tuple:
+    """Transient errors of the `google_genai` provider (empty when its client is not installed)."""
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return ()
+    return (exceptions.TooManyRequests, exceptions.ResourceExhausted, exceptions.ServiceUnavailable,
+            exceptions.InternalServerError, exceptions.DeadlineExceeded)
+
+
+def is_timeout(error: BaseException) -> bool:
+    """Whether a call failed by running into its request timeout."""
+    if isinstance(error, openai.APITimeoutError):
+        return True
+    return type(error).__name__ == "DeadlineExceeded"
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed call is worth another attempt (rate limits, server errors, timeouts, dropped connections)."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, _google_transient_errors()):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt: int, error: BaseException) -> float:
+    """Full-jitter exponential backoff for retry `attempt` (0-based); a `Retry-After` header is a lower bound."""
+    ceiling = min(config.llm_backoff_max_seconds, config.llm_backoff_base_seconds * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, config.llm_backoff_max_seconds))
+    return delay
+
+
+class ResilienceStats:
+    """Thread-safe per-node counters and a sliding window of successful call latencies."""
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._nodes = defaultdict(lambda: {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+        })
+
+    def increment(self, node: str, counter: str) -> None:
+        with self._lock:
+            self._nodes[node][counter] += 1
+
+    def record_latency(self, node: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies[node].append(seconds)
+
+    def percentile(self, node: str, percentile: float) -> Optional[float]:
+        """Latency at `percentile` over the recent window, or None with fewer than `LLM_HEDGE_MIN_SAMPLES` calls."""
+        with self._lock:
+            samples = sorted(self._latencies[node])
+        if len(samples) < max(config.llm_hedge_min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            nodes = {node: dict(stats) for node, stats in self._nodes.items()}
+            latencies = {node: sorted(samples) for node, samples in self._latencies.items()}
+        for node, stats in nodes.items():
+            samples = latencies.get(node) or []
+            for percentile in (50, 95, 99):
+                value = samples[min(len(samples) - 1, int(len(samples) * percentile / 100))] if samples else None
+                stats[f"p{percentile}_seconds"] = round(value, 3) if value is not None else None
+        return nodes
+
+    def reset(self) -> None:
+        with self._lock:
+            self._nodes.clear()
+            self._latencies.clear()
+
+
+resilience_stats = ResilienceStats(config.llm_latency_window)
+
+
+def _hedge_delay(node: str) -> Optional[float]:
+    if not config.llm_hedge_enabled:
+        return None
+    return resilience_stats.percentile(node, config.llm_hedge_percentile)
+
+
+@lru_cache(maxsize=None)
+def _hedge_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=config.http_max_connections, thread_name_prefix="llm-hedge")
+
+
+def _submit(call: Callable[[], T]):
+    # Copy the context so usage callbacks and tracing of the caller see the worker's call
+    return _hedge_executor().submit(contextvars.copy_context().run, call)
+
+
+def _hedged_attempt(node: str, call: Callable[[], T], hedge_delay: float) -> T:
+    primary = _submit(call)
+    done, _ = wait([primary], timeout=hedge_delay)
+    if done:
+        return primary.result()
+
+    logger.debug(f"{node}: no response after {hedge_delay:.2f}s, sending a hedged request")
+    resilience_stats.increment(node, "hedged")
+    hedge = _submit(call)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    resilience_stats.increment(node, "hedge_wins")
+                # The slower request is left to finish (bounded by the request timeout)
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+async def _ahedged_attempt(node: str, acall: Callable[[], Awaitable[T]], hedge_delay: float) -> T:
+    primary = asyncio.ensure_future(acall())
+    done, _ = await asyncio.wait([primary], timeout=hedge_delay)
+    if done:
+        return primary.result()
+
+    logger.debug(f"{node}: no response after {hedge_delay:.2f}s, sending a hedged request")
+    resilience_stats.increment(node, "hedged")
+    hedge = asyncio.ensure_future(acall())
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        resilience_stats.increment(node, "hedge_wins")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _on_failure(node: str, attempt: int, error: BaseException) -> Optional[float]:
+    """Count a failed attempt and return the delay before the next one, or None to give up."""
+    if is_timeout(error):
+        resilience_stats.increment(node, "timeouts")
+    if not is_retryable(error) or attempt >= config.llm_max_retries:
+        resilience_stats.increment(node, "failures")
+        return None
+    resilience_stats.increment(node, "retries")
+    delay = retry_delay(attempt, error)
+    logger.warning(f"{node}: attempt {attempt + 1} failed ({type(error).__name__}: {error}), "
+                   f"retrying in {delay:.2f}s")
+    return delay
+
+
+def call_with_resilience(node: str, call: Callable[[], T]) -> T:
+    """Run `call` with retries, backoff and (if enabled) hedging; `call` makes one request."""
+    resilience_stats.increment(node, "calls")
+    attempt = 0
+    while True:
+        resilience_stats.increment(node, "attempts")
+        hedge_delay = _hedge_delay(node)
+        started_at = time.perf_counter()
+        try:
+            result = _hedged_attempt(node, call, hedge_delay) if hedge_delay is not None else call()
+        except Exception as e:
+            delay = _on_failure(node, attempt, e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        resilience_stats.record_latency(node, time.perf_counter() - started_at)
+        return result
+
+
+async def acall_with_resilience(node: str, acall: Callable[[], Awaitable[T]]) -> T:
+    """Asyncio counterpart of `call_with_resilience`; `acall` returns a new awaitable per request."""
+    resilience_stats.increment(node, "calls")
+    attempt = 0
+    while True:
+        resilience_stats.increment(node, "attempts")
+        hedge_delay = _hedge_delay(node)
+        started_at = time.perf_counter()
+        try:
+            if hedge_delay is not None:
+                result = await _ahedged_attempt(node, acall, hedge_delay)
+            else:
+                result = await acall()
+        except Exception as e:
+            delay = _on_failure(node, attempt, e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        resilience_stats.record_latency(node, time.perf_counter() - started_at)
+        return result
+
+
+def get_resilience_stats() -> Dict[str, Dict]:
+    """Per-node calls, retries, timeouts, hedged requests and latency percentiles."""
+    return resilience_stats.snapshot()
+
+
+__all__ = ['call_with_resilience', 'acall_with_resilience', 'node_timeout', 'is_retryable', 'is_timeout', 'retry_delay',
+           'ResilienceStats', 'resilience_stats', 'get_resilience_stats']
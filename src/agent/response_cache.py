@@ -0,0 +1,162 @@
+"""
+Content-addressed LLM response cache.
+
+Identical briefs come through more than once (UI retries, "Try Again", batch
+reruns) and every node would repeat the exact same LLM call. When enabled with
+`LLM_CACHE_ENABLED`, structured responses are stored in a local SQLite file keyed
+by a hash of the rendered messages, the model, base url, temperature and output
+schema. The store is bounded: entries older than `LLM_CACHE_TTL_SECONDS` expire
+and the least recently used entries are evicted above `LLM_CACHE_MAX_ENTRIES`.
+
+A cache hit replays the stored response and costs no tokens, so cached reruns of
+an unchanged brief finish in milliseconds. Hits and misses are counted per node.
+"""
+# Import libraries
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from functools import lru_cache
+from collections import defaultdict
+from typing import Dict, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+from langchain_core.messages import BaseMessage
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def build_cache_key(messages: List[BaseMessage], model: str, base_url: str, temperature: str,
+                    output_schema: Type[BaseModel]) -> str:
+    """SHA-256 of everything that determines the response of a structured LLM call."""
+    payload = {
+        "messages": [[message.type, message.content] for message in messages],
+        "model": model,
+        "base_url": base_url,
+        "temperature": str(temperature),
+        "schema": output_schema.__name__,
+        "schema_definition": output_schema.model_json_schema(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Bounded SQLite store of structured responses with TTL expiry and LRU eviction."""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int, name: str = "LLM cache"):
+        self.path = path
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "tokens_saved": 0})
+
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    schema TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    total_tokens INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    last_accessed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses (last_accessed_at)")
+
+    def get(self, key: str, output_schema: Type[BaseModel], node: str) -> Optional[BaseModel]:
+        """Return the cached response for `key`, or None on a miss or an expired entry."""
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response, total_tokens, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[2] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                self.conn.execute("UPDATE responses SET last_accessed_at = ? WHERE key = ?", (now, key))
+
+        response = None
+        if row:
+            try:
+                response = output_schema.model_validate_json(row[0])
+            except ValidationError as e:
+                # The schema changed under the same name; treat as a miss and let the new response replace it
+                logger.warning(f"{self.name}: discarding cached {output_schema.__name__} for {node}: {e}")
+
+        with self.lock:
+            stats = self._stats[node]
+            if response is None:
+                stats["misses"] += 1
+            else:
+                stats["hits"] += 1
+                stats["tokens_saved"] += row[1]
+
+        if response is not None:
+            logger.info(f"{self.name} hit for {node}")
+        return response
+
+    def put(self, key: str, response: BaseModel, total_tokens: int = 0) -> None:
+        """Store a response and evict the least recently used entries above `max_entries`."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, schema, response, total_tokens, created_at, last_accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, type(response).__name__, response.model_dump_json(), total_tokens, now, now),
+            )
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per node since start."""
+        with self.lock:
+            return {node: dict(stats) for node, stats in self._stats.items()}
+
+    def clear(self) -> None:
+        """Remove every stored response."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+
+
+_response_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _build_response_cache() -> Optional[ResponseCache]:
+    if not config.llm_cache_enabled:
+        return None
+    logger.info(f"LLM response cache enabled at {config.llm_cache_path}")
+    return ResponseCache(config.llm_cache_path, config.llm_cache_max_entries, config.llm_cache_ttl_seconds)
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache, or None when `LLM_CACHE_ENABLED` is off."""
+    # lru_cache alone lets concurrent first calls (nodes in worker threads) each build their own cache
+    with _response_cache_lock:
+        return _build_response_cache()
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Per-node hit/miss counters (empty when the cache is disabled)."""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {}
+
+
+__all__ = ['ResponseCache', 'build_cache_key', 'get_response_cache', 'get_cache_stats']
@@ -0,0 +1,197 @@
+"""
+Latency-aware routing and failover across the endpoints of an LLM role.
+
+A role can list fallback endpoints (`LLM_FALLBACK_ENDPOINTS`: other
+OpenAI-compatible servers, local ones included, or `google_genai` models) after
+its own. The router keeps, per endpoint, an EWMA of the call latency and of the
+error rate, and ranks the endpoints of a call by expected time per successful
+call (`latency / (1 - error rate)`), configured order breaking ties and going
+first while nothing has been measured yet.
+
+A call goes to the best-ranked endpoint and fails over down the ranking when it
+raises. After `ROUTING_FAILURE_THRESHOLD` consecutive failures an endpoint is
+taken out of rotation for `ROUTING_COOLDOWN_SECONDS`. A small share of calls
+(`ROUTING_PROBE_RATIO`) goes to another healthy endpoint so its estimate stays
+current and a recovered endpoint wins its traffic back.
+"""
+# Import libraries
+import time
+import random
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+from src.agent.resilience import is_retryable, is_timeout
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+E = TypeVar("E")
+
+
+def endpoint_name(endpoint: Any) -> str:
+    """Stable label of an endpoint (anything with `provider`, `model` and `base_url`)."""
+    location = endpoint.base_url or endpoint.provider.value
+    return f"{endpoint.model}@{location}"
+
+
+@dataclass
+class EndpointHealth:
+    """Latency and error EWMAs and the failure streak of one endpoint."""
+    latency_ewma: Optional[float] = None
+    error_ewma: float = 0.0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    calls: int = 0
+    failures: int = 0
+    failovers: int = 0
+
+    def expected_seconds(self) -> float:
+        """Expected time per successful call, infinite while no latency has been measured."""
+        if self.latency_ewma is None:
+            return float("inf")
+        return self.latency_ewma / max(1.0 - self.error_ewma, 0.05)
+
+
+class Router:
+    """Ranks endpoints by their health and records the outcome of every call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._health: Dict[str, EndpointHealth] = {}
+
+    def _get(self, name: str) -> EndpointHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = EndpointHealth()
+        return health
+
+    def rank(self, endpoints: Sequence[E]) -> List[E]:
+        """Endpoints in the order they should be tried for the next call."""
+        if len(endpoints) < 2:
+            return list(endpoints)
+        now = time.monotonic()
+        with self._lock:
+            health = {endpoint_name(e): self._get(endpoint_name(e)) for e in endpoints}
+        order = {endpoint_name(e): index for index, e in enumerate(endpoints)}
+
+        available = [e for e in endpoints if health[endpoint_name(e)].cooldown_until <= now]
+        cooling = [e for e in endpoints if health[endpoint_name(e)].cooldown_until > now]
+        available.sort(key=lambda e: (health[endpoint_name(e)].expected_seconds(), order[endpoint_name(e)]))
+        cooling.sort(key=lambda e: health[endpoint_name(e)].cooldown_until)
+
+        if len(available) > 1 and random.random() < config.routing_probe_ratio:
+            probe = random.choice(available[1:])
+            available.remove(probe)
+            available.insert(0, probe)
+        return available + cooling
+
+    def record_success(self, name: str, seconds: float) -> None:
+        alpha = config.routing_ewma_alpha
+        with self._lock:
+            health = self._get(name)
+            health.calls += 1
+            health.latency_ewma = seconds if health.latency_ewma is None else \
+                health.latency_ewma + alpha * (seconds - health.latency_ewma)
+            health.error_ewma -= alpha * health.error_ewma
+            health.consecutive_failures = 0
+
+    def record_failure(self, name: str, seconds: float, timed_out: bool, cool_down: bool = True) -> None:
+        alpha = config.routing_ewma_alpha
+        with self._lock:
+            health = self._get(name)
+            health.calls += 1
+            health.failures += 1
+            if timed_out:
+                # A timeout is a lower bound of the latency
+                health.latency_ewma = seconds if health.latency_ewma is None else \
+                    health.latency_ewma + alpha * (seconds - health.latency_ewma)
+            health.error_ewma += alpha * (1.0 - health.error_ewma)
+            health.consecutive_failures += 1
+            if cool_down and health.consecutive_failures >= config.routing_failure_threshold:
+                health.cooldown_until = time.monotonic() + config.routing_cooldown_seconds
+                health.consecutive_failures = 0
+                logger.warning(f"Endpoint {name} taken out of rotation for {config.routing_cooldown_seconds}s")
+
+    def record_failover(self, name: str) -> None:
+        with self._lock:
+            self._get(name).failovers += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "calls": health.calls,
+                    "failures": health.failures,
+                    "failovers": health.failovers,
+                    "latency_ewma_seconds": round(health.latency_ewma, 3) if health.latency_ewma is not None else None,
+                    "error_ewma": round(health.error_ewma, 3),
+                    "in_cooldown": health.cooldown_until > now,
+                }
+                for name, health in self._health.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._health.clear()
+
+
+router = Router()
+
+
+def _first_error(errors: List[Exception]) -> Exception:
+    # Prefer a transient error so the retry layer tries the endpoints again
+    return next((error for error in errors if is_retryable(error)), errors[0])
+
+
+def route(node: str, endpoints: Sequence[E], call: Callable[[E], T]) -> T:
+    """Make one call on the best-ranked endpoint, failing over to the next ones when it raises."""
+    errors = []
+    for endpoint in router.rank(endpoints):
+        name = endpoint_name(endpoint)
+        if errors:
+            router.record_failover(name)
+            logger.warning(f"{node}: failing over to {name}")
+        started_at = time.perf_counter()
+        try:
+            result = call(endpoint)
+        except Exception as e:
+            # A role's only endpoint is never taken out of rotation
+            router.record_failure(name, time.perf_counter() - started_at, is_timeout(e), len(endpoints) > 1)
+            errors.append(e)
+            continue
+        router.record_success(name, time.perf_counter() - started_at)
+        return result
+    raise _first_error(errors)
+
+
+async def aroute(node: str, endpoints: Sequence[E], acall: Callable[[E], Awaitable[T]]) -> T:
+    """Asyncio counterpart of `route`."""
+    errors = []
+    for endpoint in router.rank(endpoints):
+        name = endpoint_name(endpoint)
+        if errors:
+            router.record_failover(name)
+            logger.warning(f"{node}: failing over to {name}")
+        started_at = time.perf_counter()
+        try:
+            result = await acall(endpoint)
+        except Exception as e:
+            # A role's only endpoint is never taken out of rotation
+            router.record_failure(name, time.perf_counter() - started_at, is_timeout(e), len(endpoints) > 1)
+            errors.append(e)
+            continue
+        router.record_success(name, time.perf_counter() - started_at)
+        return result
+    raise _first_error(errors)
+
+
+def get_routing_stats() -> Dict[str, Dict]:
+    """Calls, failures, failovers and latency/error EWMAs per endpoint."""
+    return router.stats()
+
+
+__all__ = ['Router', 'EndpointHealth', 'router', 'route', 'aroute', 'endpoint_name', 'get_routing_stats']
@@ -0,0 +1,129 @@
+"""
+Prompt serialization profiles.
+
+The message builders embed structured inputs as text. `PROMPT_SERIALIZATION`
+selects how:
+
+- `pretty`: `json.dumps(..., indent=2)`, `model_dump_json(indent=2)` and
+  `yaml.dump` for the guideline (the original prompts, byte for byte);
+- `compact`: single-line JSON without whitespace;
+- `minimal`: indented `key: value` lines without quotes or brackets.
+
+Whitespace and JSON punctuation are a large share of the prompt tokens, so the
+compact profiles trade readability of the prompts for throughput. See
+`benchmarks/serialization_profiles.py` for the measured difference.
+"""
+# Import libraries
+import json
+from enum import Enum
+from typing import Any, List, Optional, Tuple
+
+import yaml
+from pydantic import BaseModel
+
+from src.config.config import config, PromptSerialization
+
+_INDENT = "  "
+
+
+def current_profile() -> PromptSerialization:
+    """Serialization profile configured for this deployment."""
+    return config.prompt_serialization
+
+
+def _minimal_scalar(value: Any) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        # Keep one value per line
+        return " ".join(value.split()) if "\n" in value else value
+    if isinstance(value, dict):
+        return "{}"
+    if isinstance(value, (list, tuple)):
+        return "[]"
+    return str(value)
+
+
+def _is_block(value: Any) -> bool:
+    return isinstance(value, (dict, list, tuple)) and len(value) > 0
+
+
+def _minimal_lines(value: Any, depth: int) -> List[str]:
+    indent = _INDENT * depth
+    if isinstance(value, dict):
+        labelled = [(f"{_minimal_scalar(key)}:", item) for key, item in value.items()]
+    else:
+        labelled = [("-", item) for item in value]
+    lines = []
+    for label, item in labelled:
+        if _is_block(item):
+            lines.append(f"{indent}{label}")
+            lines.extend(_minimal_lines(item, depth + 1))
+        else:
+            lines.append(f"{indent}{label} {_minimal_scalar(item)}")
+    return lines
+
+
+def render_value(value: Any, depth: int = 0, profile: Optional[PromptSerialization] = None) -> str:
+    """
+    Serialize `value` as it appears nested `depth` levels deep in an object.
+
+    In the `pretty` profile this is `json.dumps(value, indent=2)` re-indented for
+    `depth`; a `minimal` block starts with a newline so it can follow `key:`.
+    """
+    profile = profile or current_profile()
+    if profile == PromptSerialization.compact:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    if profile == PromptSerialization.minimal:
+        if not _is_block(value):
+            return _minimal_scalar(value)
+        return "\n" + "\n".join(_minimal_lines(value, depth))
+    return json.dumps(value, indent=2).replace("\n", "\n" + _INDENT * depth)
+
+
+def render_object(entries: List[Tuple[str, str]], depth: int = 0, profile: Optional[PromptSerialization] = None) -> str:
+    """
+    Assemble an object from values already rendered for `depth + 1` (see `render_value`).
+
+    In the `pretty` profile the result is identical to `json.dumps` of the
+    equivalent dict with `indent=2`.
+    """
+    profile = profile or current_profile()
+    if profile == PromptSerialization.compact:
+        return "{" + ",".join(f"{json.dumps(key, ensure_ascii=False)}:{value}" for key, value in entries) + "}"
+    if profile == PromptSerialization.minimal:
+        indent = _INDENT * depth
+        lines = "\n".join(f"{indent}{key}:{'' if value.startswith(chr(10)) else ' '}{value}" for key, value in entries)
+        return ("\n" + lines) if depth else lines
+    if not entries:
+        return "{}"
+    inner = "\n" + _INDENT * (depth + 1)
+    body = ("," + inner).join(f"{json.dumps(key)}: {value}" for key, value in entries)
+    return "{" + inner + body + "\n" + _INDENT * depth + "}"
+
+
+def render_model(model: BaseModel, profile: Optional[PromptSerialization] = None) -> str:
+    """Serialize a pydantic model on its own (`model_dump_json(indent=2)` in the `pretty` profile)."""
+    profile = profile or current_profile()
+    if profile == PromptSerialization.compact:
+        return model.model_dump_json()
+    if profile == PromptSerialization.minimal:
+        return render_value(model.model_dump(mode="json"), 0, profile).lstrip("\n")
+    return model.model_dump_json(indent=2)
+
+
+def render_document(data: Any, profile: Optional[PromptSerialization] = None) -> str:
+    """Serialize a reference document such as the guideline (`yaml.dump` in the `pretty` profile)."""
+    profile = profile or current_profile()
+    if profile == PromptSerialization.compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+    if profile == PromptSerialization.minimal:
+        return render_value(data, 0, profile).lstrip("\n") + "\n"
+    return yaml.dump(data, sort_keys=False)
+
+
+__all__ = ['current_profile', 'render_value', 'render_object', 'render_model', 'render_document']
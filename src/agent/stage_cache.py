@@ -0,0 +1,145 @@
+"""
+Stage-level caches for the audience insight and creative strategy results.
+
+The first two nodes only depend on a small part of the brief: the audience
+insight is a function of `audience_persona` and `product`, the creative strategy
+additionally of the campaign parameters and the insight itself. Results are
+stored under a canonical fingerprint of exactly those fields (plus the model
+and the prompt that produced them), so a persona + product pair that has been
+analysed once is reused across campaigns and platforms, even when the rendered
+prompts differ in whitespace or field order.
+
+Off by default, like the LLM response cache, since it reuses LLM output across
+campaigns and writes to disk; enabled with `STAGE_CACHE_ENABLED`. Entries share
+the bounded SQLite store of `src.agent.response_cache`.
+"""
+# Import libraries
+import json
+import hashlib
+import asyncio
+import threading
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+from pydantic import BaseModel
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+from src.agent.state import AgentState
+from src.agent.prompts import audience_insight_system_prompt, creative_strategy_system_prompt
+from src.agent.response_cache import ResponseCache
+from src.agent.guideline import get_guideline_text, guideline_sections
+
+logger = get_logger(__name__)
+
+# Stage -> (LLM role, AgentState fields the stage reads)
+STAGES = {
+    "audience_insight": (
+        "audience_insight",
+        ["audience_persona", "product"],
+    ),
+    "creative_strategy": (
+        "creative_strategy",
+        ["audience_persona", "product", "audience_insight", "campaign_goal", "ad_platform",
+         "creative_direction", "script_tone", "product_feature_focus"],
+    ),
+}
+
+# Lists whose order carries no meaning and is normalised in the fingerprint
+_UNORDERED_FIELDS = {"location", "supported_platforms", "lifestyle"}
+
+
+def _canonical(value: Any, field: str = None) -> Any:
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(k).strip(): _canonical(v, str(k)) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        items = [_canonical(v) for v in value]
+        if field in _UNORDERED_FIELDS:
+            items = sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+        return items
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def _stage_prompt(stage: str, state: AgentState) -> str:
+    if stage == "audience_insight":
+        return audience_insight_system_prompt
+    # The creative strategy prompt also embeds the guideline sections selected for the brief
+    sections = guideline_sections(state.ad_platform, state.creative_direction, "creative_strategy")
+    return creative_strategy_system_prompt + get_guideline_text(sections)
+
+
+def stage_fingerprint(stage: str, state: AgentState) -> str:
+    """SHA-256 of the canonical inputs of a stage, the model that runs it and its prompt."""
+    llm_role, fields = STAGES[stage]
+    settings = config.get_llm_settings(llm_role)
+    payload = {
+        "stage": stage,
+        "inputs": {field: _canonical(getattr(state, field), field) for field in fields},
+        "model": settings.model,
+        "base_url": settings.base_url,
+        "prompt": hashlib.sha256(_stage_prompt(stage, state).encode("utf-8")).hexdigest(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+_stage_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _build_stage_cache() -> Optional[ResponseCache]:
+    if not config.stage_cache_enabled:
+        return None
+    logger.info(f"Stage cache enabled at {config.stage_cache_path}")
+    return ResponseCache(config.stage_cache_path, config.stage_cache_max_entries,
+                         config.stage_cache_ttl_seconds, name="Stage cache")
+
+
+def get_stage_cache() -> Optional[ResponseCache]:
+    """Process-wide stage cache, or None when `STAGE_CACHE_ENABLED` is off."""
+    # Built under a lock: the async nodes reach it from several worker threads at once
+    with _stage_cache_lock:
+        return _build_stage_cache()
+
+
+def load_stage_result(stage: str, state: AgentState, output_schema: Type[BaseModel]) -> Optional[BaseModel]:
+    """Return the stored result of `stage` for the inputs in `state`, if any."""
+    cache = get_stage_cache()
+    if cache is None:
+        return None
+    return cache.get(stage_fingerprint(stage, state), output_schema, stage)
+
+
+def save_stage_result(stage: str, state: AgentState, response: BaseModel, token_usage: Dict) -> None:
+    """Store the result of `stage` under the fingerprint of its inputs."""
+    cache = get_stage_cache()
+    if cache is None:
+        return
+    total_tokens = sum(usage.get('total_tokens', 0) for usage in token_usage.values())
+    cache.put(stage_fingerprint(stage, state), response, total_tokens)
+
+
+async def aload_stage_result(stage: str, state: AgentState, output_schema: Type[BaseModel]) -> Optional[BaseModel]:
+    """Asyncio counterpart of `load_stage_result`."""
+    return await asyncio.to_thread(load_stage_result, stage, state, output_schema)
+
+
+async def asave_stage_result(stage: str, state: AgentState, response: BaseModel, token_usage: Dict) -> None:
+    """Asyncio counterpart of `save_stage_result`."""
+    await asyncio.to_thread(save_stage_result, stage, state, response, token_usage)
+
+
+def get_stage_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Per-stage hit/miss counters (empty when the stage cache is disabled)."""
+    cache = get_stage_cache()
+    return cache.stats() if cache is not None else {}
+
+
+__all__ = ['STAGES', 'stage_fingerprint', 'get_stage_cache', 'load_stage_result', 'save_stage_result',
+           'aload_stage_result', 'asave_stage_result', 'get_stage_cache_stats']
@@ -9,7 +9,7 @@ Last Edit: 27-07-2025
 import json
 from enum import Enum
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Annotated, Dict, List, Optional, Union
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -256,6 +256,28 @@ class AudienceInsight(BaseModel):
     )
 
 
+class CreativeStrategyResponse(BaseModel):
+    """Response schema of the creative strategy node"""
+    core_message_pillars: List[str] = Field(
+        description="3 most important messages the ad should convey."
+    )
+    brainstormed_hooks: List[str] = Field(
+        description="3-5 ideas for attention-grabbing opening lines."
+    )
+    generated_ctas: List[str] = Field(
+        description="A set of diverse Call-to-Action phrases relevant to the campaign_goal and brand_voice."
+    )
+    emotional_triggers: List[str] = Field(
+        description="Specific emotions to evoke in the audience."
+    )
+    primary_visual_concept: str = Field(
+        description="A brief description of the recommended visual style and concepts for the ad."
+    )
+    audio_strategy: str = Field(
+        description="A brief description of the recommended audio strategy (e.g., trending music, voiceover)."
+    )
+
+
 class Scene(BaseModel):
     """
     Mewakili satu adegan dalam skrip iklan video.
@@ -366,6 +388,24 @@ class VariationRequest(BaseModel):
     )
 
 
+class LLMCallTrace(BaseModel):
+    """
+    Catatan ringkas satu panggilan LLM dari sebuah node, disimpan di `tool_calls_history`.
+    """
+    node: str = Field(..., description="Node yang melakukan panggilan")
+    started_at: datetime = Field(..., description="Waktu panggilan dimulai")
+    latency_seconds: float = Field(default=0.0, description="Durasi panggilan dalam detik")
+    model: Optional[str] = Field(default=None, description="Model yang menghasilkan respons")
+    endpoint: Optional[str] = Field(default=None, description="Endpoint yang menjawab panggilan")
+    input_tokens: int = Field(default=0, description="Token prompt")
+    output_tokens: int = Field(default=0, description="Token completion")
+    cached_input_tokens: int = Field(default=0, description="Token prompt yang dilayani dari cache prompt penyedia")
+    cache_hit: bool = Field(default=False, description="Respons diambil dari cache respons atau cache tahap")
+    retries: int = Field(default=0, description="Permintaan tambahan (retry, failover, hedge) di luar yang pertama")
+    outcome: str = Field(default="ok", description="Hasil panggilan: ok, cache_hit, stage_cache_hit, parse_error atau error")
+    prompt_hash: Optional[str] = Field(default=None, description="Hash SHA-256 (12 karakter) dari prompt, bukan teks lengkapnya")
+
+
 class SingleVariation(BaseModel):
     """
     Mewakili satu variasi uji A/B yang disempurnakan.
@@ -379,6 +419,22 @@ class SingleVariation(BaseModel):
     )
     variation_iteration_count: int = Field(default=0, description="Jumlah iterasi penyempurnaan")
     notes: Optional[str] = Field(None, description="Catatan tambahan tentang variasi ini")
+    variation_index: int = Field(default=0, description="Posisi variasi ini di antara varian yang dihasilkan paralel")
+    total_llm_tokens: int = Field(default=0, description="Jumlah token LLM yang dipakai untuk menghasilkan variasi ini")
+    call_traces: List[LLMCallTrace] = Field(
+        default_factory=list, description="Catatan panggilan LLM dari cabang yang menghasilkan variasi ini"
+    )
+
+
+def merge_variation_results(existing: Optional[List[SingleVariation]],
+                            new: Optional[List[SingleVariation]]) -> List[SingleVariation]:
+    """
+    Reducer untuk `variation_results`: menggabungkan hasil dari cabang varian paralel.
+    Mengirim `None` mengosongkan daftar sebelum fan-out baru dimulai.
+    """
+    if new is None:
+        return []
+    return sorted((existing or []) + new, key=lambda variation: variation.variation_index)
 
 
 class AgentState(BaseModel):
@@ -444,6 +500,10 @@ class AgentState(BaseModel):
         default=None,
         description="Laporan rinci berbagai kriteria dari Agen Penilai yang mengevaluasi draf skrip saat ini."
     )
+    script_candidates: Optional[List[Dict]] = Field(
+        default=None,
+        description="Ringkasan draf awal dari setiap LLM generator (peran, model, skor) dan draf mana yang dipilih untuk penyempurnaan."
+    )
     revision_feedback: Optional[str] = Field(
         default=None,
         description="Umpan balik evaluator atau pemeriksa dengan permintaan revisi spesifik untuk penulis skrip."
@@ -468,13 +528,26 @@ class AgentState(BaseModel):
         default=None,
         description="Hasil variasi tunggal akhir dengan semua penyempurnaan"
     )
+    variation_count: int = Field(
+        default=1,
+        ge=1,
+        description="Jumlah varian A/B yang dihasilkan secara paralel oleh graph variasi"
+    )
+    variation_index: int = Field(
+        default=0,
+        description="Indeks varian yang sedang dikerjakan oleh satu cabang graph variasi"
+    )
+    variation_results: Annotated[List[SingleVariation], merge_variation_results] = Field(
+        default_factory=list,
+        description="Semua varian A/B akhir, diurutkan berdasarkan indeks varian"
+    )
     is_variation_workflow: bool = Field(
         default=False,
         description="Tanda untuk menunjukkan apakah ini adalah alur kerja generasi variasi"
     )
-    tool_calls_history: Optional[List[Dict]] = Field(
+    tool_calls_history: Optional[List[LLMCallTrace]] = Field(
         default=None,
-        description="Catatan kronologis panggilan alat atau agen yang dipanggil selama alur kerja, dengan input/output yang relevan."
+        description="Catatan kronologis panggilan LLM selama alur kerja (ring buffer, paling banyak CALL_TRACE_MAX_ENTRIES entri)."
     )
     script_iteration_history: Optional[List[Dict]] = Field(
         default=None,
@@ -0,0 +1,54 @@
+"""
+Prompt token estimates.
+
+Token counts use `tiktoken` when it is installed and its encoding can be loaded
+(`TOKEN_ENCODING`, `cl100k_base` by default); otherwise they fall back to the
+usual ~4 characters per token estimate. The counts are used to budget prompt
+sections, not to bill, so the fallback is close enough.
+"""
+# Import libraries
+from functools import lru_cache
+from typing import List
+
+from langchain_core.messages import BaseMessage
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken is not installed, estimating tokens as characters / 4")
+        return None
+    try:
+        return tiktoken.get_encoding(config.token_encoding)
+    except Exception as e:
+        # The encoding files are downloaded on first use and may be unreachable
+        logger.warning(f"Could not load tiktoken encoding '{config.token_encoding}', estimating tokens as characters / 4: {e}")
+        return None
+
+
+@lru_cache(maxsize=1024)
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text` (memoized; system prompts and repeated sections are counted once)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    """Number of tokens in the content of `messages`."""
+    return sum(count_tokens(message.content) for message in messages if isinstance(message.content, str))
+
+
+__all__ = ['count_tokens', 'count_message_tokens']
@@ -0,0 +1,222 @@
+"""
+Gantt chart of a traced run.
+
+Reads the OTLP JSON Lines file written by `src.agent.tracing` and renders the
+spans of one run as a standalone SVG: one row per span in execution order,
+indented under its parent, with the share of the run's wall time each span
+took. Repeated executions of a node are numbered (`script_refinement_node #2`),
+so the rounds of the refinement loops can be compared directly.
+
+    python -m src.agent.trace_gantt traces.jsonl --output run.svg [--trace <trace or run id>] [--max-depth 2]
+
+The run's top-level nodes are also printed by share of wall time.
+"""
+# Import libraries
+import json
+import math
+import argparse
+from pathlib import Path
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+from xml.sax.saxutils import escape
+
+LABEL_WIDTH = 330
+CHART_WIDTH = 900
+ROW_HEIGHT = 20
+HEADER_HEIGHT = 44
+INDENT = 14
+
+# Bar colours by span kind
+KIND_COLORS = {"run": "#4C78A8", "node": "#F58518", "llm_call": "#54A24B", "request": "#B279A2"}
+ERROR_COLOR = "#E45756"
+
+
+@dataclass
+class TraceSpan:
+    """A span read back from the OTLP JSON export."""
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    label: str = ""
+    depth: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    @property
+    def kind(self) -> str:
+        """run, node, llm_call or request, from the attributes `src.agent.tracing` sets."""
+        if "gen_ai.request.model" in self.attributes:
+            return "request"
+        if "agent.node" in self.attributes:
+            return "llm_call"
+        if "langgraph.node" in self.attributes:
+            return "node"
+        return "run"
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()), None)
+
+
+def load_traces(path: Union[str, Path]) -> Dict[str, List[TraceSpan]]:
+    """Spans of every trace in an OTLP JSON Lines file, by trace id, in file order."""
+    traces = defaultdict(list)
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for otlp in scope_spans.get("spans", []):
+                        status = otlp.get("status") or {}
+                        traces[otlp["traceId"]].append(TraceSpan(
+                            trace_id=otlp["traceId"],
+                            span_id=otlp["spanId"],
+                            parent_span_id=otlp.get("parentSpanId") or None,
+                            name=otlp["name"],
+                            start_ns=int(otlp["startTimeUnixNano"]),
+                            end_ns=int(otlp["endTimeUnixNano"]),
+                            attributes={a["key"]: _attribute_value(a["value"]) for a in otlp.get("attributes", [])},
+                            error=status.get("message") if status.get("code") == 2 else None,
+                        ))
+    return dict(traces)
+
+
+def select_trace(traces: Dict[str, List[TraceSpan]], trace_or_run_id: Optional[str] = None) -> List[TraceSpan]:
+    """Spans of the trace with the given trace id or `agent.run_id` (default: the last trace of the file)."""
+    if not traces:
+        raise ValueError("The file contains no traces.")
+    if trace_or_run_id is None:
+        return list(traces.values())[-1]
+    matches = [spans for trace_id, spans in traces.items()
+               if trace_id == trace_or_run_id or any(s.attributes.get("agent.run_id") == trace_or_run_id for s in spans)]
+    if not matches:
+        raise ValueError(f"No trace with trace or run id {trace_or_run_id}.")
+    return matches[-1]
+
+
+def order_spans(spans: List[TraceSpan], max_depth: Optional[int] = None) -> List[TraceSpan]:
+    """Spans depth-first in start order, with their depth and a label numbering repeated siblings."""
+    children = defaultdict(list)
+    span_ids = {s.span_id for s in spans}
+    for s in spans:
+        # Spans whose parent was not exported are shown as roots
+        children[s.parent_span_id if s.parent_span_id in span_ids else None].append(s)
+
+    ordered = []
+
+    def visit(parent_id: Optional[str], depth: int) -> None:
+        siblings = sorted(children[parent_id], key=lambda s: s.start_ns)
+        totals = Counter(s.name for s in siblings)
+        seen = Counter()
+        for s in siblings:
+            seen[s.name] += 1
+            s.depth = depth
+            s.label = f"{s.name} #{seen[s.name]}" if totals[s.name] > 1 else s.name
+            ordered.append(s)
+            if max_depth is None or depth < max_depth:
+                visit(s.span_id, depth + 1)
+
+    visit(None, 0)
+    return ordered
+
+
+def _tick_step(total_seconds: float) -> float:
+    raw = max(total_seconds, 1e-3) / 8
+    magnitude = 10 ** math.floor(math.log10(raw))
+    return next(step * magnitude for step in (1, 2, 5, 10) if step * magnitude >= raw)
+
+
+def render_gantt_svg(spans: List[TraceSpan], title: Optional[str] = None, max_depth: Optional[int] = None) -> str:
+    """The spans of one trace as a standalone SVG Gantt chart."""
+    rows = order_spans(spans, max_depth)
+    if not rows:
+        raise ValueError("The trace has no spans.")
+    start = min(s.start_ns for s in rows)
+    total_seconds = max((max(s.end_ns for s in rows) - start) / 1e9, 1e-9)
+    scale = CHART_WIDTH / total_seconds
+    width = LABEL_WIDTH + CHART_WIDTH + 130
+    height = HEADER_HEIGHT + len(rows) * ROW_HEIGHT + 10
+
+    title = title or f"Trace {rows[0].trace_id} ({total_seconds:.2f}s)"
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="Helvetica, Arial, sans-serif" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="8" y="16" font-size="13" font-weight="bold">{escape(title)}</text>',
+    ]
+
+    parts += [f'<rect x="0" y="{HEADER_HEIGHT + index * ROW_HEIGHT}" width="{width}" height="{ROW_HEIGHT}" fill="#f7f7f7"/>'
+              for index in range(1, len(rows), 2)]
+
+    # Time axis with vertical grid lines
+    step = _tick_step(total_seconds)
+    tick = 0.0
+    while tick <= total_seconds + 1e-9:
+        x = LABEL_WIDTH + tick * scale
+        parts.append(f'<line x1="{x:.1f}" y1="{HEADER_HEIGHT - 6}" x2="{x:.1f}" y2="{height - 10}" stroke="#ddd"/>')
+        parts.append(f'<text x="{x:.1f}" y="{HEADER_HEIGHT - 10}" text-anchor="middle" fill="#555">{tick:g}s</text>')
+        tick += step
+
+    for index, s in enumerate(rows):
+        y = HEADER_HEIGHT + index * ROW_HEIGHT
+        x = LABEL_WIDTH + (s.start_ns - start) / 1e9 * scale
+        bar_width = max(s.seconds * scale, 1.0)
+        share = s.seconds / total_seconds
+        color = ERROR_COLOR if s.error else KIND_COLORS[s.kind]
+        tooltip = f"{s.label}: {s.seconds:.3f}s ({share:.0%})"
+        if s.error:
+            tooltip += f"\n{s.error}"
+        tooltip += "".join(f"\n{key}: {value}" for key, value in s.attributes.items())
+
+        parts.append(f'<text x="{8 + s.depth * INDENT}" y="{y + 14}">{escape(s.label)}</text>')
+        parts.append(f'<rect x="{x:.1f}" y="{y + 3}" width="{bar_width:.1f}" height="{ROW_HEIGHT - 6}" rx="2" '
+                     f'fill="{color}"><title>{escape(tooltip)}</title></rect>')
+        parts.append(f'<text x="{x + bar_width + 4:.1f}" y="{y + 14}" fill="#333">{s.seconds:.2f}s ({share:.0%})</text>')
+
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
+
+
+def node_time_shares(spans: List[TraceSpan]) -> List[Dict[str, Any]]:
+    """Node spans directly under the run span with their seconds and share of the run's wall time."""
+    rows = order_spans(spans, max_depth=1)
+    roots = [s for s in rows if s.depth == 0]
+    if not roots:
+        return []
+    total_seconds = max(sum(s.seconds for s in roots), 1e-9)
+    nodes = sorted((s for s in rows if s.depth == 1), key=lambda s: -s.seconds)
+    return [{"node": s.label, "seconds": round(s.seconds, 3), "share": s.seconds / total_seconds} for s in nodes]
+
+
+__all__ = ['TraceSpan', 'load_traces', 'select_trace', 'order_spans', 'render_gantt_svg', 'node_time_shares']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a traced run as an SVG Gantt chart.")
+    parser.add_argument("traces", help="OTLP JSON Lines file written by the tracer (TRACE_EXPORT_PATH).")
+    parser.add_argument("--trace", default=None, help="Trace id or run id to render (default: the last run in the file).")
+    parser.add_argument("--output", default="trace.svg", help="SVG file to write.")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="Deepest span level to draw (0: the run only, 1: its nodes, ...).")
+    args = parser.parse_args()
+
+    spans = select_trace(load_traces(args.traces), args.trace)
+    Path(args.output).write_text(render_gantt_svg(spans, max_depth=args.max_depth), encoding="utf-8")
+    print(f"Gantt chart of trace {spans[0].trace_id} written to {args.output}")
+    for row in node_time_shares(spans):
+        print(f"{row['node']}: {row['seconds']}s ({row['share']:.0%} of wall time)")
+
+
+if __name__ == "__main__":
+    main()
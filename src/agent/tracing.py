@@ -0,0 +1,235 @@
+"""
+Span tracing of graph runs, exported offline as OTLP JSON.
+
+A run (`invoke_graph` / `ainvoke_graph` / `stream_graph`) opens a root span; every
+graph node it executes gets a child span (`traced_node`, applied when the graphs
+are built), every structured LLM call of a node a span under the node, and every
+request of that call (retries, failovers and hedges included) a span under the
+call. Parents are tracked in a context variable, so spans opened in worker
+threads and asyncio tasks that copy the context land under the right parent.
+
+When the root span ends, the spans of the run are appended as one OTLP
+`ExportTraceServiceRequest` in JSON to `TRACE_EXPORT_PATH` (one line per run, the
+layout of the OpenTelemetry Collector file exporter), so traces can be inspected
+without a collector or loaded into any OTLP-aware tool later.
+`src.agent.trace_gantt` renders the spans of a run as a Gantt chart. Tracing is
+off while `TRACE_EXPORT_PATH` is empty; spans opened outside a run are not recorded.
+"""
+# Import libraries
+import json
+import time
+import uuid
+import inspect
+import secrets
+import threading
+import functools
+import contextvars
+from pathlib import Path
+from enum import Enum
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from src.config.config import config
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SERVICE_NAME = "ad-script-writing-agent"
+
+_current_span = contextvars.ContextVar("trace_current_span", default=None)
+
+
+class SpanKind(int, Enum):
+    """OTLP span kinds used by the agent."""
+    internal = 1
+    client = 3
+
+
+@dataclass
+class Span:
+    """One timed operation of a run."""
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    name: str
+    kind: SpanKind = SpanKind.internal
+    start_time_ns: int = 0
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _started_at_ns: int = 0
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # int64 values are strings in OTLP JSON
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind.value,
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns),
+        "attributes": [{"key": key, "value": _attribute_value(value)} for key, value in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_span_id:
+        otlp["parentSpanId"] = span.parent_span_id
+    return otlp
+
+
+def to_otlp_json(spans: List[Span]) -> Dict[str, Any]:
+    """Spans as an OTLP `ExportTraceServiceRequest` in its JSON encoding."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [_otlp_span(span) for span in spans],
+            }],
+        }]
+    }
+
+
+class Tracer:
+    """Collects the spans of the runs in progress and exports each run when its root span ends."""
+
+    def __init__(self, export_path: str = ""):
+        self.export_path = export_path
+        self._lock = threading.Lock()
+        self._traces: Dict[str, List[Span]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.export_path)
+
+    def start_span(self, name: str, kind: SpanKind = SpanKind.internal, root: bool = False,
+                   **attributes: Any) -> Optional[Span]:
+        """
+        Start a span under the current one (`root`: start a new trace when there is none).
+        Returns None when tracing is off or there is no run to attach the span to.
+        """
+        if not self.enabled:
+            return None
+        parent = _current_span.get()
+        if parent is None and not root:
+            return None
+        span = Span(
+            trace_id=parent.trace_id if parent is not None else uuid.uuid4().hex,
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent is not None else None,
+            name=name,
+            kind=kind,
+            start_time_ns=time.time_ns(),
+            _started_at_ns=time.perf_counter_ns(),
+        )
+        span.set_attributes(**attributes)
+        if parent is None:
+            with self._lock:
+                self._traces[span.trace_id] = []
+        return span
+
+    def end_span(self, span: Optional[Span], error: Optional[BaseException] = None) -> None:
+        if span is None:
+            return
+        span.end_time_ns = span.start_time_ns + (time.perf_counter_ns() - span._started_at_ns)
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                # The run already ended (e.g. the losing request of a hedge)
+                return
+            spans.append(span)
+            if span.parent_span_id is not None:
+                return
+            del self._traces[span.trace_id]
+        self._export(spans)
+
+    def _export(self, spans: List[Span]) -> None:
+        line = json.dumps(to_otlp_json(spans), ensure_ascii=False)
+        try:
+            path = Path(self.export_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Could not export trace {spans[-1].trace_id} to {self.export_path}: {e}")
+
+
+tracer = Tracer(config.trace_export_path)
+
+
+def set_trace_export_path(path: Optional[Union[str, Path]]) -> None:
+    """Export the runs that start from now on to `path` (None or empty: turn tracing off)."""
+    tracer.export_path = str(path) if path else ""
+
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Make `span` the parent of the spans opened inside the block, without ending it."""
+    if span is None:
+        yield None
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, kind: SpanKind = SpanKind.internal, root: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the block as a span; an exception (asyncio cancellation included) marks it as failed."""
+    current = tracer.start_span(name, kind, root, **attributes)
+    error = None
+    try:
+        with use_span(current):
+            yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        tracer.end_span(current, error)
+
+
+def _node_attributes(state: Any) -> Dict[str, Any]:
+    attributes = {}
+    for name in ("iteration_count", "variation_index", "variation_iteration_count"):
+        value = getattr(state, name, None)
+        if isinstance(value, int):
+            attributes[f"agent.{name}"] = value
+    return attributes
+
+
+def traced_node(name: str, node: Callable) -> Callable:
+    """Wrap a graph node (sync or asyncio) so each of its executions is a span of the run."""
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, *args, **kwargs):
+            with span(name, **{"langgraph.node": name}, **_node_attributes(state)):
+                return await node(state, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        with span(name, **{"langgraph.node": name}, **_node_attributes(state)):
+            return node(state, *args, **kwargs)
+    return wrapper
+
+
+__all__ = ['Span', 'SpanKind', 'Tracer', 'tracer', 'span', 'use_span', 'traced_node', 'to_otlp_json',
+           'set_trace_export_path']
@@ -1,11 +1,17 @@
 # Import libraries
-import os
-import json
 import yaml
+from pathlib import Path
 from typing import List, Optional, Dict
 from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
 
+from src.config.config import config, PromptLayout
 from src.agent.state import AgentState
+from src.agent.guideline import GUIDELINE_PATH, get_guideline, get_guideline_text, guideline_sections
+from src.agent.prompt_context import context_fragment
+from src.agent.serialization import render_value, render_object, render_model
+from src.agent.history import compact_evaluation_history, compact_refinement_history, record_compaction
+from src.agent.budget import PromptTrim, NO_TRIM
+from src.agent.profiling import profiled
 from src.agent.prompts import (audience_insight_system_prompt , creative_strategy_system_prompt,
                                script_generation_system_prompt, script_evaluation_system_prompt,
                                script_refinement_system_prompt, variation_generation_system_prompt)
@@ -23,9 +29,31 @@ def format_dict_as_list(d: Dict[str, str]) -> str:
     return "\n    - " + "\n    - ".join([f"{k}: {v}" for k, v in d.items()])
 
 
+def cache_friendly_layout() -> bool:
+    """Whether prompts are laid out from most static to most dynamic content (`PROMPT_LAYOUT`)."""
+    return config.prompt_layout == PromptLayout.cache_friendly
+
+
+def compose_cache_friendly(guideline_heading: str, guideline_text: str, context_heading: str,
+                           context_entries: List, iteration_entries: List, closing: str) -> str:
+    """
+    User message ordered for provider prompt caching: guideline, run context
+    (brief, insights, strategy), then the per-iteration inputs and the instruction.
+    Everything before the per-iteration inputs is identical on every call of a run.
+    """
+    sections = []
+    if guideline_text:
+        sections.append(f"### {guideline_heading} ###\n{guideline_text.strip()}")
+    sections.append(f"### {context_heading} ###\n{render_object(context_entries)}")
+    if iteration_entries:
+        sections.append(f"### Current Iteration ###\n{render_object(iteration_entries)}")
+    sections.append(f"---\n{closing}")
+    return "\n\n".join(sections)
+
+
 def read_yaml_from_parent(filename):
     """
-    Membaca dan mengurai file YAML yang terletak satu direktori di atas lokasi skrip.
+    Membaca dan mengurai file YAML yang terletak di direktori paket agent.
 
     Args:
         filename (str): Nama file YAML (misalnya, 'your_file.yaml').
@@ -33,23 +61,27 @@ def read_yaml_from_parent(filename):
     Returns:
         dict or list: Konten yang telah diurai dari file YAML.
     """
-    yaml_path = "/projects/ad_script_writing_agent/src/agent/copywriting_guideline.yaml"
+    # The copywriting guideline is parsed once and cached by the guideline service
+    if filename == GUIDELINE_PATH.name:
+        return get_guideline()
+
+    yaml_path = Path(__file__).parent / filename
 
     with open(yaml_path, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f)
 
-guideline = read_yaml_from_parent('copywriting_guideline.yaml')
 
-def build_audience_insight_message(state: AgentState) -> List[BaseMessage]:
+@profiled
+def build_audience_insight_message(state: AgentState, trim: PromptTrim = NO_TRIM) -> List[BaseMessage]:
     a = state.audience_persona
     p = state.product
 
     user_content_string = f"""\
 ### Profil Target Audiens  ###
-{json.dumps(a.model_dump(), indent=2)}
+{render_value(a.model_dump())}
 
 ### Detail Produk ###
-{json.dumps(p.model_dump(), indent=2)}
+{render_value(p.model_dump())}
 """
 
     return [
@@ -58,11 +90,8 @@ def build_audience_insight_message(state: AgentState) -> List[BaseMessage]:
     ]
 
 
-def build_creative_strategy_message(state: AgentState) -> List[BaseMessage]:
-    p = state.product
-    a = state.audience_persona
-    ai = state.audience_insight
-    guideline = read_yaml_from_parent('copywriting_guideline.yaml')
+@profiled
+def build_creative_strategy_message(state: AgentState, trim: PromptTrim = NO_TRIM) -> List[BaseMessage]:
     preferred_hook_examples = [
         "Kamera ponsel Anda sekarang menjadi koki pribadi Anda. Begini caranya.",
         "Bagaimana jika Anda bisa mengubah INI [tunjukkan foto hidangan lezat dengan keju dan lemak] menjadi makanan yang ramah penurunan berat badan ANDA?"
@@ -86,42 +115,35 @@ def build_creative_strategy_message(state: AgentState) -> List[BaseMessage]:
         "Unduh Delisio dan masak lebih pintar dalam hitungan menit.",
     ]
 
-    # Create a clean demographic profile by excluding redundant fields
-    demographic_profile = {
-        "age_range": a.age_range,
-        "gender": a.gender.value,
-        "location": [c.value for c in a.location],
-        "income_range": a.income_range.value,
-        "education_level": a.education_level.value if a.education_level else 'Not specified'
-    }
-
-    # Prepare a dictionary for the campaign brief and audience insights
-    campaign_and_insights_dict = {
-        "campaign_brief": {
-            "campaign_goal": state.campaign_goal.value,
-            "ad_platform": state.ad_platform.value,
-            "creative_direction": state.creative_direction.value,
-            "script_tone": state.script_tone,
-            "product_details": {
-                "name": p.product_name,
-                "overview": p.product_description,
-                "focused_feature": {
-                    "name": state.product_feature_focus,
-                    "description": p.product_features.get(state.product_feature_focus)
-                },
-                "unique_selling_points": p.unique_selling_point,
-                "problems_solved": p.problems_solved,
-                "supported_platforms": [sp.value for sp in p.supported_platforms]
-            }
-        },
-        "demographic_profile": demographic_profile,
-        "detailed_audience_insights": ai.model_dump(),
-        "preferred_hook_examples": preferred_hook_examples,
-        "preferred_cta_examples": preferred_cta_examples
-    }
-
-    # Use json.dumps to format the structured data for the LLM
-    structured_data_str = json.dumps(campaign_and_insights_dict, indent=2)
+    # Only the guideline sections relevant to this platform and node
+    guideline_text = get_guideline_text(guideline_sections(state.ad_platform, state.creative_direction, "creative_strategy"),
+                                        trim.guideline_sections)
+
+    if cache_friendly_layout():
+        user_content_string = compose_cache_friendly(
+            "Pedoman Copywriting Reels", guideline_text,
+            "Brief Kampanye dan Wawasan Audiens", [
+                ("preferred_hook_examples", render_value(preferred_hook_examples, 1)),
+                ("preferred_cta_examples", render_value(preferred_cta_examples, 1)),
+                ("campaign_brief", context_fragment(state, "campaign_brief_with_product", 1)),
+                ("demographic_profile", context_fragment(state, "demographic_profile", 1)),
+                ("detailed_audience_insights", context_fragment(state, "detailed_insights", 1)),
+            ], [],
+            "Hasilkan strategi kreatif JSON berdasarkan informasi di atas.")
+        return [
+            SystemMessage(content=creative_strategy_system_prompt),
+            HumanMessage(content=user_content_string)
+        ]
+
+    # Prepare the campaign brief and audience insights; the brief blocks are serialized once per run
+    # and spliced in exactly as serializing the whole dict would render them
+    structured_data_str = render_object([
+        ("campaign_brief", context_fragment(state, "campaign_brief_with_product", 1)),
+        ("demographic_profile", context_fragment(state, "demographic_profile", 1)),
+        ("detailed_audience_insights", context_fragment(state, "detailed_insights", 1)),
+        ("preferred_hook_examples", render_value(preferred_hook_examples, 1)),
+        ("preferred_cta_examples", render_value(preferred_cta_examples, 1)),
+    ])
 
     # Combine the structured data with the guidelines
     user_content_string = f"""\
@@ -129,7 +151,7 @@ def build_creative_strategy_message(state: AgentState) -> List[BaseMessage]:
     {structured_data_str}
 
     ### Pedoman Copywriting Reels ###
-    {yaml.dump(guideline, sort_keys=False)}
+    {guideline_text}
 
     ---
     Hasilkan strategi kreatif JSON berdasarkan informasi di atas.
@@ -141,60 +163,39 @@ def build_creative_strategy_message(state: AgentState) -> List[BaseMessage]:
     ]
 
 
-def build_script_generation_message(state: AgentState) -> List[BaseMessage]:
-    p = state.product
-    a = state.audience_persona
-    ai = state.audience_insight
-    guideline = read_yaml_from_parent('copywriting_guideline.yaml')
-
-    # Prepare a single, comprehensive dictionary for all inputs
-    inputs_dict = {
-        "campaign_brief": {
-            "campaign_goal": state.campaign_goal.value,
-            "ad_platform": state.ad_platform.value,
-            "creative_direction": state.creative_direction.value,
-            "script_tone": state.script_tone.value,
-            "product_details": {
-                "name": p.product_name,
-                "overview": p.product_description,
-                "focused_feature": {
-                    "name": state.product_feature_focus,
-                    "description": p.product_features.get(state.product_feature_focus)
-                },
-                "unique_selling_points": p.unique_selling_point,
-                "problems_solved": p.problems_solved,
-                "supported_platforms": [sp.value for sp in p.supported_platforms]
-            }
-        },
-        "creative_strategy": {
-            "core_message_pillars": state.core_message_pillars,
-            "brainstormed_hooks": state.brainstormed_hooks,
-            "generated_ctas": state.generated_ctas,
-            "emotional_triggers": state.emotional_triggers,
-            "primary_visual_concept": state.primary_visual_concept,
-            "audio_strategy": state.audio_strategy
-        },
-        "audience_insights": {
-            "demographic_profile": {
-                "age_range": a.age_range,
-                "gender": a.gender.value,
-                "location": [c.value for c in a.location],
-                "income_range": a.income_range.value,
-                "education_level": a.education_level.value if a.education_level else 'Not specified'
-            },
-            "detailed_insights": ai.model_dump()
-        }
-    }
-
-    # Use json.dumps to format the entire dictionary
-    structured_data_str = json.dumps(inputs_dict, indent=2)
+@profiled
+def build_script_generation_message(state: AgentState, trim: PromptTrim = NO_TRIM) -> List[BaseMessage]:
+    # Only the guideline sections relevant to this platform and node
+    guideline_text = get_guideline_text(guideline_sections(state.ad_platform, state.creative_direction, "script_generation"),
+                                        trim.guideline_sections)
+
+    if cache_friendly_layout():
+        user_content_string = compose_cache_friendly(
+            "Reels Copywriting Guideline", guideline_text,
+            "Ad Campaign Inputs", [
+                ("campaign_brief", context_fragment(state, "campaign_brief_with_product", 1)),
+                ("audience_insights", context_fragment(state, "audience_insights", 1)),
+                ("creative_strategy", context_fragment(state, "creative_strategy_with_visuals", 1)),
+            ], [],
+            "Hasilkan strategi kreatif JSON berdasarkan informasi di atas.")
+        return [
+            SystemMessage(content=script_generation_system_prompt),
+            HumanMessage(content=user_content_string)
+        ]
+
+    # Prepare a single, comprehensive object for all inputs from the memoized context fragments
+    structured_data_str = render_object([
+        ("campaign_brief", context_fragment(state, "campaign_brief_with_product", 1)),
+        ("creative_strategy", context_fragment(state, "creative_strategy_with_visuals", 1)),
+        ("audience_insights", context_fragment(state, "audience_insights", 1)),
+    ])
 
     user_content_string = f"""\
     ### Ad Campaign Inputs ###
     {structured_data_str}
 
     ### Reels Copywriting Guideline ###
-    {yaml.dump(guideline, sort_keys=False)}
+    {guideline_text}
 
     ---
     Hasilkan strategi kreatif JSON berdasarkan informasi di atas.
@@ -206,66 +207,52 @@ def build_script_generation_message(state: AgentState) -> List[BaseMessage]:
     ]
 
 
-def build_evaluation_message(state: AgentState) -> List[BaseMessage]:
+@profiled
+def build_evaluation_message(state: AgentState, trim: PromptTrim = NO_TRIM) -> List[BaseMessage]:
     # Pre-check: Ensure script_draft exists before evaluation
     if not state.script_draft:
         raise ValueError("Script draft is missing for evaluation.")
 
-    # Create a list of history entries for JSON serialization
-    history_list = []
-    if state.script_iteration_history:
-        for entry in state.script_iteration_history:
-            history_list.append({
-                "timestamp": entry.get("timestamp", "N/A"),
-                "recommendations_given": entry.get("previous_evaluation_report", {}).get("actionable_recommendations",
-                                                                                         []),
-                "script_produced_key_takeaway": entry.get("output_refined_script", {}).get("key_takeaway"),
-                "script_produced_cta": entry.get("output_refined_script", {}).get("call_to_action_text"),
-                # You can add more refined script details here if needed
-            })
-
-    # Prepare a single, comprehensive dictionary for all inputs
-    evaluation_inputs_dict = {
-        "campaign_brief": {
-            "campaign_goal": state.campaign_goal.value,
-            "ad_platform": state.ad_platform.value,
-            "creative_direction": state.creative_direction.value,
-            "script_tone": state.script_tone.value,
-        },
-        "product_details": {
-            "name": state.product.product_name,
-            "overview": state.product.product_description,
-            "focused_feature": {
-                "name": state.product_feature_focus,
-                "description": state.product.product_features.get(state.product_feature_focus)
-            },
-            "unique_selling_points": state.product.unique_selling_point,
-            "problems_solved": state.product.problems_solved,
-        },
-        "creative_strategy": {
-            "core_message_pillars": state.core_message_pillars,
-            "brainstormed_hooks": state.brainstormed_hooks,
-            "generated_ctas": state.generated_ctas,
-            "emotional_triggers": state.emotional_triggers,
-        },
-        "audience_insights": {
-            "demographic_profile": {
-                "age_range": state.audience_persona.age_range,
-                "gender": state.audience_persona.gender.value,
-                "location": [c.value for c in state.audience_persona.location],
-                "income_range": state.audience_persona.income_range.value,
-                "education_level": state.audience_persona.education_level.value if state.audience_persona.education_level else 'Not specified'
-            },
-            "detailed_insights": state.audience_insight.model_dump()
-        },
-        "script_refinement_history": history_list
-    }
-
-    # Use json.dumps to format the entire dictionary
-    structured_data_str = json.dumps(evaluation_inputs_dict, indent=2)
-
-    # Load the copywriting guidelines
-    guideline = read_yaml_from_parent('copywriting_guideline.yaml')
+    # Recent iterations are kept verbatim, older ones reduced to score deltas within the token budget
+    # (numbered instead of timestamped so identical runs render identical prompts)
+    history = compact_evaluation_history(state.script_iteration_history, trim.history_keep_last,
+                                         trim.history_token_budget)
+
+    # Only the guideline sections relevant to this platform and node
+    guideline_text = get_guideline_text(guideline_sections(state.ad_platform, state.creative_direction, "script_evaluation"),
+                                        trim.guideline_sections)
+
+    if cache_friendly_layout():
+        user_content_string = compose_cache_friendly(
+            "Reels Copywriting Guideline", guideline_text,
+            "Evaluation Context", [
+                ("campaign_brief", context_fragment(state, "campaign_brief", 1)),
+                ("product_details", context_fragment(state, "product_details", 1)),
+                ("audience_insights", context_fragment(state, "audience_insights", 1)),
+                ("creative_strategy", context_fragment(state, "creative_strategy", 1)),
+            ], [
+                ("script_refinement_history", render_value(history.entries, 1)),
+            ],
+            "### Skrip untuk Dievaluasi (Versi Saat Ini) ###\n"
+            "Berikut adalah skrip iklan yang dihasilkan atau diperbaiki untuk ditinjau. Analisis berdasarkan semua "
+            "konteks di atas, dan kriteria evaluasi yang disediakan dalam prompt sistem Anda.\n\n"
+            f"```json\n{render_model(state.script_draft)}\n```")
+        messages = [
+            SystemMessage(content=script_evaluation_system_prompt),
+            HumanMessage(content=user_content_string)
+        ]
+        record_compaction("script_evaluation", history, messages)
+        return messages
+
+    # Prepare a single, comprehensive object for all inputs from the memoized context fragments
+    structured_data_str = render_object([
+        ("campaign_brief", context_fragment(state, "campaign_brief", 1)),
+        ("product_details", context_fragment(state, "product_details", 1)),
+        ("creative_strategy", context_fragment(state, "creative_strategy", 1)),
+        ("audience_insights", context_fragment(state, "audience_insights", 1)),
+        ("script_refinement_history", render_value(history.entries, 1)),
+    ])
+
 
     # Construct the final user message string
     user_content_string = f"""\
@@ -273,81 +260,72 @@ def build_evaluation_message(state: AgentState) -> List[BaseMessage]:
 {structured_data_str}
 
 ### Reels Copywriting Guideline ###
-{yaml.dump(guideline, sort_keys=False)}
+{guideline_text}
 
 ---
 ### Skrip untuk Dievaluasi (Versi Saat Ini) ###
 Berikut adalah skrip iklan yang dihasilkan atau diperbaiki untuk ditinjau. Analisis berdasarkan semua konteks di atas, dan kriteria evaluasi yang disediakan dalam prompt sistem Anda.
 
 ```json
-{state.script_draft.model_dump_json(indent=2)}
+{render_model(state.script_draft)}
 """
 
-    return [
+    messages = [
         SystemMessage(content=script_evaluation_system_prompt),
         HumanMessage(content=user_content_string.strip())
     ]
+    record_compaction("script_evaluation", history, messages)
+    return messages
 
 
-def build_script_refinement_message(state: AgentState) -> List[BaseMessage]:
+@profiled
+def build_script_refinement_message(state: AgentState, trim: PromptTrim = NO_TRIM) -> List[BaseMessage]:
     # Ensure evaluation report exists before proceeding
     if not state.evaluation_report:
         raise ValueError("Evaluation Report is missing. Cannot build refinement message.")
 
-    # Create a clean list of history entries for JSON serialization
-    history_list = []
-    if state.script_iteration_history:
-        for entry in state.script_iteration_history:
-            history_list.append(entry)
+    # Recent iterations are kept verbatim, older ones reduced to score deltas and applied
+    # recommendations within the token budget
+    history = compact_refinement_history(state.script_iteration_history, trim.history_keep_last,
+                                         trim.history_token_budget)
+
+    # Only the guideline sections relevant to this platform and node
+    guideline_text = get_guideline_text(guideline_sections(state.ad_platform, state.creative_direction, "script_refinement"),
+                                        trim.guideline_sections)
+
+    if cache_friendly_layout():
+        user_content_string = compose_cache_friendly(
+            "Reels Copywriting Guideline", guideline_text,
+            "Refinement Context", [
+                ("campaign_brief", context_fragment(state, "campaign_brief", 1)),
+                ("product_details", context_fragment(state, "product_details", 1)),
+                ("audience_insights", context_fragment(state, "audience_insights", 1)),
+                ("creative_strategy", context_fragment(state, "creative_strategy", 1)),
+            ], [
+                ("script_refinement_history", render_value(history.entries, 1)),
+                ("current_script_draft", render_value(state.script_draft.model_dump(), 1)),
+                ("evaluation_feedback", render_value(state.evaluation_report.model_dump(), 1)),
+            ],
+            "Berdasarkan konteks di atas dan rekomendasi spesifik dalam bidang `evaluation_feedback`, "
+            "hasilkan skrip iklan yang diperbaiki sebagai objek JSON.")
+        messages = [
+            SystemMessage(content=script_refinement_system_prompt),
+            HumanMessage(content=user_content_string)
+        ]
+        record_compaction("script_refinement", history, messages)
+        return messages
+
+    # Prepare a single, comprehensive object for all inputs from the memoized context fragments
+    structured_data_str = render_object([
+        ("campaign_brief", context_fragment(state, "campaign_brief", 1)),
+        ("product_details", context_fragment(state, "product_details", 1)),
+        ("creative_strategy", context_fragment(state, "creative_strategy", 1)),
+        ("audience_insights", context_fragment(state, "audience_insights", 1)),
+        ("script_refinement_history", render_value(history.entries, 1)),
+        ("current_script_draft", render_value(state.script_draft.model_dump(), 1)),
+        ("evaluation_feedback", render_value(state.evaluation_report.model_dump(), 1)),
+    ])
 
-    # Create a clean demographic profile
-    a = state.audience_persona
-    demographic_profile = {
-        "age_range": a.age_range,
-        "gender": a.gender.value,
-        "location": [c.value for c in a.location],
-        "income_range": a.income_range.value,
-        "education_level": a.education_level.value if a.education_level else 'Not specified'
-    }
-
-    # Prepare a single, comprehensive dictionary for all inputs
-    refinement_inputs_dict = {
-        "campaign_brief": {
-            "campaign_goal": state.campaign_goal.value,
-            "ad_platform": state.ad_platform.value,
-            "creative_direction": state.creative_direction.value,
-            "script_tone": state.script_tone.value,
-        },
-        "product_details": {
-            "name": state.product.product_name,
-            "overview": state.product.product_description,
-            "focused_feature": {
-                "name": state.product_feature_focus,
-                "description": state.product.product_features.get(state.product_feature_focus)
-            },
-            "unique_selling_points": state.product.unique_selling_point,
-            "problems_solved": state.product.problems_solved,
-        },
-        "creative_strategy": {
-            "core_message_pillars": state.core_message_pillars,
-            "brainstormed_hooks": state.brainstormed_hooks,
-            "generated_ctas": state.generated_ctas,
-            "emotional_triggers": state.emotional_triggers,
-        },
-        "audience_insights": {
-            "demographic_profile": demographic_profile,
-            "detailed_insights": state.audience_insight.model_dump()
-        },
-        "script_refinement_history": history_list,
-        "current_script_draft": state.script_draft.model_dump(),
-        "evaluation_feedback": state.evaluation_report.model_dump()
-    }
-
-    # Use json.dumps to format the entire dictionary
-    structured_data_str = json.dumps(refinement_inputs_dict, indent=2)
-
-    # Load the copywriting guidelines
-    guideline = read_yaml_from_parent('copywriting_guideline.yaml')
 
     # Construct the final user message string
     user_content_string = f"""\
@@ -355,65 +333,42 @@ def build_script_refinement_message(state: AgentState) -> List[BaseMessage]:
 {structured_data_str}
 
 ### Reels Copywriting Guideline ###
-{yaml.dump(guideline, sort_keys=False)}
+{guideline_text}
 
 ---
 Berdasarkan konteks di atas dan rekomendasi spesifik dalam bidang `evaluation_feedback`, hasilkan skrip iklan yang diperbaiki sebagai objek JSON.
 """
-    return [
+    messages = [
         SystemMessage(content=script_refinement_system_prompt),
         HumanMessage(content=user_content_string.strip())
     ]
+    record_compaction("script_refinement", history, messages)
+    return messages
 
-def build_variation_generation_message(state: AgentState) -> List[BaseMessage]:
+@profiled
+def build_variation_generation_message(state: AgentState, trim: PromptTrim = NO_TRIM) -> List[BaseMessage]:
     # Ensure the script draft has been finalized or approved
     if not state.script_draft:
         raise ValueError("No approved script draft available for variation generation.")
 
-    # Create a clean demographic profile
-    a = state.audience_persona
-    demographic_profile = {
-        "age_range": a.age_range,
-        "gender": a.gender.value,
-        "location": [c.value for c in a.location],
-        "income_range": a.income_range.value,
-        "education_level": a.education_level.value if a.education_level else 'Not specified'
-    }
-
-    # Prepare a single, comprehensive dictionary for all inputs
-    variation_inputs_dict = {
-        "campaign_brief": {
-            "campaign_goal": state.campaign_goal.value,
-            "ad_platform": state.ad_platform.value,
-            "creative_direction": state.creative_direction.value,
-            "script_tone": state.script_tone.value,
-        },
-        "product_details": {
-            "name": state.product.product_name,
-            "overview": state.product.product_description,
-            "focused_feature": {
-                "name": state.product_feature_focus,
-                "description": state.product.product_features.get(state.product_feature_focus)
-            },
-            "unique_selling_points": state.product.unique_selling_point,
-            "problems_solved": state.product.problems_solved,
-        },
-        "audience_insights": {
-            "demographic_profile": demographic_profile,
-            "detailed_insights": state.audience_insight.model_dump()
-        },
-        "approved_base_script": state.script_draft.model_dump(),
-    }
-
-    # Use json.dumps to format the entire dictionary
-    structured_data_str = json.dumps(variation_inputs_dict, indent=2)
+    # Prepare a single, comprehensive object for all inputs from the memoized context fragments
+    variation_inputs = [
+        ("campaign_brief", context_fragment(state, "campaign_brief", 1)),
+        ("product_details", context_fragment(state, "product_details", 1)),
+        ("audience_insights", context_fragment(state, "audience_insights", 1)),
+        ("approved_base_script", render_value(state.script_draft.model_dump(), 1)),
+    ]
+    if state.variation_request:
+        variation_inputs.append(("variation_request", render_value(state.variation_request.model_dump(), 1)))
+
+    structured_data_str = render_object(variation_inputs)
 
     user_content_string = f"""\
 ### Ad Campaign Context ###
 {structured_data_str}
 
 ---
-Berdasarkan skrip yang disetujui di atas, konteks kampanye, dan wawasan audiens, hasilkan 3 varian berbeda yang dioptimalkan untuk pengujian A/B.
+Berdasarkan skrip yang disetujui di atas, konteks kampanye, dan wawasan audiens, hasilkan satu varian yang dioptimalkan untuk pengujian A/B dengan mengikuti sudut pembeda pada `variation_request`.
 """
     return [
         SystemMessage(content=variation_generation_system_prompt),
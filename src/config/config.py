@@ -3,8 +3,9 @@ This module is settings for the project. It securely loads environment variables
 and validate the presence of the necessary API keys.
 """
 from enum import Enum
+from typing import Dict, List
 from pathlib import Path
-from pydantic import SecretStr, Field
+from pydantic import BaseModel, SecretStr, Field
 from pydantic_settings import BaseSettings
 
 
@@ -17,6 +18,59 @@ class LogLevel(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+class CheckpointBackend(str, Enum):
+    """Allowed checkpoint backends for graph runs"""
+    none = "none"
+    memory = "memory"
+    sqlite = "sqlite"
+    mongodb = "mongodb"
+
+
+class PromptLayout(str, Enum):
+    """Allowed orderings of the prompt content"""
+    classic = "classic"
+    cache_friendly = "cache_friendly"
+
+
+class PromptSerialization(str, Enum):
+    """Allowed serialization profiles for the structured prompt inputs"""
+    pretty = "pretty"
+    compact = "compact"
+    minimal = "minimal"
+
+
+class LLMProvider(str, Enum):
+    """Allowed chat model providers of an LLM endpoint"""
+    openai = "openai"
+    google_genai = "google_genai"
+
+
+class ProfilingMode(str, Enum):
+    """Allowed profilers of the opt-in node and prompt builder profiling"""
+    off = "off"
+    cprofile = "cprofile"
+    sampling = "sampling"
+
+
+class LLMSettings(BaseModel):
+    """Connection settings of one LLM role (e.g. `audience_insight`, `script_generation2`) or fallback endpoint"""
+    model: str
+    api_key: str
+    temperature: str
+    base_url: str = ""
+    provider: LLMProvider = LLMProvider.openai
+
+
+# LLM roles and the suffix used by their settings fields (`<role>_llm<suffix>`, ...)
+LLM_ROLES = {
+    "audience_insight": ("audience_insight", ""),
+    "creative_strategy": ("creative_strategy", ""),
+    "script_generation1": ("script_generation", "1"),
+    "script_generation2": ("script_generation", "2"),
+    "script_evaluation_and_refinement": ("script_evaluation_and_refinement", ""),
+}
+
+
 class LangChainConfig(BaseSettings):
     """
     LangChain Backend Server Configuration
@@ -69,6 +123,131 @@ class LangChainConfig(BaseSettings):
     script_evaluation_and_refinement_temperature: str = Field(description="Temperature for script evaluation node")
     script_evaluation_and_refinement_base_url: str = Field(description="LLM base url for script evaluation node")
 
+    # Fallback endpoints per LLM role, tried after the role's own endpoint (see src/agent/routing.py)
+    llm_fallback_endpoints: Dict[str, List[LLMSettings]] = Field(
+        default={},
+        description='Additional endpoints per LLM role as JSON, e.g. {"creative_strategy": [{"model": "gemini-2.0-flash", '
+                    '"api_key": "...", "temperature": "0.7", "provider": "google_genai"}]}'
+    )
+    routing_ewma_alpha: float = Field(default=0.3, gt=0, le=1, description="Weight of the latest call in the per-endpoint latency and error EWMAs")
+    routing_failure_threshold: int = Field(default=3, ge=1, description="Consecutive failures after which an endpoint is taken out of rotation")
+    routing_cooldown_seconds: float = Field(default=30.0, ge=0, description="Seconds a failing endpoint stays out of rotation")
+    routing_probe_ratio: float = Field(default=0.05, ge=0, le=1, description="Share of calls sent to a non-preferred endpoint to keep its latency estimate current")
+
+    # Generate with both script generation LLMs in parallel and keep the best-scored draft
+    script_generation_dual_model: bool = Field(default=True, description="Fan out script generation to llm1 and llm2")
+
+    # Batch runner
+    batch_concurrency: int = Field(default=4, ge=1, description="Maximum number of briefs in flight in the batch runner")
+
+    # Shared HTTP connection pool for the LLM clients
+    http_max_connections: int = Field(default=100, ge=1, description="Maximum number of open connections in the shared LLM HTTP pool")
+    http_max_keepalive_connections: int = Field(default=20, ge=0, description="Maximum number of idle keep-alive connections kept in the pool")
+    http_keepalive_expiry: float = Field(default=30.0, ge=0, description="Seconds an idle keep-alive connection is kept open")
+
+    # LLM response cache (opt-in, replays identical structured calls)
+    llm_cache_enabled: bool = Field(default=False, description="Cache structured LLM responses on disk")
+    llm_cache_path: str = Field(default="cache/llm_responses.sqlite", description="SQLite file of the LLM response cache")
+    llm_cache_max_entries: int = Field(default=5000, ge=1, description="Maximum cached responses before LRU eviction")
+    llm_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, ge=1, description="Seconds a cached response stays valid")
+
+    # LLM call resilience (retries with backoff, per-node timeouts, hedged requests)
+    llm_max_retries: int = Field(default=3, ge=0, description="Retries of a node LLM call after a transient failure (429, 5xx, timeout)")
+    llm_backoff_base_seconds: float = Field(default=1.0, ge=0, description="Base delay of the exponential retry backoff (full jitter)")
+    llm_backoff_max_seconds: float = Field(default=30.0, ge=0, description="Maximum delay between two attempts of an LLM call")
+    llm_default_timeout_seconds: float = Field(default=120.0, gt=0, description="Request timeout of nodes without an entry in llm_timeout_seconds")
+    llm_timeout_seconds: Dict[str, float] = Field(
+        default={
+            "audience_insight": 60.0,
+            "creative_strategy": 90.0,
+            "script_generation": 120.0,
+            "script_evaluation": 90.0,
+            "script_refinement": 120.0,
+            "variation_generation": 90.0,
+            "variation_evaluation": 90.0,
+            "variation_refinement": 120.0,
+        },
+        description="Request timeout per node in seconds, as JSON"
+    )
+    llm_hedge_enabled: bool = Field(default=False, description="Send a duplicate request when a call is slower than the hedge percentile")
+    llm_hedge_percentile: float = Field(default=95.0, gt=0, lt=100, description="Latency percentile of a node after which a hedged request is sent")
+    llm_hedge_min_samples: int = Field(default=20, ge=1, description="Latencies a node needs before hedging starts")
+    llm_latency_window: int = Field(default=200, ge=1, description="Recent call latencies kept per node for the hedge delay and the percentiles")
+
+    # Client-side rate limits per endpoint and API key
+    rate_limits: Dict[str, Dict[str, int]] = Field(
+        default={},
+        description='Requests and tokens per minute per base url as JSON, e.g. {"https://api.openai.com/v1": {"rpm": 500, "tpm": 200000}} ("*" matches every endpoint)'
+    )
+    rate_limit_headroom: float = Field(default=0.95, gt=0, le=1, description="Fraction of the configured limits the client paces to")
+    rate_limit_burst_seconds: float = Field(default=2.0, ge=0, description="Seconds of budget that may be spent at once")
+    rate_limit_default_output_tokens: int = Field(default=800, ge=0, description="Completion tokens assumed per call until an endpoint has reported usage")
+
+    # Per-call LLM metrics (see src/agent/metrics.py)
+    metrics_max_records: int = Field(default=10000, ge=1, description="Most recent LLM call records kept in memory")
+    metrics_json_path: str = Field(default="", description="JSON file the batch runner writes the call records to (empty: not written)")
+    metrics_prometheus_path: str = Field(default="", description="Prometheus textfile the batch runner writes the call metrics to (empty: not written)")
+    call_trace_max_entries: int = Field(default=50, ge=1, description="LLM call traces kept per run in tool_calls_history")
+    trace_export_path: str = Field(default="", description="OTLP JSON Lines file the spans of every finished run are appended to (empty: tracing off)")
+
+    # Profiling (graph nodes and prompt builders)
+    profiling_mode: ProfilingMode = Field(default=ProfilingMode.off, description="off, cprofile, or sampling (pyinstrument, when installed)")
+    profiling_targets: List[str] = Field(default=["*"], description="fnmatch patterns of the node and builder names to profile")
+    profiling_output_dir: str = Field(default="profiles", description="Directory the per-run profile files are written to")
+    profiling_sample_interval_seconds: float = Field(default=0.001, gt=0, description="Sampling interval of the sampling profiler")
+
+    # Stage cache (reuse audience insight / creative strategy across campaigns with the same inputs)
+    stage_cache_enabled: bool = Field(default=False, description="Reuse audience insight and creative strategy results by input fingerprint")
+    stage_cache_path: str = Field(default="cache/stage_results.sqlite", description="SQLite file of the stage cache")
+    stage_cache_max_entries: int = Field(default=2000, ge=1, description="Maximum cached stage results before LRU eviction")
+    stage_cache_ttl_seconds: int = Field(default=30 * 24 * 3600, ge=1, description="Seconds a cached stage result stays valid")
+
+    # Prompt context fragments (serialized brief blocks reused across the message builders of a run)
+    prompt_context_cache_max_entries: int = Field(default=512, ge=1, description="Maximum serialized prompt context fragments kept in memory")
+
+    # Prompt serialization profile and layout
+    prompt_serialization: PromptSerialization = Field(default=PromptSerialization.pretty, description="Prompt serialization profile: pretty, compact or minimal")
+    prompt_layout: PromptLayout = Field(default=PromptLayout.classic, description="Prompt layout: classic, or cache_friendly (static content first for provider prompt caching)")
+
+    # Prompt budgets
+    token_encoding: str = Field(default="cl100k_base", description="tiktoken encoding used to count prompt tokens (characters / 4 without tiktoken)")
+    history_keep_last: int = Field(default=1, ge=0, description="Most recent refinement iterations kept verbatim in the evaluation and refinement prompts")
+    history_token_budget: int = Field(default=1500, ge=0, description="Token budget of the iteration history in a prompt (0 disables the limit)")
+    prompt_token_budgets: Dict[str, int] = Field(
+        default={
+            "audience_insight": 4000,
+            "creative_strategy": 12000,
+            "script_generation": 12000,
+            "script_evaluation": 12000,
+            "script_refinement": 14000,
+            "variation_generation": 8000,
+            "variation_evaluation": 12000,
+            "variation_refinement": 14000,
+        },
+        description="Prompt token budget per node, as JSON (nodes without a budget are only measured)"
+    )
+
+    # Checkpointing (resume a failed run from its last completed node)
+    checkpoint_backend: CheckpointBackend = Field(default=CheckpointBackend.none, description="Checkpoint backend: none, memory, sqlite or mongodb")
+    checkpoint_sqlite_path: str = Field(default="checkpoints/checkpoints.sqlite", description="SQLite file used by the sqlite checkpoint backend")
+    checkpoint_mongodb_uri: str = Field(default="mongodb://localhost:27017", description="Connection string used by the mongodb checkpoint backend")
+    checkpoint_mongodb_db: str = Field(default="ad_script_checkpoints", description="Database used by the mongodb checkpoint backend")
+
+    def get_llm_settings(self, role: str) -> LLMSettings:
+        """Return the model, key, temperature and base url configured for an LLM role"""
+        if role not in LLM_ROLES:
+            raise ValueError(f"Unknown LLM role '{role}'. Expected one of: {', '.join(LLM_ROLES)}")
+        prefix, suffix = LLM_ROLES[role]
+        return LLMSettings(
+            model=getattr(self, f"{prefix}_llm{suffix}"),
+            api_key=getattr(self, f"{prefix}_api_key{suffix}"),
+            temperature=getattr(self, f"{prefix}_temperature{suffix}"),
+            base_url=getattr(self, f"{prefix}_base_url{suffix}"),
+        )
+
+    def get_llm_endpoints(self, role: str) -> List[LLMSettings]:
+        """Return the endpoints of an LLM role: its own settings first, then its fallback endpoints"""
+        return [self.get_llm_settings(role), *self.llm_fallback_endpoints.get(role, [])]
 
     def is_production(self) -> bool:
         """Check if running in production environment"""
@@ -94,4 +273,5 @@ except Exception as e:
 
 
 # Export config instance
-__all__ = ['config', 'LangChainConfig']
+__all__ = ['config', 'LangChainConfig', 'LLMSettings', 'LLMProvider', 'LLM_ROLES', 'CheckpointBackend',
+           'PromptSerialization', 'PromptLayout', 'ProfilingMode']
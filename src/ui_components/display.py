@@ -1,5 +1,5 @@
 import streamlit as st
-from src.agent.state import VideoScriptDraft, StaticAdDraft, EvaluationReport
+from src.agent.state import VideoScriptDraft, StaticAdDraft, EvaluationReport, LLMCallTrace
 
 
 def display_video_script(script: VideoScriptDraft):
@@ -172,3 +172,54 @@ def display_iteration_history(history):
                     st.write("**Rekomendasi yang Diterapkan:**")
                     for rec in prev_eval['actionable_recommendations']:
                         st.write(f"• {rec}")
+
+
+def display_call_timeline(traces):
+    """Menampilkan linimasa panggilan LLM dari `tool_calls_history`."""
+    if not traces:
+        st.info("Tidak ada catatan panggilan LLM tersedia.")
+        return
+
+    import pandas as pd
+    import altair as alt
+
+    st.subheader("⏱️ Linimasa Panggilan LLM")
+
+    traces = [LLMCallTrace.model_validate(trace) for trace in traces]
+    rows = pd.DataFrame([
+        {
+            "Node": trace.node,
+            "Mulai": trace.started_at,
+            "Selesai": trace.started_at + pd.Timedelta(seconds=trace.latency_seconds),
+            "Durasi (s)": round(trace.latency_seconds, 2),
+            "Model": trace.model or "-",
+            "Endpoint": trace.endpoint or "-",
+            "Token Prompt": trace.input_tokens,
+            "Token Completion": trace.output_tokens,
+            "Token Cache": trace.cached_input_tokens,
+            "Cache": "Ya" if trace.cache_hit else "Tidak",
+            "Retry": trace.retries,
+            "Hasil": trace.outcome,
+            "Hash Prompt": trace.prompt_hash or "-",
+        }
+        for trace in traces
+    ])
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Panggilan", len(rows))
+    with col2:
+        st.metric("Total Durasi", f"{rows['Durasi (s)'].sum():.1f}s")
+    with col3:
+        st.metric("Cache Hit", int((rows["Cache"] == "Ya").sum()))
+
+    chart = alt.Chart(rows).mark_bar().encode(
+        x=alt.X("Mulai:T", title="Waktu"),
+        x2="Selesai:T",
+        y=alt.Y("Node:N", sort=None, title=None),
+        color=alt.Color("Hasil:N", title="Hasil"),
+        tooltip=["Node", "Model", "Endpoint", "Durasi (s)", "Token Prompt", "Token Completion", "Retry", "Hasil"],
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+    st.dataframe(rows, use_container_width=True, hide_index=True)
@@ -0,0 +1,96 @@
+"""
+Test setup and shared fixtures. The settings of `.env.example` are used for
+every variable that is not set in the environment, so `src.config.config` loads
+without a `.env` file.
+"""
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import openai
+import pytest
+from dotenv import dotenv_values
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+for key, value in dotenv_values(ROOT / ".env.example").items():
+    if value is not None:
+        os.environ.setdefault(key, value)
+
+from src.agent.state import (  # noqa: E402 (needs the environment above)
+    AdPlatform, AgentState, AudienceInsight, AudiencePersona, CampaignGoal, Countries, CreativeDirection,
+    EvaluationReport, Gender, IncomeRange, Product, ScriptTone, SingleVariation, StaticAdDraft,
+)
+
+
+@pytest.fixture
+def agent_state() -> AgentState:
+    """A minimal valid brief for an Instagram Reels lead campaign."""
+    return AgentState(
+        campaign_goal=CampaignGoal.leads,
+        ad_platform=AdPlatform.instagram_reels,
+        product=Product(
+            product_name="TechFix",
+            product_description="On-site laptop and phone repair.",
+            product_features={"Repair": "Same-day repair at home"},
+            unique_selling_point=["Certified technicians"],
+            problems_solved=["Broken devices"],
+        ),
+        product_feature_focus="Repair",
+        audience_persona=AudiencePersona(
+            age_range="25-50",
+            gender=Gender.all,
+            location=[Countries.indonesia],
+            income_range=IncomeRange.middle,
+            lifestyle=["Busy professionals"],
+            pain_points=["No time to visit a repair shop"],
+        ),
+        creative_direction=CreativeDirection.testimonial,
+        script_tone=ScriptTone.trustworthy,
+    )
+
+
+@pytest.fixture
+def audience_insight() -> AudienceInsight:
+    """An insight with four items in every list."""
+    return AudienceInsight(**{
+        field: [f"{field} {index}" for index in range(4)] for field in AudienceInsight.model_fields
+    })
+
+
+@pytest.fixture
+def make_variation():
+    """Factory of finished A/B variants: `make_variation(index, score=None, approved=False)`."""
+
+    def make(index: int, score: float = None, approved: bool = False, tokens: int = 0) -> SingleVariation:
+        report = None
+        if score is not None:
+            report = EvaluationReport(overall_score=score, detailed_scores={}, summary_feedback="ok",
+                                      actionable_recommendations=[], is_approved_for_next_stage=approved)
+        return SingleVariation(
+            variation_name=f"Variant {index}",
+            variation_type="Hook",
+            base_script_comparison="Stronger hook",
+            ad_script_variation=StaticAdDraft(ad_platform_target="instagram_feeds", headline=f"Headline {index}",
+                                              body_copy="Body", image_description="Image", on_image_text="Text",
+                                              call_to_action_text="Book now", key_takeaway="Fast repair"),
+            variation_evaluation_report=report,
+            variation_index=index,
+            total_llm_tokens=tokens,
+        )
+
+    return make
+
+
+@pytest.fixture
+def status_error():
+    """Factory of `openai.APIStatusError`s: `status_error(429, {"retry-after": "2"})`."""
+
+    def make(status_code: int, headers: dict = None) -> openai.APIStatusError:
+        response = httpx.Response(status_code, headers=headers or {},
+                                  request=httpx.Request("POST", "http://llm.test/v1/chat/completions"))
+        return openai.APIStatusError(f"HTTP {status_code}", response=response, body=None)
+
+    return make
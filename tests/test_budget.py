@@ -0,0 +1,90 @@
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.config.config import config
+from src.agent import budget
+from src.agent.budget import NO_TRIM, PromptBudgetExceeded, PromptTrim, fit_prompt, get_prompt_budget_stats
+
+
+class RecordingBuilder:
+    """
+    Message builder whose prompt size follows the trim: 100 tokens per guideline
+    section (3), 50 of history (20 compacted, 0 dropped) and 10 per insight item.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, state, trim: PromptTrim = NO_TRIM):
+        items = len(state.audience_insight.common_interests)
+        self.calls.append((trim, items))
+        sections = 3 if trim.guideline_sections is None else trim.guideline_sections
+        history = 0 if trim.history_token_budget is not None else 20 if trim.history_keep_last is not None else 50
+        return [SystemMessage("g" * 100 * sections), HumanMessage("h" * history + "i" * 10 * items)]
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    monkeypatch.setattr(budget, "count_message_tokens", lambda messages: sum(len(m.content) for m in messages))
+    monkeypatch.setattr(budget.guideline_service, "section_count", lambda: 3)
+    return RecordingBuilder()
+
+
+@pytest.fixture
+def state(agent_state, audience_insight):
+    return agent_state.model_copy(update={"audience_insight": audience_insight})
+
+
+def _fit(monkeypatch, node: str, budget_tokens: int, builder, state):
+    monkeypatch.setattr(config, "prompt_token_budgets", {node: budget_tokens})
+    return fit_prompt(node, builder, state)
+
+
+def test_prompt_within_budget_is_untouched(monkeypatch, builder, state):
+    messages = _fit(monkeypatch, "fits", 390, builder, state)
+
+    assert builder.calls == [(NO_TRIM, 4)]
+    assert sum(len(m.content) for m in messages) == 390
+    assert get_prompt_budget_stats()["fits"]["trimmed"] == 0
+
+
+def test_node_without_budget_is_only_measured(monkeypatch, builder, state):
+    monkeypatch.setattr(config, "prompt_token_budgets", {})
+    fit_prompt("unlimited", builder, state)
+
+    assert builder.calls == [(NO_TRIM, 4)]
+    assert get_prompt_budget_stats()["unlimited"]["prompt_tokens"] == 390
+
+
+def test_trim_order_guideline_history_insights(monkeypatch, builder, state):
+    messages = _fit(monkeypatch, "tight", 10, builder, state)
+
+    assert builder.calls == [
+        (NO_TRIM, 4),
+        (PromptTrim(guideline_sections=2), 4),
+        (PromptTrim(guideline_sections=1), 4),
+        (PromptTrim(guideline_sections=0), 4),
+        (PromptTrim(guideline_sections=0, history_keep_last=0), 4),
+        (PromptTrim(guideline_sections=0, history_keep_last=0, history_token_budget=1), 4),
+        (PromptTrim(guideline_sections=0, history_keep_last=0, history_token_budget=1, insight_items=3), 3),
+        (PromptTrim(guideline_sections=0, history_keep_last=0, history_token_budget=1, insight_items=1), 1),
+    ]
+    assert sum(len(m.content) for m in messages) == 10
+    assert get_prompt_budget_stats()["tight"]["trimmed"] == 1
+
+
+def test_first_fitting_step_is_used(monkeypatch, builder, state):
+    messages = _fit(monkeypatch, "guideline_only", 250, builder, state)
+
+    assert builder.calls[-1] == (PromptTrim(guideline_sections=1), 4)
+    assert sum(len(m.content) for m in messages) == 190
+    # The caller's state keeps its full insight
+    assert len(state.audience_insight.common_interests) == 4
+
+
+def test_prompt_over_budget_after_every_step_is_rejected(monkeypatch, builder, state):
+    with pytest.raises(PromptBudgetExceeded) as error:
+        _fit(monkeypatch, "too_small", 5, builder, state)
+
+    assert (error.value.node, error.value.tokens, error.value.budget) == ("too_small", 10, 5)
+    assert get_prompt_budget_stats()["too_small"]["rejected"] == 1
@@ -0,0 +1,202 @@
+import asyncio
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.agent.checkpoint import (
+    SqliteCheckpointSaver, ainvoke_graph, input_fingerprint, invoke_graph, run_config, stream_graph,
+)
+
+
+class CounterState(TypedDict, total=False):
+    brief: str
+    drafted: str
+    reviewed: str
+
+
+class FlakyNodes:
+    """Two graph nodes that count their executions; `review` fails while `fail_review` is set."""
+
+    def __init__(self):
+        self.calls = {"draft": 0, "review": 0}
+        self.fail_review = False
+
+    def draft(self, state: CounterState) -> dict:
+        self.calls["draft"] += 1
+        return {"drafted": f"draft of {state['brief']}"}
+
+    def review(self, state: CounterState) -> dict:
+        self.calls["review"] += 1
+        if self.fail_review:
+            raise TimeoutError("review timed out")
+        return {"reviewed": f"review of {state['drafted']}"}
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"))
+    yield saver
+    saver.conn.close()
+
+
+@pytest.fixture
+def nodes():
+    return FlakyNodes()
+
+
+@pytest.fixture
+def graph(saver, nodes):
+    builder = StateGraph(CounterState)
+    builder.add_node("draft", nodes.draft)
+    builder.add_node("review", nodes.review)
+    builder.add_edge(START, "draft")
+    builder.add_edge("draft", "review")
+    builder.add_edge("review", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _put(saver, thread_id, parent_id=None, step=0):
+    checkpoint = empty_checkpoint()
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if parent_id:
+        configurable["checkpoint_id"] = parent_id
+    stored = saver.put({"configurable": configurable}, checkpoint, {"source": "loop", "step": step}, {})
+    return checkpoint["id"], stored
+
+
+def test_sqlite_saver_put_get_and_list(saver):
+    first_id, stored = _put(saver, "run-a", step=0)
+    second_id, _ = _put(saver, "run-a", parent_id=first_id, step=1)
+    _put(saver, "run-b")
+
+    assert stored["configurable"] == {"thread_id": "run-a", "checkpoint_ns": "", "checkpoint_id": first_id}
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "run-a"}})
+    assert latest.checkpoint["id"] == second_id
+    assert latest.parent_config["configurable"]["checkpoint_id"] == first_id
+    assert latest.metadata["step"] == 1
+
+    first = saver.get_tuple({"configurable": {"thread_id": "run-a", "checkpoint_id": first_id}})
+    assert first.checkpoint["id"] == first_id
+    assert first.parent_config is None
+
+    listed = list(saver.list({"configurable": {"thread_id": "run-a"}}))
+    assert [item.checkpoint["id"] for item in listed] == [second_id, first_id]
+    assert [item.checkpoint["id"] for item in saver.list({"configurable": {"thread_id": "run-a"}}, limit=1)] == [second_id]
+    assert [item.checkpoint["id"] for item in saver.list(None, filter={"step": 1})] == [second_id]
+    before = {"configurable": {"thread_id": "run-a", "checkpoint_id": second_id}}
+    assert [item.checkpoint["id"] for item in saver.list({"configurable": {"thread_id": "run-a"}}, before=before)] == [first_id]
+
+    assert saver.get_tuple({"configurable": {"thread_id": "missing"}}) is None
+
+
+def test_sqlite_saver_writes_and_delete(saver):
+    checkpoint_id, stored = _put(saver, "run-a")
+    saver.put_writes(stored, [("drafted", "one"), ("reviewed", "two")], task_id="task-1")
+    # Regular writes are kept once
+    saver.put_writes(stored, [("drafted", "changed")], task_id="task-1")
+
+    pending = saver.get_tuple({"configurable": {"thread_id": "run-a"}}).pending_writes
+    assert pending == [("task-1", "drafted", "one"), ("task-1", "reviewed", "two")]
+
+    saver.delete_thread("run-a")
+    assert saver.get_tuple({"configurable": {"thread_id": "run-a"}}) is None
+    assert saver.conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0] == 0
+
+
+def test_sqlite_saver_async_methods(saver):
+    async def scenario():
+        checkpoint = empty_checkpoint()
+        stored = await saver.aput({"configurable": {"thread_id": "run-a", "checkpoint_ns": ""}},
+                                  checkpoint, {"source": "input", "step": -1}, {})
+        await saver.aput_writes(stored, [("brief", "x")], task_id="task-1")
+        loaded = await saver.aget_tuple({"configurable": {"thread_id": "run-a"}})
+        listed = [item async for item in saver.alist({"configurable": {"thread_id": "run-a"}})]
+        await saver.adelete_thread("run-a")
+        return checkpoint["id"], loaded, listed, await saver.aget_tuple({"configurable": {"thread_id": "run-a"}})
+
+    checkpoint_id, loaded, listed, deleted = asyncio.run(scenario())
+    assert loaded.checkpoint["id"] == checkpoint_id
+    assert loaded.pending_writes == [("task-1", "brief", "x")]
+    assert [item.checkpoint["id"] for item in listed] == [checkpoint_id]
+    assert deleted is None
+
+
+def test_sqlite_saver_persists_across_connections(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SqliteCheckpointSaver(path)
+    checkpoint_id, _ = _put(saver, "run-a")
+    saver.conn.close()
+
+    reopened = SqliteCheckpointSaver(path)
+    assert reopened.get_tuple({"configurable": {"thread_id": "run-a"}}).checkpoint["id"] == checkpoint_id
+    reopened.conn.close()
+
+
+def test_failed_run_resumes_from_last_completed_node(graph, nodes):
+    nodes.fail_review = True
+    with pytest.raises(TimeoutError):
+        invoke_graph(graph, {"brief": "TechFix"}, "batch-line-1")
+    assert nodes.calls == {"draft": 1, "review": 1}
+
+    nodes.fail_review = False
+    result = invoke_graph(graph, {"brief": "TechFix"}, "batch-line-1")
+
+    assert result == {"brief": "TechFix", "drafted": "draft of TechFix", "reviewed": "review of draft of TechFix"}
+    # The draft was checkpointed, only the review ran again
+    assert nodes.calls == {"draft": 1, "review": 2}
+
+
+def test_completed_run_returns_checkpointed_state(graph, nodes):
+    first = invoke_graph(graph, {"brief": "TechFix"}, "batch-line-1")
+    again = invoke_graph(graph, {"brief": "TechFix"}, "batch-line-1")
+
+    assert again == first
+    assert nodes.calls == {"draft": 1, "review": 1}
+
+
+def test_same_run_id_with_changed_input_starts_a_new_run(graph, nodes):
+    invoke_graph(graph, {"brief": "TechFix"}, "batch-line-1")
+    result = invoke_graph(graph, {"brief": "GlowSkin"}, "batch-line-1")
+
+    assert result["reviewed"] == "review of draft of GlowSkin"
+    assert nodes.calls == {"draft": 2, "review": 2}
+
+
+def test_failed_run_with_changed_input_does_not_resume(graph, nodes):
+    nodes.fail_review = True
+    with pytest.raises(TimeoutError):
+        invoke_graph(graph, {"brief": "TechFix"}, "batch-line-1")
+
+    nodes.fail_review = False
+    result = invoke_graph(graph, {"brief": "GlowSkin"}, "batch-line-1")
+
+    assert result["drafted"] == "draft of GlowSkin"
+    assert nodes.calls == {"draft": 2, "review": 2}
+
+
+def test_async_and_streamed_runs_resume_and_replay(graph, nodes):
+    nodes.fail_review = True
+    with pytest.raises(TimeoutError):
+        asyncio.run(ainvoke_graph(graph, {"brief": "TechFix"}, "batch-line-1"))
+
+    nodes.fail_review = False
+    result = asyncio.run(ainvoke_graph(graph, {"brief": "TechFix"}, "batch-line-1"))
+    assert result["reviewed"] == "review of draft of TechFix"
+    assert nodes.calls == {"draft": 1, "review": 2}
+
+    # A finished run streams its final state without running any node
+    chunks = list(stream_graph(graph, {"brief": "TechFix"}, "batch-line-1"))
+    assert chunks == [("values", result)]
+    assert nodes.calls == {"draft": 1, "review": 2}
+
+
+def test_input_fingerprint_identifies_the_input():
+    assert input_fingerprint({"brief": "TechFix", "n": 1}) == input_fingerprint({"n": 1, "brief": "TechFix"})
+    assert input_fingerprint({"brief": "TechFix"}) != input_fingerprint({"brief": "GlowSkin"})
+    assert run_config("run-1")["configurable"]["thread_id"] == "run-1"
+    assert run_config("run-1", {"brief": "TechFix"})["configurable"]["thread_id"] == \
+        f"run-1:{input_fingerprint({'brief': 'TechFix'})}"
+
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from langgraph.types import Send
+
+from src.agent.state import AgentState, LLMCallTrace, merge_variation_results
+from src.agent.graph import _build_variation_graph, collect_variations_node, fan_out_variations
+
+STARTED_AT = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _trace(node: str, seconds: int = 0) -> LLMCallTrace:
+    return LLMCallTrace(node=node, started_at=STARTED_AT + timedelta(seconds=seconds))
+
+
+def test_merge_sorts_parallel_results_by_variant_index(make_variation):
+    merged = merge_variation_results([make_variation(2)], [make_variation(0)])
+    merged = merge_variation_results(merged, [make_variation(1)])
+    assert [variation.variation_index for variation in merged] == [0, 1, 2]
+    assert [variation.variation_index for variation in merge_variation_results(None, [make_variation(1)])] == [1]
+
+
+def test_merge_none_resets_the_results(make_variation):
+    assert merge_variation_results([make_variation(0), make_variation(1)], None) == []
+
+
+def test_fan_out_sends_one_clean_branch_per_variant(agent_state, make_variation):
+    state = agent_state.model_copy(update={
+        "variation_count": 3,
+        "variation_iteration_count": 2,
+        "variation_results": [make_variation(0)],
+        "total_llm_tokens": 500,
+        "tool_calls_history": [_trace("script_generation")],
+    })
+
+    sends = fan_out_variations(state)
+    assert [send.node for send in sends] == ["variation_branch_node"] * 3
+    assert all(isinstance(send, Send) for send in sends)
+    branches = [send.arg for send in sends]
+    assert [branch.variation_index for branch in branches] == [0, 1, 2]
+    for branch in branches:
+        assert branch.variation_iteration_count == 0
+        assert branch.variation_results == []
+        assert branch.total_llm_tokens == 0
+        assert branch.tool_calls_history == []
+        assert branch.product == agent_state.product
+
+
+def test_collect_prefers_approved_then_score(agent_state, make_variation):
+    state = agent_state.model_copy(update={
+        "total_llm_tokens": 100,
+        "variation_results": [
+            make_variation(0, score=4.8, tokens=10),
+            make_variation(1, score=4.1, approved=True, tokens=20),
+            make_variation(2, score=4.5, approved=True, tokens=30),
+        ],
+    })
+
+    update = collect_variations_node(state)
+    assert update["single_variation_result"].variation_index == 2
+    assert update["total_llm_tokens"] == 160
+    assert update["is_variation_workflow"] is True
+
+
+def test_collect_without_variants_fails(agent_state):
+    with pytest.raises(ValueError):
+        collect_variations_node(agent_state)
+
+
+def test_variation_graph_fans_out_and_collects(agent_state, make_variation):
+    seen = []
+
+    def variation_branch_node(state: AgentState) -> dict:
+        seen.append(state)
+        variation = make_variation(state.variation_index, score=3.0 + state.variation_index, tokens=10)
+        variation.call_traces = [_trace("variation_generation", 10 - state.variation_index)]
+        return {"variation_results": [variation]}
+
+    graph = _build_variation_graph(variation_branch_node)
+    base_trace = _trace("script_generation")
+    state = agent_state.model_copy(update={
+        "variation_count": 3,
+        "total_llm_tokens": 100,
+        "tool_calls_history": [base_trace],
+        # Results of an earlier variation run are replaced, not extended
+        "variation_results": [make_variation(0), make_variation(5)],
+    })
+
+    result = AgentState(**graph.invoke(state))
+    assert sorted(branch.variation_index for branch in seen) == [0, 1, 2]
+    assert [variation.variation_index for variation in result.variation_results] == [0, 1, 2]
+    assert result.single_variation_result.variation_index == 2
+    assert result.total_llm_tokens == 130
+    assert result.tool_calls_history[0] == base_trace
+    # Branch traces follow the base ones in start order
+    assert [trace.started_at for trace in result.tool_calls_history[1:]] == [
+        STARTED_AT + timedelta(seconds=seconds) for seconds in (8, 9, 10)
+    ]
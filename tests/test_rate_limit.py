@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from src.config.config import config
+from src.agent import rate_limit
+from src.agent.rate_limit import RateLimiter, call_with_rate_limit
+
+
+class FakeClock:
+    """Stands in for the `time` module of the limiter; sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    monkeypatch.setattr(config, "rate_limit_headroom", 1.0)
+    monkeypatch.setattr(config, "rate_limit_burst_seconds", 0.0)
+    return clock
+
+
+def test_requests_are_spaced_by_the_request_rate(clock):
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=None)
+
+    assert [limiter.reserve(0) for _ in range(3)] == [0.0, 1.0, 2.0]
+    clock.now += 10
+    assert limiter.reserve(0) == 0.0
+    assert limiter.stats()["delayed"] == 2
+
+
+def test_burst_allowance(clock, monkeypatch):
+    monkeypatch.setattr(config, "rate_limit_burst_seconds", 2.0)
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=None)
+
+    assert [limiter.reserve(0) for _ in range(5)] == [0.0, 0.0, 0.0, 1.0, 2.0]
+
+
+def test_headroom_scales_the_provider_limit(clock, monkeypatch):
+    monkeypatch.setattr(config, "rate_limit_headroom", 0.5)
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=None)
+
+    assert [limiter.reserve(0) for _ in range(2)] == [0.0, 2.0]
+
+
+def test_slowest_dimension_sets_the_send_time(clock):
+    # 1 request/s, 10 tokens/s
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=600)
+
+    assert limiter.reserve(50) == 0.0
+    assert limiter.reserve(10) == 5.0
+    # Both dimensions advance from the shared send time
+    assert limiter.reserve(0) == 6.0
+
+
+def test_reconcile_returns_unused_tokens(clock):
+    limiter = RateLimiter("test", requests_per_minute=None, tokens_per_minute=600)
+
+    limiter.reserve(50)
+    limiter.reconcile(50, 20)
+    assert limiter.reserve(10) == pytest.approx(2.0)
+
+    limiter.reconcile(10, 40)
+    assert limiter.reserve(0) == pytest.approx(6.0)
+    assert limiter.stats()["actual_tokens"] == 60
+
+
+def test_reconcile_tracks_the_completion_size(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "count_message_tokens", lambda messages: 100)
+    limiter = RateLimiter("test", requests_per_minute=None, tokens_per_minute=600)
+    limiter._output_tokens = 200.0
+
+    limiter.reconcile(0, 0, output_tokens=300)
+    assert limiter.estimate([HumanMessage("brief")]) == 100 + 220
+
+
+def test_call_reconciles_with_its_own_usage(clock, monkeypatch, status_error):
+    monkeypatch.setattr(config, "rate_limits", {"http://llm.test/v1": {"tpm": 600}})
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setattr(rate_limit, "count_message_tokens", lambda messages: 30)
+    monkeypatch.setattr(config, "rate_limit_default_output_tokens", 20)
+    usage = UsageMetadataCallbackHandler()
+
+    def call():
+        usage.usage_metadata = {"model": {"input_tokens": 30, "output_tokens": 10, "total_tokens": 40}}
+        return "response"
+
+    assert call_with_rate_limit("http://llm.test/v1/", "key", [HumanMessage("brief")], call, usage) == "response"
+    limiter = rate_limit.get_rate_limiter("http://llm.test/v1/", "key")
+    assert limiter.stats()["estimated_tokens"] == 50
+    assert limiter.stats()["actual_tokens"] == 40
+
+    def rejected():
+        raise status_error(429)
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_rate_limit("http://llm.test/v1/", "key", [HumanMessage("brief")], rejected, usage)
+    # The rejected request waited for the 40 tokens spent so far, then gave its own reservation back
+    assert clock.slept == [pytest.approx(4.0)]
+    assert limiter.reserve(0) == pytest.approx(0.0)
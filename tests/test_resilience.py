@@ -0,0 +1,194 @@
+import asyncio
+import threading
+
+import httpx
+import openai
+import pytest
+
+from src.config.config import config
+from src.agent import resilience
+from src.agent.resilience import (
+    acall_with_resilience, call_with_resilience, is_retryable, is_timeout, resilience_stats, retry_delay,
+)
+
+REQUEST = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(config, "llm_max_retries", 2)
+    monkeypatch.setattr(config, "llm_backoff_base_seconds", 0.001)
+    monkeypatch.setattr(config, "llm_backoff_max_seconds", 0.01)
+    monkeypatch.setattr(config, "llm_hedge_enabled", False)
+    resilience_stats.reset()
+    yield
+    resilience_stats.reset()
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    """Hedge after the node's median latency, seeded with one 50 ms sample."""
+    monkeypatch.setattr(config, "llm_hedge_enabled", True)
+    monkeypatch.setattr(config, "llm_hedge_min_samples", 1)
+    monkeypatch.setattr(config, "llm_hedge_percentile", 50)
+    resilience_stats.record_latency("node", 0.05)
+
+
+def test_retry_classification(status_error):
+    for status_code in (408, 409, 429, 500, 503):
+        assert is_retryable(status_error(status_code)), status_code
+    for status_code in (400, 401, 404, 422):
+        assert not is_retryable(status_error(status_code)), status_code
+    assert is_retryable(openai.APITimeoutError(request=REQUEST))
+    assert is_retryable(openai.APIConnectionError(request=REQUEST))
+    assert not is_retryable(ValueError("unparsable output"))
+
+
+def test_timeout_classification(status_error):
+    class DeadlineExceeded(Exception):
+        pass
+
+    assert is_timeout(openai.APITimeoutError(request=REQUEST))
+    assert is_timeout(DeadlineExceeded())
+    assert not is_timeout(status_error(504))
+
+
+def test_backoff_ceiling_doubles_up_to_the_maximum(monkeypatch, status_error):
+    monkeypatch.setattr(config, "llm_backoff_base_seconds", 1.0)
+    monkeypatch.setattr(config, "llm_backoff_max_seconds", 8.0)
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+
+    assert [retry_delay(attempt, status_error(503)) for attempt in range(6)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+
+def test_retry_after_is_a_lower_bound_capped_by_the_maximum(monkeypatch, status_error):
+    monkeypatch.setattr(config, "llm_backoff_base_seconds", 1.0)
+    monkeypatch.setattr(config, "llm_backoff_max_seconds", 8.0)
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: low)
+
+    assert retry_delay(0, status_error(429, {"retry-after": "3"})) == 3.0
+    assert retry_delay(0, status_error(429, {"retry-after": "30"})) == 8.0
+    assert retry_delay(0, status_error(429, {"retry-after": "soon"})) == 0.0
+    assert retry_delay(0, status_error(429)) == 0.0
+
+
+def test_transient_failures_are_retried(status_error):
+    outcomes = [status_error(429), status_error(503), "ok"]
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert call_with_resilience("node", call) == "ok"
+    stats = resilience_stats.snapshot()["node"]
+    assert (stats["calls"], stats["attempts"], stats["retries"], stats["failures"]) == (1, 3, 2, 0)
+
+
+def test_permanent_failures_and_exhausted_retries_raise(status_error):
+    def rejected():
+        raise status_error(400)
+
+    with pytest.raises(openai.APIStatusError):
+        call_with_resilience("node", rejected)
+    assert resilience_stats.snapshot()["node"]["attempts"] == 1
+
+    def timed_out():
+        raise openai.APITimeoutError(request=REQUEST)
+
+    with pytest.raises(openai.APITimeoutError):
+        call_with_resilience("other", timed_out)
+    stats = resilience_stats.snapshot()["other"]
+    assert (stats["attempts"], stats["retries"], stats["timeouts"], stats["failures"]) == (3, 2, 3, 1)
+
+
+def test_no_hedge_before_enough_latency_samples(monkeypatch):
+    monkeypatch.setattr(config, "llm_hedge_enabled", True)
+    monkeypatch.setattr(config, "llm_hedge_min_samples", 5)
+    calls = []
+
+    assert call_with_resilience("node", lambda: calls.append(1) or "ok") == "ok"
+    assert len(calls) == 1
+    assert resilience_stats.snapshot()["node"]["hedged"] == 0
+
+
+def test_hedge_wins_over_a_slow_primary(hedging):
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+
+    try:
+        assert call_with_resilience("node", call) == "hedge"
+    finally:
+        release.set()
+    stats = resilience_stats.snapshot()["node"]
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_failed_hedge_falls_back_to_the_primary(hedging, status_error):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            threading.Event().wait(0.3)
+            return "primary"
+        raise status_error(503)
+
+    assert call_with_resilience("node", call) == "primary"
+    stats = resilience_stats.snapshot()["node"]
+    assert (stats["hedged"], stats["hedge_wins"], stats["retries"]) == (1, 0, 0)
+
+
+def test_async_hedge_wins_and_cancels_the_primary(hedging):
+    cancelled = []
+
+    async def main():
+        calls = []
+
+        async def acall():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+                return "primary"
+            return "hedge"
+
+        result = await acall_with_resilience("node", acall)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "hedge"
+    assert cancelled == [True]
+    stats = resilience_stats.snapshot()["node"]
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_async_hedge_failures_are_retried_together(hedging, status_error):
+    async def main():
+        calls = []
+
+        async def acall():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(0.2)
+                raise status_error(502)
+            if len(calls) == 2:
+                raise status_error(503)
+            return "retry"
+
+        return await acall_with_resilience("node", acall), len(calls)
+
+    assert asyncio.run(main()) == ("retry", 3)
+    stats = resilience_stats.snapshot()["node"]
+    assert (stats["hedged"], stats["retries"]) == (1, 1)
@@ -0,0 +1,156 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from src.config.config import config, LLMProvider, LLMSettings
+from src.agent import routing
+from src.agent.routing import Router, aroute, endpoint_name, route
+
+PRIMARY = LLMSettings(model="gpt-4o-mini", api_key="key", temperature="0", base_url="http://primary.test/v1")
+LOCAL = LLMSettings(model="llama3", api_key="key", temperature="0", base_url="http://localhost:11434/v1")
+GEMINI = LLMSettings(model="gemini-2.0-flash", api_key="key", temperature="0", provider=LLMProvider.google_genai)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(routing, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter))
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def router(monkeypatch):
+    monkeypatch.setattr(config, "routing_probe_ratio", 0.0)
+    monkeypatch.setattr(config, "routing_ewma_alpha", 0.5)
+    monkeypatch.setattr(config, "routing_failure_threshold", 2)
+    monkeypatch.setattr(config, "routing_cooldown_seconds", 30.0)
+    router = Router()
+    monkeypatch.setattr(routing, "router", router)
+    return router
+
+
+def test_endpoint_names():
+    assert endpoint_name(PRIMARY) == "gpt-4o-mini@http://primary.test/v1"
+    assert endpoint_name(GEMINI) == "gemini-2.0-flash@google_genai"
+
+
+def test_configured_order_until_measured(router):
+    assert router.rank([PRIMARY, LOCAL, GEMINI]) == [PRIMARY, LOCAL, GEMINI]
+
+    # A measured endpoint goes ahead of the ones without a latency estimate
+    router.record_success(endpoint_name(GEMINI), 2.0)
+    assert router.rank([PRIMARY, LOCAL, GEMINI]) == [GEMINI, PRIMARY, LOCAL]
+
+
+def test_latency_ewma_ranking(router):
+    router.record_success(endpoint_name(PRIMARY), 1.0)
+    router.record_success(endpoint_name(LOCAL), 2.0)
+    assert router.rank([PRIMARY, LOCAL]) == [PRIMARY, LOCAL]
+
+    # EWMA with alpha 0.5: 1.0 -> 2.0 -> 3.5
+    router.record_success(endpoint_name(PRIMARY), 3.0)
+    router.record_success(endpoint_name(PRIMARY), 5.0)
+    assert router.stats()[endpoint_name(PRIMARY)]["latency_ewma_seconds"] == 3.5
+    assert router.rank([PRIMARY, LOCAL]) == [LOCAL, PRIMARY]
+
+
+def test_errors_raise_the_expected_time(router, clock):
+    router.record_success(endpoint_name(PRIMARY), 1.0)
+    router.record_success(endpoint_name(LOCAL), 1.5)
+    router.record_failure(endpoint_name(PRIMARY), 0.1, timed_out=False, cool_down=False)
+
+    # 1.0 / (1 - 0.5) = 2.0 per successful call, against 1.5
+    assert router.rank([PRIMARY, LOCAL]) == [LOCAL, PRIMARY]
+    router.record_success(endpoint_name(PRIMARY), 1.0)
+    assert router.stats()[endpoint_name(PRIMARY)]["error_ewma"] == 0.25
+    assert router.rank([PRIMARY, LOCAL]) == [PRIMARY, LOCAL]
+
+
+def test_timeouts_count_as_latency(router):
+    router.record_success(endpoint_name(PRIMARY), 1.0)
+    router.record_failure(endpoint_name(PRIMARY), 9.0, timed_out=True, cool_down=False)
+    router.record_failure(endpoint_name(PRIMARY), 9.0, timed_out=False, cool_down=False)
+    assert router.stats()[endpoint_name(PRIMARY)]["latency_ewma_seconds"] == 5.0
+
+
+def test_cooldown_after_consecutive_failures(router, clock):
+    router.record_success(endpoint_name(PRIMARY), 0.5)
+    router.record_success(endpoint_name(LOCAL), 1.0)
+    router.record_failure(endpoint_name(PRIMARY), 0.1, timed_out=False)
+    router.record_success(endpoint_name(PRIMARY), 0.5)
+    router.record_failure(endpoint_name(PRIMARY), 0.1, timed_out=False)
+    assert not router.stats()[endpoint_name(PRIMARY)]["in_cooldown"]
+
+    router.record_failure(endpoint_name(PRIMARY), 0.1, timed_out=False)
+    assert router.stats()[endpoint_name(PRIMARY)]["in_cooldown"]
+    # Even an unmeasured endpoint goes ahead of one in cooldown
+    assert router.rank([PRIMARY, GEMINI]) == [GEMINI, PRIMARY]
+
+    clock.now += 31
+    assert not router.stats()[endpoint_name(PRIMARY)]["in_cooldown"]
+    assert router.rank([PRIMARY, GEMINI]) == [PRIMARY, GEMINI]
+
+
+def test_probe_sends_a_call_to_another_endpoint(router, monkeypatch):
+    monkeypatch.setattr(config, "routing_probe_ratio", 1.0)
+    router.record_success(endpoint_name(PRIMARY), 0.5)
+    router.record_success(endpoint_name(LOCAL), 1.0)
+    assert router.rank([PRIMARY, LOCAL]) == [LOCAL, PRIMARY]
+
+
+def test_failover_to_the_next_endpoint(router, status_error):
+    calls = []
+
+    def call(endpoint):
+        calls.append(endpoint)
+        if endpoint is PRIMARY:
+            raise status_error(503)
+        return endpoint.model
+
+    assert route("node", [PRIMARY, LOCAL], call) == "llama3"
+    assert calls == [PRIMARY, LOCAL]
+    stats = router.stats()
+    assert stats[endpoint_name(PRIMARY)]["failures"] == 1
+    assert stats[endpoint_name(LOCAL)]["failovers"] == 1
+
+
+def test_all_endpoints_failing_raises_the_transient_error(status_error):
+    def call(endpoint):
+        if endpoint is PRIMARY:
+            raise ValueError("unparsable output")
+        raise status_error(429)
+
+    with pytest.raises(openai.APIStatusError):
+        route("node", [PRIMARY, LOCAL], call)
+
+
+def test_only_endpoint_is_never_cooled_down(router, status_error):
+    def call(endpoint):
+        raise status_error(503)
+
+    for _ in range(3):
+        with pytest.raises(openai.APIStatusError):
+            route("node", [PRIMARY], call)
+    assert router.stats()[endpoint_name(PRIMARY)]["failures"] == 3
+    assert not router.stats()[endpoint_name(PRIMARY)]["in_cooldown"]
+
+
+def test_async_failover(router, status_error):
+    async def acall(endpoint):
+        if endpoint is PRIMARY:
+            raise status_error(500)
+        return endpoint.model
+
+    assert asyncio.run(aroute("node", [PRIMARY, GEMINI], acall)) == "gemini-2.0-flash"
+    assert router.stats()[endpoint_name(GEMINI)]["failovers"] == 1
@@ -0,0 +1,63 @@
+from src.config.config import config
+from src.agent.state import AdPlatform, Countries, CreativeDirection
+from src.agent.stage_cache import _canonical, stage_fingerprint
+
+
+def _with_persona(state, **update):
+    return state.model_copy(update={"audience_persona": state.audience_persona.model_copy(update=update)})
+
+
+def _with_product(state, **update):
+    return state.model_copy(update={"product": state.product.model_copy(update=update)})
+
+
+def test_canonical_normalises_whitespace_keys_and_enums():
+    assert _canonical({" b ": "two  words\n", "a": Countries.uk}) == {"a": "uk", "b": "two words"}
+    assert list(_canonical({"b": 1, "a": 2})) == ["a", "b"]
+
+
+def test_canonical_sorts_only_unordered_lists():
+    assert _canonical(["b", "a"], "location") == ["a", "b"]
+    assert _canonical({"lifestyle": ["b", "a"]}) == {"lifestyle": ["a", "b"]}
+    assert _canonical(["b", "a"], "unique_selling_point") == ["b", "a"]
+
+
+def test_fingerprint_ignores_formatting_and_field_order(agent_state):
+    fingerprint = stage_fingerprint("audience_insight", agent_state)
+
+    reformatted = _with_product(agent_state, product_description="  On-site laptop and\nphone   repair. ")
+    assert stage_fingerprint("audience_insight", reformatted) == fingerprint
+
+    features = {"Warranty": "90 days", "Repair": "Same-day repair at home"}
+    reordered = dict(reversed(features.items()))
+    assert stage_fingerprint("audience_insight", _with_product(agent_state, product_features=features)) == \
+        stage_fingerprint("audience_insight", _with_product(agent_state, product_features=reordered))
+
+    two_countries = _with_persona(agent_state, location=[Countries.indonesia, Countries.uk])
+    assert stage_fingerprint("audience_insight", two_countries) == \
+        stage_fingerprint("audience_insight", _with_persona(agent_state, location=[Countries.uk, Countries.indonesia]))
+
+
+def test_fingerprint_changes_with_the_inputs(agent_state):
+    fingerprint = stage_fingerprint("audience_insight", agent_state)
+
+    assert stage_fingerprint("audience_insight", _with_persona(agent_state, age_range="18-24")) != fingerprint
+    assert stage_fingerprint("audience_insight", _with_product(agent_state, unique_selling_point=["Cheap", "Fast"])) != \
+        stage_fingerprint("audience_insight", _with_product(agent_state, unique_selling_point=["Fast", "Cheap"]))
+
+
+def test_audience_insight_is_shared_across_campaigns(agent_state):
+    other_campaign = agent_state.model_copy(update={
+        "ad_platform": AdPlatform.tiktok_feed,
+        "creative_direction": CreativeDirection.humor,
+    })
+
+    assert stage_fingerprint("audience_insight", other_campaign) == stage_fingerprint("audience_insight", agent_state)
+    assert stage_fingerprint("creative_strategy", other_campaign) != stage_fingerprint("creative_strategy", agent_state)
+
+
+def test_fingerprint_depends_on_the_model(agent_state, monkeypatch):
+    fingerprint = stage_fingerprint("audience_insight", agent_state)
+
+    monkeypatch.setattr(config, "audience_insight_llm", "another-model")
+    assert stage_fingerprint("audience_insight", agent_state) != fingerprint